@@ -0,0 +1,250 @@
+""" headless benchmarks of the cohort, multi-cohort, PSA, and CEA paths
+
+usage:
+    python Benchmarks.py --output benchmark.json
+    python Benchmarks.py --output benchmark.json --baseline baseline.json --threshold 0.2
+
+(wall times and peak memory depend on the machine and on the installed SimPy, so the baseline is
+recorded with --output baseline.json on the machine the comparisons are run on, rather than kept here)
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# draw no figure window (also applies to the processes that run the benchmark cases)
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+# benchmark paths and the grid of settings each of them is run over
+# (pop_size: population size of a cohort, horizon: number of time steps, n_cohorts: number of cohorts)
+GRID = {
+    'cohort': dict(pop_size=[1000, 10000], horizon=[10, 50], n_cohorts=[1]),
+    'vectorized_cohort': dict(pop_size=[10000, 100000], horizon=[10, 50], n_cohorts=[1]),
+    'multi_cohort': dict(pop_size=[500], horizon=[10, 50], n_cohorts=[10, 25]),
+    'psa': dict(pop_size=[2000], horizon=[10, 50], n_cohorts=[50, 200]),
+    'cea': dict(pop_size=[2000, 10000], horizon=[10, 50], n_cohorts=[1]),
+}
+
+
+def run_case(path, pop_size, horizon, n_cohorts):
+    """ runs one benchmark case (meant to be run in a fresh process so that peak memory is of this case)
+    :param path: (string) name of the benchmark path (a key of GRID)
+    :param pop_size: population size of each cohort
+    :param horizon: number of time steps
+    :param n_cohorts: number of cohorts
+    :return: (dictionary) the settings, wall time, patient-steps, patient-steps per second,
+        and peak resident set size (MB)
+    """
+
+    # import the model (and its plotting dependencies) before starting the clock
+    _import_model()
+
+    start = time.perf_counter()
+    patient_steps = _CASES[path](pop_size=pop_size, horizon=horizon, n_cohorts=n_cohorts)
+    wall_time = time.perf_counter() - start
+
+    # peak resident set size (in kilobytes on Linux and in bytes on macOS)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = peak_rss / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10)
+
+    return dict(path=path, pop_size=pop_size, horizon=horizon, n_cohorts=n_cohorts,
+                wall_time=wall_time,
+                patient_steps=int(patient_steps),
+                patient_steps_per_second=patient_steps / wall_time,
+                peak_rss_mb=peak_rss_mb)
+
+
+def _import_model():
+    """ imports the modules used by the benchmark paths """
+
+    import MarkovModelClasses
+    import MultiCohortClasses
+    import SimPy.EconEval
+
+
+def _run_cohort(pop_size, horizon, n_cohorts):
+    """ simulates a cohort patient by patient """
+
+    import InputDataTreatment as DataT
+    import MarkovModelClasses as Cls
+    import ParameterClasses as P
+
+    cohort = Cls.Cohort(id=1, pop_size=pop_size,
+                        transition_prob_matrix_one=DataT.trans_prob_matrix_one,
+                        parameters=P.Parameters(therapy=P.Therapies.RAMPIRIL))
+    cohort.simulate(n_time_steps=horizon)
+    return cohort.nPatientSteps
+
+
+def _run_vectorized_cohort(pop_size, horizon, n_cohorts):
+    """ simulates all patients of a cohort together """
+
+    import InputDataTreatment as DataT
+    import MarkovModelClasses as Cls
+    import ParameterClasses as P
+
+    cohort = Cls.VectorizedCohort(id=1, pop_size=pop_size,
+                                  transition_prob_matrix_one=DataT.trans_prob_matrix_one,
+                                  parameters=P.Parameters(therapy=P.Therapies.RAMPIRIL))
+    cohort.simulate(n_time_steps=horizon)
+    return cohort.nPatientSteps
+
+
+def _run_multi_cohort(pop_size, horizon, n_cohorts):
+    """ simulates cohorts with sampled parameters one cohort at a time """
+
+    import MultiCohortClasses as Cls
+    import NealClasses as P
+
+    multi_cohort = Cls.MultiCohort(ids=range(n_cohorts), pop_size=pop_size, therapy=P.Therapies.RAMPIRIL)
+    multi_cohort.simulate(sim_length=horizon)
+    return multi_cohort.nPatientSteps
+
+
+def _run_psa(pop_size, horizon, n_cohorts):
+    """ simulates cohorts with sampled parameters together as one batch """
+
+    import MultiCohortClasses as Cls
+    import NealClasses as P
+
+    multi_cohort = Cls.MultiCohort(ids=range(n_cohorts), pop_size=pop_size, therapy=P.Therapies.RAMPIRIL)
+    multi_cohort.simulate_batched(sim_length=horizon)
+    return multi_cohort.nPatientSteps
+
+
+def _run_cea(pop_size, horizon, n_cohorts):
+    """ simulates both therapies with common random numbers and does the CEA and CBA (without plotting) """
+
+    import InputDataNoTreatment as DataNT
+    import InputDataTreatment as DataT
+    import MarkovModelClasses as Cls
+    import ParameterClasses as P
+    import SimPy.EconEval as Econ
+
+    cohort = Cls.PairedCohort(id=1, pop_size=pop_size,
+                              ref_transition_prob_matrix=DataNT.trans_prob_matrix_one,
+                              ref_parameters=P.Parameters(therapy=P.Therapies.NONE),
+                              transition_prob_matrix=DataT.trans_prob_matrix_one,
+                              parameters=P.Parameters(therapy=P.Therapies.RAMPIRIL))
+    cohort.simulate(n_time_steps=horizon)
+
+    strategies = [
+        Econ.Strategy(name='No Therapy',
+                      cost_obs=cohort.refCohortOutcomes.costs,
+                      effect_obs=cohort.refCohortOutcomes.utilities),
+        Econ.Strategy(name='Rampiril',
+                      cost_obs=cohort.cohortOutcomes.costs,
+                      effect_obs=cohort.cohortOutcomes.utilities)]
+    Econ.CEA(strategies=strategies, if_paired=True)
+    Econ.CBA(strategies=strategies, wtp_range=[0, 50000], if_paired=True)
+    return cohort.nPatientSteps
+
+
+_CASES = {
+    'cohort': _run_cohort,
+    'vectorized_cohort': _run_vectorized_cohort,
+    'multi_cohort': _run_multi_cohort,
+    'psa': _run_psa,
+    'cea': _run_cea,
+}
+
+
+def get_cases(paths=None):
+    """
+    :param paths: (list) names of benchmark paths to run (if None, all paths in GRID)
+    :return: (list) of (path, pop_size, horizon, n_cohorts) to run
+    """
+
+    if paths is None:
+        paths = list(GRID)
+    cases = []
+    for path in paths:
+        grid = GRID[path]
+        for pop_size, horizon, n_cohorts in itertools.product(grid['pop_size'], grid['horizon'], grid['n_cohorts']):
+            cases.append((path, pop_size, horizon, n_cohorts))
+    return cases
+
+
+def run_benchmarks(paths=None, repeats=1):
+    """ runs every benchmark case in a new process
+    :param paths: (list) names of benchmark paths to run (if None, all paths)
+    :param repeats: number of times to run each case (the fastest run is reported)
+    :return: (dictionary) information about the machine and the results of each case
+    """
+
+    results = []
+    for case in get_cases(paths=paths):
+        runs = []
+        for _ in range(repeats):
+            # a spawned process does not share the memory of this process
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                runs.append(executor.submit(run_case, *case).result())
+        results.append(min(runs, key=lambda run: run['wall_time']))
+        print('{path} pop_size={pop_size} horizon={horizon} n_cohorts={n_cohorts}: '
+              '{wall_time:.3f}s, {patient_steps_per_second:,.0f} patient-steps/s, '
+              '{peak_rss_mb:.0f} MB'.format(**results[-1]))
+
+    return dict(machine=dict(platform=platform.platform(),
+                             python=platform.python_version(),
+                             numpy=np.__version__),
+                results=results)
+
+
+def compare_to_baseline(benchmarks, baseline, threshold=0.2):
+    """
+    :param benchmarks: (dictionary) results returned by run_benchmarks
+    :param baseline: (dictionary) results of a previous run of run_benchmarks
+    :param threshold: relative increase in wall time (or peak memory) that counts as a regression
+    :return: (list) of messages describing the regressions (empty if there is none)
+    """
+
+    def get_key(result):
+        return result['path'], result['pop_size'], result['horizon'], result['n_cohorts']
+
+    baseline_results = {get_key(result): result for result in baseline['results']}
+
+    regressions = []
+    for result in benchmarks['results']:
+        base = baseline_results.get(get_key(result))
+        if base is None:
+            continue
+        for measure in ('wall_time', 'peak_rss_mb'):
+            change = result[measure] / base[measure] - 1
+            if change > threshold:
+                regressions.append('{} pop_size={} horizon={} n_cohorts={}: {} increased by {:.0%} ({:.3f} -> {:.3f})'
+                                   .format(*get_key(result), measure, change, base[measure], result[measure]))
+    return regressions
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmarks of the CKD Markov models.')
+    parser.add_argument('--output', default='benchmark.json', help='JSON file to write the results to')
+    parser.add_argument('--baseline', default=None, help='JSON file of baseline results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='relative increase in wall time or peak memory that counts as a regression')
+    parser.add_argument('--paths', nargs='+', choices=list(GRID), default=None, help='benchmark paths to run')
+    parser.add_argument('--repeats', type=int, default=1, help='number of runs of each case (fastest is kept)')
+    args = parser.parse_args()
+
+    benchmark_results = run_benchmarks(paths=args.paths, repeats=args.repeats)
+    with open(args.output, 'w') as file:
+        json.dump(benchmark_results, file, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            regression_messages = compare_to_baseline(
+                benchmarks=benchmark_results, baseline=json.load(file), threshold=args.threshold)
+        for message in regression_messages:
+            print('REGRESSION:', message)
+        if len(regression_messages) > 0:
+            sys.exit(1)
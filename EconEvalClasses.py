@@ -0,0 +1,305 @@
+from statistics import NormalDist
+
+import numpy as np
+
+# maximum number of (draw, strategy, willingness-to-pay) values computed at once
+# (larger grids are computed in blocks of willingness-to-pay values to bound memory)
+MAX_GRID_SIZE = 2 ** 24
+
+# number of pairs of draws sampled to compare strategies whose draws are not paired
+# (as SimPy's DifferenceStatIndp does)
+N_RESAMPLES = 1000
+
+
+class CostEffectiveness:
+    """ cost-effectiveness and cost-benefit analysis of strategies over paired draws
+    (e.g. probabilistic sensitivity analysis draws, or patients simulated with common random numbers)
+    or independent draws, computed with arrays only (no figure is drawn and no file is written) """
+
+    def __init__(self, costs, effects, names=None, ref_index=0, if_paired=True):
+        """
+        :param costs: discounted costs (one row per draw, one column per strategy),
+            or a list with the costs of each strategy
+        :param effects: discounted effects (e.g. QALY) with the same shape as costs
+        :param names: (list) names of strategies
+        :param ref_index: index of the reference strategy (the strategies are compared to it)
+        :param if_paired: set to False if draw i of a strategy is independent of draw i of the reference
+            strategy (the increases are then measured over pairs of draws sampled at random)
+        """
+
+        self.costs = _get_draws(costs)
+        self.effects = _get_draws(effects)
+        if self.costs.shape != self.effects.shape:
+            raise ValueError('costs and effects should have the same shape.')
+
+        self.nDraws, self.nStrategies = self.costs.shape
+        self.names = list(names) if names is not None else ['Strategy {}'.format(i) for i in range(self.nStrategies)]
+        self.refIndex = ref_index
+        self.ifPaired = if_paired
+
+        # increase in cost and effect of each strategy with respect to the reference strategy in each draw
+        # (and its mean)
+        if if_paired:
+            self.incrementalCosts = self.costs - self.costs[:, [ref_index]]
+            self.incrementalEffects = self.effects - self.effects[:, [ref_index]]
+            self.meanIncrementalCosts = self.incrementalCosts.mean(axis=0)
+            self.meanIncrementalEffects = self.incrementalEffects.mean(axis=0)
+        else:
+            self.meanIncrementalCosts = self.costs.mean(axis=0) - self.costs.mean(axis=0)[ref_index]
+            self.meanIncrementalEffects = self.effects.mean(axis=0) - self.effects.mean(axis=0)[ref_index]
+            # a sampled draw of each strategy is compared to a sampled draw of the reference strategy
+            rng = np.random.RandomState(1)
+            n_pairs = max(self.nDraws, N_RESAMPLES)
+            draws = rng.choice(self.nDraws, size=n_pairs)
+            ref_draws = rng.choice(self.nDraws, size=n_pairs)
+            self.incrementalCosts = self.costs[draws] - self.costs[ref_draws, ref_index][:, np.newaxis]
+            self.incrementalEffects = self.effects[draws] - self.effects[ref_draws, ref_index][:, np.newaxis]
+            self.incrementalCosts[:, ref_index] = 0
+            self.incrementalEffects[:, ref_index] = 0
+
+    def get_costs(self, interval_type='c', alpha=0.05):
+        """
+        :param interval_type: 'c' for confidence interval or 'p' for percentile (projection) interval
+        :param alpha: significance level
+        :return: (mean, interval) of the cost of each strategy
+            (arrays of shape (n_strategies,) and (n_strategies, 2))
+        """
+        return _get_mean_and_interval(means=self.costs.mean(axis=0),
+                                      variances=self.costs.var(axis=0, ddof=1), n=self.nDraws,
+                                      draws=self.costs, interval_type=interval_type, alpha=alpha)
+
+    def get_effects(self, interval_type='c', alpha=0.05):
+        """
+        :param interval_type: 'c' for confidence interval or 'p' for percentile (projection) interval
+        :param alpha: significance level
+        :return: (mean, interval) of the effect of each strategy
+            (arrays of shape (n_strategies,) and (n_strategies, 2))
+        """
+        return _get_mean_and_interval(means=self.effects.mean(axis=0),
+                                      variances=self.effects.var(axis=0, ddof=1), n=self.nDraws,
+                                      draws=self.effects, interval_type=interval_type, alpha=alpha)
+
+    def get_incremental_costs(self, interval_type='c', alpha=0.05):
+        """
+        :param interval_type: 'c' for confidence interval or 'p' for percentile (projection) interval
+        :param alpha: significance level
+        :return: (mean, interval) of the increase in cost of each strategy
+            (arrays of shape (n_strategies,) and (n_strategies, 2))
+        """
+        return _get_mean_and_interval(means=self.meanIncrementalCosts,
+                                      variances=self._get_incremental_covariances(self.costs, self.costs),
+                                      n=self.nDraws, draws=self.incrementalCosts,
+                                      interval_type=interval_type, alpha=alpha)
+
+    def get_incremental_effects(self, interval_type='c', alpha=0.05):
+        """
+        :param interval_type: 'c' for confidence interval or 'p' for percentile (projection) interval
+        :param alpha: significance level
+        :return: (mean, interval) of the increase in effect of each strategy
+            (arrays of shape (n_strategies,) and (n_strategies, 2))
+        """
+        return _get_mean_and_interval(means=self.meanIncrementalEffects,
+                                      variances=self._get_incremental_covariances(self.effects, self.effects),
+                                      n=self.nDraws, draws=self.incrementalEffects,
+                                      interval_type=interval_type, alpha=alpha)
+
+    def _get_incremental_covariances(self, x, y):
+        """
+        :param x: values of each draw (one row per draw, one column per strategy), e.g. costs
+        :param y: values of each draw with the same shape as x, e.g. effects
+        :return: covariance of the increase in x and the increase in y of a strategy with respect to
+            the reference strategy (for one draw of each strategy)
+        """
+
+        n = self.nDraws
+        if self.ifPaired:
+            d_x = x - x[:, [self.refIndex]]
+            d_y = y - y[:, [self.refIndex]]
+            return ((d_x - d_x.mean(axis=0)) * (d_y - d_y.mean(axis=0))).sum(axis=0) / (n - 1)
+
+        # the draws of a strategy and of the reference strategy are independent
+        covariances = ((x - x.mean(axis=0)) * (y - y.mean(axis=0))).sum(axis=0) / (n - 1)
+        covariances = covariances + covariances[self.refIndex]
+        covariances[self.refIndex] = 0
+        return covariances
+
+    def get_icers(self, interval_type='c', alpha=0.05):
+        """
+        :param interval_type: 'c' for the confidence interval of the ratio of mean increases (Fieller's method)
+            or 'p' for the percentile interval of the ratios of increases of each draw
+        :param alpha: significance level
+        :return: (ICER, interval) of each strategy (arrays of shape (n_strategies,) and (n_strategies, 2))
+            (nan for the reference strategy, and for bounds that do not exist)
+        """
+
+        d_cost = self.meanIncrementalCosts
+        d_effect = self.meanIncrementalEffects
+        with np.errstate(divide='ignore', invalid='ignore'):
+            icers = np.where(d_effect != 0, d_cost / d_effect, np.nan)
+
+            if interval_type == 'p':
+                intervals = np.full((self.nStrategies, 2), np.nan)
+                others = [i for i in range(self.nStrategies) if i != self.refIndex]
+                ratios = self.incrementalCosts[:, others] / self.incrementalEffects[:, others]
+                intervals[others] = np.nanpercentile(np.where(np.isfinite(ratios), ratios, np.nan),
+                                                     [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0).T
+            elif interval_type == 'c':
+                intervals = self._get_fieller_intervals(alpha=alpha)
+            else:
+                raise ValueError("interval_type should be 'c' or 'p'.")
+
+        icers[self.refIndex] = np.nan
+        intervals[self.refIndex] = np.nan
+        return icers, intervals
+
+    def _get_fieller_intervals(self, alpha):
+        """ :return: Fieller's confidence intervals of the ratios of mean increase in cost
+        to mean increase in effect (nan if the interval is not bounded) """
+
+        n = self.nDraws
+        z = NormalDist().inv_cdf(1 - alpha / 2)
+        d_cost = self.meanIncrementalCosts
+        d_effect = self.meanIncrementalEffects
+        # variances and covariance of the means
+        var_cost = self._get_incremental_covariances(self.costs, self.costs) / n
+        var_effect = self._get_incremental_covariances(self.effects, self.effects) / n
+        cov = self._get_incremental_covariances(self.costs, self.effects) / n
+
+        # the bounds are the roots of a R^2 - 2 b R + c = 0
+        a = d_effect ** 2 - z ** 2 * var_effect
+        b = d_cost * d_effect - z ** 2 * cov
+        c = d_cost ** 2 - z ** 2 * var_cost
+        discriminant = b ** 2 - a * c
+        bounded = (a > 0) & (discriminant >= 0)
+        root = np.sqrt(np.where(bounded, discriminant, np.nan))
+        return np.column_stack([(b - root) / a, (b + root) / a])
+
+    def get_nmbs(self, wtps):
+        """
+        :param wtps: willingness-to-pay values for one unit of effect
+        :return: (3-D array) net monetary benefit of each draw, strategy, and willingness-to-pay value
+        """
+        wtps = np.asarray(wtps, dtype=float)
+        return self.effects[:, :, np.newaxis] * wtps - self.costs[:, :, np.newaxis]
+
+    def get_expected_nmbs(self, wtps):
+        """
+        :param wtps: willingness-to-pay values for one unit of effect
+        :return: (2-D array) expected net monetary benefit of each strategy (rows) at each
+            willingness-to-pay value (columns)
+        """
+        # the expectation is linear, so it does not need the net monetary benefit of each draw
+        return np.multiply.outer(self.effects.mean(axis=0), np.asarray(wtps, dtype=float)) \
+            - self.costs.mean(axis=0)[:, np.newaxis]
+
+    def get_incremental_nmbs(self, wtps, interval_type='c', alpha=0.05):
+        """
+        :param wtps: willingness-to-pay values for one unit of effect
+        :param interval_type: 'c' for confidence interval or 'p' for percentile (projection) interval
+        :param alpha: significance level
+        :return: (mean, interval) of the incremental net monetary benefit of each strategy with respect to
+            the reference strategy (arrays of shape (n_strategies, n_wtps) and (n_strategies, n_wtps, 2))
+        """
+
+        wtps = np.asarray(wtps, dtype=float)
+        means = np.multiply.outer(self.meanIncrementalEffects, wtps) - self.meanIncrementalCosts[:, np.newaxis]
+        intervals = np.empty(means.shape + (2,))
+
+        if interval_type == 'c':
+            # variance of incremental NMB is linear in wtp^2, wtp, and 1
+            n = self.nDraws
+            z = NormalDist().inv_cdf(1 - alpha / 2)
+            var_cost = self._get_incremental_covariances(self.costs, self.costs)
+            var_effect = self._get_incremental_covariances(self.effects, self.effects)
+            cov = self._get_incremental_covariances(self.costs, self.effects)
+            variances = np.multiply.outer(var_effect, wtps ** 2) - 2 * np.multiply.outer(cov, wtps) \
+                + var_cost[:, np.newaxis]
+            half_widths = z * np.sqrt(np.maximum(variances, 0) / n)
+            intervals[..., 0] = means - half_widths
+            intervals[..., 1] = means + half_widths
+        elif interval_type == 'p':
+            for block in _get_wtp_blocks(n_draws=len(self.incrementalCosts), n_strategies=self.nStrategies,
+                                         n_wtps=len(wtps)):
+                nmbs = self.incrementalEffects[:, :, np.newaxis] * wtps[block] \
+                       - self.incrementalCosts[:, :, np.newaxis]
+                intervals[:, block] = np.moveaxis(
+                    np.percentile(nmbs, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0), 0, -1)
+        else:
+            raise ValueError("interval_type should be 'c' or 'p'.")
+
+        return means, intervals
+
+    def get_acceptability_curves(self, wtps):
+        """
+        :param wtps: willingness-to-pay values for one unit of effect
+        :return: (2-D array) probability that each strategy (rows) has the highest net monetary
+            benefit at each willingness-to-pay value (columns)
+            (strategies are compared within each draw, so the draws should be paired)
+        """
+
+        wtps = np.asarray(wtps, dtype=float)
+        probabilities = np.empty((self.nStrategies, len(wtps)))
+        for block in _get_wtp_blocks(n_draws=self.nDraws, n_strategies=self.nStrategies, n_wtps=len(wtps)):
+            # strategy with the highest net monetary benefit in each draw at each willingness-to-pay value
+            best = self.get_nmbs(wtps[block]).argmax(axis=1)
+            probabilities[:, block] = (best[np.newaxis] == np.arange(self.nStrategies)[:, np.newaxis, np.newaxis]) \
+                .mean(axis=1)
+        return probabilities
+
+    def get_evpi(self, wtps):
+        """
+        :param wtps: willingness-to-pay values for one unit of effect
+        :return: expected value of perfect information at each willingness-to-pay value
+            (expected highest net monetary benefit of draws minus the highest expected net monetary benefit;
+            strategies are compared within each draw, so the draws should be paired)
+        """
+
+        wtps = np.asarray(wtps, dtype=float)
+        expected_highest_nmbs = np.empty(len(wtps))
+        for block in _get_wtp_blocks(n_draws=self.nDraws, n_strategies=self.nStrategies, n_wtps=len(wtps)):
+            expected_highest_nmbs[block] = self.get_nmbs(wtps[block]).max(axis=1).mean(axis=0)
+        return expected_highest_nmbs - self.get_expected_nmbs(wtps).max(axis=0)
+
+    def get_optimal_strategies(self, wtps):
+        """
+        :param wtps: willingness-to-pay values for one unit of effect
+        :return: index of the strategy with the highest expected net monetary benefit at each
+            willingness-to-pay value
+        """
+        return self.get_expected_nmbs(wtps).argmax(axis=0)
+
+
+def _get_draws(values):
+    """ :return: values as a 2-D array with one row per draw and one column per strategy """
+
+    if isinstance(values, (list, tuple)):
+        return np.column_stack([np.asarray(strategy_values, dtype=float) for strategy_values in values])
+    values = np.asarray(values, dtype=float)
+    return values[:, np.newaxis] if values.ndim == 1 else values
+
+
+def _get_mean_and_interval(means, variances, n, draws, interval_type, alpha):
+    """
+    :param means: mean of each strategy
+    :param variances: variance of a draw of each strategy
+    :param n: number of draws the means are estimated from
+    :param draws: (2-D array) one row per draw and one column per strategy (for percentile intervals)
+    :return: (mean, interval) of each strategy
+    """
+
+    if interval_type == 'c':
+        half_widths = NormalDist().inv_cdf(1 - alpha / 2) * np.sqrt(variances / n)
+        intervals = np.column_stack([means - half_widths, means + half_widths])
+    elif interval_type == 'p':
+        intervals = np.percentile(draws, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0).T
+    else:
+        raise ValueError("interval_type should be 'c' or 'p'.")
+    return means, intervals
+
+
+def _get_wtp_blocks(n_draws, n_strategies, n_wtps):
+    """ :return: (list) slices of willingness-to-pay values small enough to compute
+    the values of all draws and strategies at once """
+
+    block_size = max(1, MAX_GRID_SIZE // max(1, n_draws * n_strategies))
+    return [slice(i, min(i + block_size, n_wtps)) for i in range(0, n_wtps, block_size)]
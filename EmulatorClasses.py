@@ -0,0 +1,193 @@
+import math
+
+import numpy as np
+
+from ValueOfInformationClasses import get_design_matrix
+
+# names of the outcomes predicted by emulators fitted with fit_emulator
+OUTCOME_NAMES = ['mean_cost', 'mean_qaly']
+
+
+class PolynomialEmulator:
+    """ polynomial regression of outcomes of simulated cohorts (e.g. mean discounted cost and QALY)
+    on their parameters, to predict the outcomes of new parameters without simulating them
+    (predictions are only trusted within the range of the parameters it is fitted on) """
+
+    def __init__(self, degree=2, ridge=1e-2, domain_tolerance=0.0):
+        """
+        :param degree: degree of the polynomial (at least 1)
+        :param ridge: penalty on the squared coefficients of the standardized parameters
+            (keeps the regression well-conditioned and avoids over-fitting noisy outcomes)
+        :param domain_tolerance: share of the range of each parameter by which a query may
+            fall outside the range of the fitted parameters and still be in the domain
+        """
+
+        if degree < 1:
+            raise ValueError('degree should be at least 1.')
+        self.degree = degree
+        self.ridge = ridge
+        self.domainTolerance = domain_tolerance
+
+        self.means = None           # means of the fitted parameters
+        self.stDevs = None          # standard deviations of the fitted parameters (zero if it did not vary)
+        self.lowerBounds = None     # smallest value of each fitted parameter
+        self.upperBounds = None     # largest value of each fitted parameter
+        self.coefficients = None    # coefficients of the polynomial (one column per outcome)
+        self.testErrors = None      # root mean squared error of each outcome on held-out draws
+        self.testR2s = None         # R-squared of each outcome on held-out draws
+
+    def fit(self, params, outcomes, test_share=0.2, seed=0):
+        """ fits the polynomial (after measuring its error on held-out draws)
+        :param params: values of parameters (one row per draw, one column per parameter)
+        :param outcomes: outcomes of the draws (one row per draw, one column per outcome)
+        :param test_share: share of draws held out to measure the error of the emulator
+            (the emulator is then fitted again on all draws)
+        :param seed: seed of the random number generator that selects the held-out draws
+        """
+
+        params = np.asarray(params, dtype=float)
+        outcomes = np.asarray(outcomes, dtype=float)
+        if outcomes.ndim == 1:
+            outcomes = outcomes[:, np.newaxis]
+
+        # error on held-out draws
+        n_test = int(round(test_share * len(params)))
+        if n_test > 0:
+            order = np.random.RandomState(seed=seed).permutation(len(params))
+            test, train = order[:n_test], order[n_test:]
+            self.__fit(params=params[train], outcomes=outcomes[train])
+            errors = self.predict(params[test]) - outcomes[test]
+            self.testErrors = np.sqrt((errors ** 2).mean(axis=0))
+            total_squares = ((outcomes[test] - outcomes[test].mean(axis=0)) ** 2).sum(axis=0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                self.testR2s = 1 - (errors ** 2).sum(axis=0) / total_squares
+
+        self.__fit(params=params, outcomes=outcomes)
+
+    def __fit(self, params, outcomes):
+
+        # the parameters of new draws are standardized as the fitted ones
+        self.means = params.mean(axis=0)
+        self.stDevs = params.std(axis=0)
+        self.lowerBounds = params.min(axis=0)
+        self.upperBounds = params.max(axis=0)
+
+        design = self.__get_design_matrix(params)
+        if design.shape[1] >= len(params):
+            raise ValueError('The number of draws ({}) should be larger than the number of terms of '
+                             'the polynomial ({}); use more draws or a lower degree.'
+                             .format(len(params), design.shape[1]))
+
+        # ridge regression (the intercept is not penalized)
+        penalty = self.ridge * len(params) * np.eye(design.shape[1])
+        penalty[0, 0] = 0
+        self.coefficients = np.linalg.solve(design.T @ design + penalty, design.T @ outcomes)
+
+    def __get_design_matrix(self, params):
+        """ :return: values of the terms of the polynomial (one row per draw) """
+        return get_design_matrix(params=params, degree=self.degree, means=self.means, st_devs=self.stDevs)
+
+    def predict(self, params):
+        """
+        :param params: values of parameters (one row per query, or one query as a 1-D array)
+        :return: predicted outcomes (one row per query, one column per outcome)
+        """
+        params = np.asarray(params, dtype=float)
+        return self.__get_design_matrix(np.atleast_2d(params)) @ self.coefficients
+
+    def get_if_in_domain(self, params):
+        """
+        :param params: values of parameters (one row per query, or one query as a 1-D array)
+        :return: (array of bool) whether each query is within the range of the fitted parameters
+            (parameters that did not vary should have the same value)
+        """
+
+        params = np.atleast_2d(np.asarray(params, dtype=float))
+        margins = self.domainTolerance * (self.upperBounds - self.lowerBounds) + 1e-12 * np.abs(self.upperBounds)
+        return np.all((params >= self.lowerBounds - margins) & (params <= self.upperBounds + margins), axis=1)
+
+
+class EmulatedCohortModel:
+    """ predicts the outcomes of a cohort with given parameters with an emulator, and
+    simulates the cohort only if its parameters are outside the domain of the emulator """
+
+    def __init__(self, emulator, pop_size, sim_length):
+        """
+        :param emulator: (PolynomialEmulator) emulator fitted with fit_emulator
+        :param pop_size: population size of cohorts simulated outside the domain of the emulator
+        :param sim_length: simulation length
+        """
+
+        self.emulator = emulator
+        self.popSize = pop_size
+        self.simLength = sim_length
+        self.nEmulated = 0      # number of queries answered by the emulator
+        self.nSimulated = 0     # number of queries answered by simulation
+
+    def get_outcomes(self, parameters, cohort_id=0):
+        """
+        :param parameters: (Parameters of NealClasses) parameters of a cohort
+        :param cohort_id: ID of the cohort to simulate if the parameters are outside the domain of the emulator
+        :return: (mean cost, mean QALY, True if predicted by the emulator or False if simulated)
+        """
+
+        params = get_features(trans_prob_matrices=[parameters.transRateMatrix],
+                              annual_state_costs=[parameters.annualStateCosts],
+                              annual_state_utilities=[parameters.annualStateUtilities],
+                              annual_treatment_costs=[parameters.annualTreatmentCost])
+        if self.emulator.get_if_in_domain(params)[0]:
+            self.nEmulated += 1
+            mean_cost, mean_qaly = self.emulator.predict(params)[0]
+            return mean_cost, mean_qaly, True
+
+        # fall back to simulation
+        from MultiCohortClasses import simulate_cohort
+        self.nSimulated += 1
+        mean_cost, mean_qaly, _, _ = simulate_cohort(cohort_id=cohort_id, pop_size=self.popSize,
+                                                  parameters=parameters,
+                                                  transition_prob_matrix_one=parameters.transRateMatrix,
+                                                  sim_length=self.simLength)
+        return mean_cost, mean_qaly, False
+
+
+def get_features(trans_prob_matrices, annual_state_costs, annual_state_utilities, annual_treatment_costs):
+    """
+    :param trans_prob_matrices: transition probability matrices (one per draw)
+    :param annual_state_costs: annual state costs (one row per draw)
+    :param annual_state_utilities: annual state utilities (one row per draw)
+    :param annual_treatment_costs: annual treatment cost of each draw
+    :return: (2-D array) parameters of each draw as one row
+    """
+
+    n = len(annual_treatment_costs)
+    return np.hstack([np.asarray(trans_prob_matrices, dtype=float).reshape(n, -1),
+                      np.asarray(annual_state_costs, dtype=float).reshape(n, -1),
+                      np.asarray(annual_state_utilities, dtype=float).reshape(n, -1),
+                      np.asarray(annual_treatment_costs, dtype=float).reshape(n, 1)])
+
+
+def fit_emulator(columns, degree=None, test_share=0.2, seed=0):
+    """
+    :param columns: outcomes and parameter draws of cohorts simulated under one therapy as returned by
+        ResultsStoreClasses.get_multi_cohort_columns (or ResultsStore.get_columns of a therapy)
+    :param degree: degree of the polynomial (if None, 2 if there are at least twice as many
+        draws to fit as terms of a quadratic polynomial, and 1 otherwise)
+    :param test_share: share of draws held out to measure the error of the emulator
+    :param seed: seed of the random number generator that selects the held-out draws
+    :return: (PolynomialEmulator) emulator of the mean cost and mean QALY (see OUTCOME_NAMES)
+    """
+
+    params = get_features(trans_prob_matrices=columns['params/trans_prob_matrices'],
+                          annual_state_costs=columns['params/annual_state_costs'],
+                          annual_state_utilities=columns['params/annual_state_utilities'],
+                          annual_treatment_costs=columns['params/annual_treatment_costs'])
+    if degree is None:
+        n_varying = np.count_nonzero(params.std(axis=0) > 0)
+        n_train = len(params) - int(round(test_share * len(params)))
+        degree = 2 if n_train >= 2 * math.comb(n_varying + 2, 2) else 1
+
+    emulator = PolynomialEmulator(degree=degree)
+    emulator.fit(params=params,
+                 outcomes=np.column_stack([columns['mean_costs'], columns['mean_qalys']]),
+                 test_share=test_share, seed=seed)
+    return emulator
@@ -26,6 +26,12 @@ trans_prob_matrix_one = [
     [0,         0,         0,        0,       1]      # Stage 5
     ]
 
+# effective number of patients observed in each row of trans_prob_matrix_one
+# (the source of the transition probabilities does not report the number of patients behind them,
+# so, as with st_dev = mean / 5 for costs and utilities, this sample size is assumed; the Dirichlet
+# distribution of a row in the probabilistic sensitivity analysis has concentration N_OBS * probabilities)
+N_OBS = 500
+
 trans_prob_matrix_five = [
     [0.670053,  0.151008,    0.085437,  0.04752,  0.042108],   # Stage 1
     [0,       0.617427,    0.160578,  0.108933,  0.10857],    # Stage 2
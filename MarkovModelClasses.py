@@ -1,56 +1,98 @@
+import time
+
 import numpy as np
 
 import SimPy.Markov as Markov
-import SimPy.Plots.SamplePaths as Path
 from InputDataNoTreatment import CKDStates
-import SimPy.EconEval as Econ
+from PayoffClasses import get_payoff_table
+from ProfilerClasses import PROFILER
+from StoppingRuleClasses import PrecisionMonitor
+from StreamingStatClasses import StreamingStat
 import SimPy.Statistics as Stat
 
 
 class Patient:
-    def __init__(self, id, transition_prob_matrix_one, parameters):
+    def __init__(self, id, transition_prob_matrix_one, parameters, payoffs=None, rng=None):
         """ initiates a patient
         :param id: ID of the patient
         :param transition_prob_matrix_one: transition probability matrix
+        :param payoffs: (PayoffTable) discounted payoffs shared by the patients of a cohort
+            (if None, the table is made when the patient is simulated)
+        :param rng: random number generator of this patient (e.g. from RNGStreams.get_patient_rng)
+            (if None, a RandomState seeded with the patient ID is used)
         """
         self.id = id
         self.transProbMatrix = transition_prob_matrix_one
         self.params = parameters
-        self.stateMonitor = PatientStateMonitor(parameters=parameters)
+        self.rng = rng
+        self.stateMonitor = PatientStateMonitor(parameters=parameters, payoffs=payoffs)
+        self.nTimeSteps = 0     # number of time steps simulated before the patient reached stage 5
+
+    def simulate(self, n_time_steps, horizons=()):
+        """ simulate the patient over the specified simulation length
+        :param n_time_steps: simulation length
+        :param horizons: time steps at which to record the total discounted cost and utility
+        """
 
-    def simulate(self, n_time_steps):
-        """ simulate the patient over the specified simulation length """
+        # table of discounted payoffs
+        if self.stateMonitor.costUtilityMonitor.payoffs is None:
+            self.stateMonitor.costUtilityMonitor.payoffs = get_payoff_table(
+                parameters=self.params, n_time_steps=n_time_steps)
 
         # random number generator
-        rng = np.random.RandomState(seed=self.id)
+        rng = self.rng
+        if rng is None:
+            rng = np.random.RandomState(seed=self.id)
         # jump process
         markov_jump = Markov.MarkovJumpProcess(transition_prob_matrix=self.transProbMatrix)
 
         k = 0  # simulation time step
+        profiling = PROFILER.enabled  # to time state transitions and payoffs
 
         # while the patient is alive and simulation length is not yet reached
         while self.stateMonitor.get_if_alive() and k < n_time_steps:
 
+            if profiling:
+                start = time.perf_counter()
+
             # sample from the Markov jump process to get a new state
             # (returns an integer from {0, 1, 2, ...})
             new_state_index = markov_jump.get_next_state(
                 current_state_index=self.stateMonitor.currentState.value,
                 rng=rng)
 
+            if profiling:
+                transition_end = time.perf_counter()
+
             # update health state
             self.stateMonitor.update(time_step=k, new_state=CKDStates(new_state_index))
 
+            if profiling:
+                PROFILER.add_time(name='MarkovJumpProcess.get_next_state', seconds=transition_end - start)
+                PROFILER.add_time(name='PatientStateMonitor.update', seconds=time.perf_counter() - transition_end)
+
             # increment time
             k += 1
 
+            # record totals if a time horizon is reached
+            if k in horizons:
+                self.stateMonitor.costUtilityMonitor.record_horizon(horizon=k)
+
+        self.nTimeSteps = k
+
+        # totals do not change after the patient reaches stage 5
+        for horizon in horizons:
+            if horizon > k:
+                self.stateMonitor.costUtilityMonitor.record_horizon(horizon=horizon)
+
 
 class PatientStateMonitor:
     """ to update patient outcomes (years survived, cost, etc.) throughout the simulation """
-    def __init__(self, parameters):
+    def __init__(self, parameters, payoffs=None):
 
         self.currentState = CKDStates.STAGE1    # current health state
         self.survivalTime = None                # survival time
-        self.costUtilityMonitor = PatientCostUtilityMonitor(parameters=parameters)
+        self.costUtilityMonitor = PatientCostUtilityMonitor(parameters=parameters, payoffs=payoffs)
 
     def update(self, time_step, new_state):
         """
@@ -80,14 +122,18 @@ class PatientStateMonitor:
 
 class PatientCostUtilityMonitor:
 
-    def __init__(self, parameters):
+    def __init__(self, parameters, payoffs=None):
 
         # model parameters for this patient
         self.params = parameters
+        # table of discounted costs and utilities of transitions
+        self.payoffs = payoffs
 
         # total cost and utility
         self.totalDiscountedCost = 0
         self.totalDiscountedUtility = 0
+        # (total cost, total utility) at time horizons
+        self.horizonTotals = {}
 
     def update(self, k, current_state, next_state):
         """ updates the discounted total cost and health utility
@@ -96,115 +142,995 @@ class PatientCostUtilityMonitor:
         :param next_state: next health state
         """
 
-        # update cost
-        cost = 0.5 * (self.params.annualStateCosts[current_state.value] +
-                      self.params.annualStateCosts[next_state.value])
-        # update utility
-        utility = 0.5 * (self.params.annualStateUtilities[current_state.value] +
-                         self.params.annualStateUtilities[next_state.value])
-
-        # add the cost of treatment
-        if next_state == CKDStates.STAGE5:
-            cost += 0.5 * self.params.annualTreatmentCost
-        else:
-            cost += 1 * self.params.annualTreatmentCost
-
-        # update total discounted cost and utility (corrected for the half-cycle effect)
-        self.totalDiscountedCost += Econ.pv_single_payment(payment=cost,
-                                                           discount_rate=self.params.discountRate / 2,
-                                                           discount_period=2 * k + 1)
-        self.totalDiscountedUtility += Econ.pv_single_payment(payment=utility,
-                                                              discount_rate=self.params.discountRate / 2,
-                                                              discount_period=2 * k + 1)
-
+        # discounted cost and utility of this transition (including the cost of
+        # treatment and corrected for the half-cycle effect)
+        cost, utility = self.payoffs.get_discounted_payoffs(k=k,
+                                                            current_state_index=current_state.value,
+                                                            next_state_index=next_state.value)
 
+        # update total discounted cost and utility
+        self.totalDiscountedCost += cost
+        self.totalDiscountedUtility += utility
 
+    def record_horizon(self, horizon):
+        """ records the total discounted cost and utility at a time horizon
+        :param horizon: time horizon (time step)
+        """
+        self.horizonTotals[horizon] = (self.totalDiscountedCost, self.totalDiscountedUtility)
 
 
 class Cohort:
-    def __init__(self, id, pop_size, transition_prob_matrix_one, parameters):
+    def __init__(self, id, pop_size, transition_prob_matrix_one, parameters, rng_streams=None,
+                 keep_observations=True):
         """ create a cohort of patients
         :param id: cohort ID
         :param pop_size: population size of this cohort
         :param transition_prob_matrix_one: transition probability matrix
+        :param rng_streams: (RNGStreams) random number streams of patients
+            (if None, each patient uses a RandomState seeded with id * pop_size + n)
+        :param keep_observations: set to False to only keep the summary statistics of patient outcomes
         """
         self.id = id
         self.popSize = pop_size
         self.transitionProbMatrix = transition_prob_matrix_one
         self.params = parameters
-        self.cohortOutcomes = CohortOutcomes()  # outcomes of this simulated cohort
+        self.rngStreams = rng_streams
+        # outcomes of this simulated cohort
+        self.cohortOutcomes = CohortOutcomes(pop_size=pop_size, keep_observations=keep_observations)
+        self.nPatientSteps = 0  # number of patient-steps simulated
 
-    def simulate(self, n_time_steps):
+    @PROFILER.profile(name='Cohort.simulate')
+    def simulate(self, n_time_steps, horizons=None, stopping_rule=None):
         """ simulate the cohort of patients over the specified number of time-steps
         :param n_time_steps: number of time steps to simulate the cohort
+        :param horizons: (list) time horizons (no more than n_time_steps) at which to also
+            report the cohort outcomes (see CohortOutcomes.horizonOutcomes)
+        :param stopping_rule: (StoppingRule) if provided, patients are simulated in batches until
+            the confidence intervals of mean cost and utility are narrow enough
+            (pop_size is then the maximum number of patients to simulate)
         """
-        # populate the cohort
-        patients = []  # list of patients
-        for i in range(self.popSize):
-            # create a new patient (use id * pop_size + n as patient id)
-            patient = Patient(id=self.id * self.popSize + i,
-                              parameters=self.params, transition_prob_matrix_one=self.transitionProbMatrix)
-            # add the patient to the cohort
 
-            patients.append(patient)
+        horizons = _check_horizons(n_time_steps=n_time_steps, horizons=horizons)
 
-        for patient in patients:
-            patient.simulate(n_time_steps=n_time_steps)
+        # table of discounted payoffs (shared by all patients)
+        payoffs = get_payoff_table(parameters=self.params, n_time_steps=n_time_steps)
 
-            # store outputs of this simulation
-            self.cohortOutcomes.extract_outcome(simulated_patients=patients)
+        # key of this cohort's random number streams
+        if self.rngStreams is not None:
+            cohort_key = self.rngStreams.get_cohort_key(cohort_id=self.id)
+
+        # batches of patients to simulate before checking the stopping rule
+        if stopping_rule is None:
+            batches = [range(self.popSize)]
+        else:
+            batches = stopping_rule.get_batches(n=self.popSize)
+            precision_monitor = PrecisionMonitor(stopping_rule=stopping_rule)
+
+        for batch in batches:
+            # discounted cost and utility of patients in this batch
+            batch_costs = np.empty(len(batch))
+            batch_utilities = np.empty(len(batch))
+
+            for j, i in enumerate(batch):
+                # random number generator of this patient
+                rng = None
+                if self.rngStreams is not None:
+                    rng = self.rngStreams.get_patient_rng(cohort_id=self.id, patient_index=i, cohort_key=cohort_key)
+
+                # create a new patient (use id * pop_size + n as patient id)
+                patient = Patient(id=self.id * self.popSize + i,
+                                  parameters=self.params, transition_prob_matrix_one=self.transitionProbMatrix,
+                                  payoffs=payoffs, rng=rng)
+                # simulate
+                patient.simulate(n_time_steps=n_time_steps, horizons=horizons)
+                self.nPatientSteps += patient.nTimeSteps
+
+                # store outputs of this simulation
+                # (the patient is not kept once its outcomes are extracted)
+                self.cohortOutcomes.extract_outcome(simulated_patient=patient)
+                batch_costs[j] = patient.stateMonitor.costUtilityMonitor.totalDiscountedCost
+                batch_utilities[j] = patient.stateMonitor.costUtilityMonitor.totalDiscountedUtility
+
+            # stop if the estimates are precise enough
+            if stopping_rule is not None:
+                precision_monitor.update(costs=batch_costs, utilities=batch_utilities)
+                if precision_monitor.get_if_precise():
+                    break
 
         # calculate cohort outcomes
-        self.cohortOutcomes.calculate_cohort_outcomes(initial_pop_size=self.popSize)
+        with PROFILER.timer(name='CohortOutcomes.calculate_cohort_outcomes'):
+            self.cohortOutcomes.calculate_cohort_outcomes(initial_pop_size=self.cohortOutcomes.nPatients)
 
+        if PROFILER.enabled:
+            PROFILER.add_count(name='patients', n=self.cohortOutcomes.nPatients)
+            PROFILER.add_count(name='patient-steps', n=self.nPatientSteps)
 
-class CohortOutcomes:
+
+class VectorizedCohort:
+    def __init__(self, id, pop_size, transition_prob_matrix_one, parameters, rng_streams=None,
+                 keep_observations=True, track_exposures=False):
+        """ create a cohort of patients whose states are kept in a single array
+        :param id: cohort ID
+        :param pop_size: population size of this cohort
+        :param transition_prob_matrix_one: transition probability matrix
+        :param parameters: parameters of the selected therapy
+        :param rng_streams: (RNGStreams) random number streams
+            (if None, one RandomState seeded with the cohort ID is used)
+        :param keep_observations: set to False to only keep the summary statistics of patient outcomes
+        :param track_exposures: set to True to also store the discounted time each patient spends
+            in each state and under treatment (see CohortStore)
+        """
+        self.id = id
+        self.popSize = pop_size
+        self.transitionProbMatrix = transition_prob_matrix_one
+        self.params = parameters
+        self.rngStreams = rng_streams
+        self.trackExposures = track_exposures
+        self.store = None       # states and outcomes of all patients (CohortStore)
+        # outcomes of this simulated cohort
+        self.cohortOutcomes = CohortOutcomes(pop_size=pop_size, keep_observations=keep_observations)
+        self.nPatientSteps = 0  # number of patient-steps simulated
+
+    @PROFILER.profile(name='VectorizedCohort.simulate')
+    def simulate(self, n_time_steps, horizons=None):
+        """ simulate all patients of the cohort together over the specified number of time-steps
+        :param n_time_steps: number of time steps to simulate the cohort
+        :param horizons: (list) time horizons (no more than n_time_steps) at which to also
+            report the cohort outcomes (see CohortOutcomes.horizonOutcomes)
+        """
+
+        horizons = _check_horizons(n_time_steps=n_time_steps, horizons=horizons)
+
+        # random numbers (one per patient and time step)
+        uniforms = _get_uniforms(cohort_id=self.id, pop_size=self.popSize, rng_streams=self.rngStreams)
+
+        # current state and outcomes of all patients
+        self.store = CohortStore(pop_size=self.popSize, first_id=self.id * self.popSize,
+                                 track_exposures=self.trackExposures)
+        arm = _CohortArm(store=self.store,
+                         transition_prob_matrix=self.transitionProbMatrix,
+                         payoffs=get_payoff_table(parameters=self.params, n_time_steps=n_time_steps))
+
+        k = 0
+        # while some patients are alive and simulation length is not yet reached
+        while arm.get_n_alive() > 0 and k < n_time_steps:
+            # sample the next state of all living patients with one draw per patient
+            arm.update(k=k, u=uniforms.get_next())
+            k += 1
+
+            # record outcomes if a time horizon is reached
+            if k in horizons:
+                _extract_horizon_outcomes(outcomes=self.cohortOutcomes, store=self.store, horizon=k)
+
+        # outcomes do not change after all patients reach stage 5
+        for horizon in horizons:
+            if horizon > k:
+                _extract_horizon_outcomes(outcomes=self.cohortOutcomes, store=self.store, horizon=horizon)
+        self.nPatientSteps = arm.nPatientSteps
+
+        # store outputs of this simulation
+        with PROFILER.timer(name='CohortOutcomes.calculate_cohort_outcomes'):
+            self.cohortOutcomes.extract_outcomes(survival_times=self.store.get_survival_times(),
+                                                 costs=self.store.costs,
+                                                 utilities=self.store.utilities)
+
+            # calculate cohort outcomes
+            self.cohortOutcomes.calculate_cohort_outcomes(initial_pop_size=self.popSize)
+
+        if PROFILER.enabled:
+            PROFILER.add_count(name='patients', n=self.popSize)
+            PROFILER.add_count(name='patient-steps', n=self.nPatientSteps)
+
+
+class PairedCohort:
+    def __init__(self, id, pop_size,
+                 ref_transition_prob_matrix, ref_parameters,
+                 transition_prob_matrix, parameters, rng_streams=None, track_exposures=False):
+        """ create a cohort of patients to be simulated under two therapies with common random numbers
+        :param id: cohort ID
+        :param pop_size: population size of this cohort
+        :param ref_transition_prob_matrix: transition probability matrix of the reference therapy
+        :param ref_parameters: parameters of the reference therapy
+        :param transition_prob_matrix: transition probability matrix of the alternative therapy
+        :param parameters: parameters of the alternative therapy
+        :param rng_streams: (RNGStreams) random number streams
+            (if None, one RandomState seeded with the cohort ID is used)
+        :param track_exposures: set to True to also store the discounted time each patient spends
+            in each state and under treatment (see CohortStore)
+        """
+        self.id = id
+        self.popSize = pop_size
+        self.refTransitionProbMatrix = ref_transition_prob_matrix
+        self.refParams = ref_parameters
+        self.transitionProbMatrix = transition_prob_matrix
+        self.params = parameters
+        self.rngStreams = rng_streams
+        self.trackExposures = track_exposures
+        self.refStore = None    # states and outcomes of all patients under the reference therapy
+        self.store = None       # states and outcomes of all patients under the alternative therapy
+        self.refCohortOutcomes = CohortOutcomes(pop_size=pop_size)  # outcomes under the reference therapy
+        self.cohortOutcomes = CohortOutcomes(pop_size=pop_size)     # outcomes under the alternative therapy
+        self.statCostDifference = None      # summary statistics of patients' increase in discounted cost
+        self.statUtilityDifference = None   # summary statistics of patients' increase in discounted utility
+        self.nPatientSteps = 0              # number of patient-steps simulated (under both therapies)
+
+    @PROFILER.profile(name='PairedCohort.simulate')
+    def simulate(self, n_time_steps, horizons=None):
+        """ simulate every patient under both therapies using the same random draws
+        :param n_time_steps: number of time steps to simulate the cohort
+        :param horizons: (list) time horizons (no more than n_time_steps) at which to also
+            report the cohort outcomes (see CohortOutcomes.horizonOutcomes)
+        """
+
+        horizons = _check_horizons(n_time_steps=n_time_steps, horizons=horizons)
+
+        # random numbers (one per patient and time step, shared by both therapies)
+        uniforms = _get_uniforms(cohort_id=self.id, pop_size=self.popSize, rng_streams=self.rngStreams)
+
+        # the reference and the alternative therapy
+        self.refStore = CohortStore(pop_size=self.popSize, first_id=self.id * self.popSize,
+                                    track_exposures=self.trackExposures)
+        self.store = CohortStore(pop_size=self.popSize, first_id=self.id * self.popSize,
+                                 track_exposures=self.trackExposures)
+        arms = [_CohortArm(store=self.refStore,
+                           transition_prob_matrix=self.refTransitionProbMatrix,
+                           payoffs=get_payoff_table(parameters=self.refParams, n_time_steps=n_time_steps)),
+                _CohortArm(store=self.store,
+                           transition_prob_matrix=self.transitionProbMatrix,
+                           payoffs=get_payoff_table(parameters=self.params, n_time_steps=n_time_steps))]
+
+        k = 0
+        # while some patients are alive under either therapy and simulation length is not yet reached
+        while arms[0].get_n_alive() + arms[1].get_n_alive() > 0 and k < n_time_steps:
+
+            # one draw per patient, pushed through both therapies' transition probabilities
+            u = uniforms.get_next()
+            arms[0].update(k=k, u=u)
+            arms[1].update(k=k, u=u)
+            k += 1
+
+            # record outcomes of both therapies if a time horizon is reached
+            if k in horizons:
+                for store, outcomes in zip([self.refStore, self.store],
+                                           [self.refCohortOutcomes, self.cohortOutcomes]):
+                    _extract_horizon_outcomes(outcomes=outcomes, store=store, horizon=k)
+
+        # outcomes do not change after all patients reach stage 5
+        for horizon in horizons:
+            if horizon > k:
+                for store, outcomes in zip([self.refStore, self.store],
+                                           [self.refCohortOutcomes, self.cohortOutcomes]):
+                    _extract_horizon_outcomes(outcomes=outcomes, store=store, horizon=horizon)
+        self.nPatientSteps = arms[0].nPatientSteps + arms[1].nPatientSteps
+
+        # store outputs of this simulation
+        for store, outcomes in zip([self.refStore, self.store], [self.refCohortOutcomes, self.cohortOutcomes]):
+            outcomes.extract_outcomes(survival_times=store.get_survival_times(),
+                                      costs=store.costs,
+                                      utilities=store.utilities)
+            outcomes.calculate_cohort_outcomes(initial_pop_size=self.popSize)
+
+        # summary statistics of paired differences
+        # (the outcomes of patient i under both therapies come from the same draws, so the
+        # differences are taken patient by patient once both therapies are simulated)
+        self.statCostDifference = Stat.DifferenceStatPaired(
+            name='Increase in discounted cost',
+            x=self.cohortOutcomes.costs,
+            y_ref=self.refCohortOutcomes.costs)
+        self.statUtilityDifference = Stat.DifferenceStatPaired(
+            name='Increase in discounted utility',
+            x=self.cohortOutcomes.utilities,
+            y_ref=self.refCohortOutcomes.utilities)
+
+
+# number of patients whose outcomes are kept before they are summarized
+# (if a cohort does not keep the outcomes of every patient)
+STREAMING_BUFFER_SIZE = 4096
+
+
+def _check_horizons(n_time_steps, horizons):
+    """
+    :param n_time_steps: number of time steps to simulate
+    :param horizons: (list or None) time horizons at which to report outcomes
+    :return: (tuple) sorted time horizons
+    """
+
+    if horizons is None:
+        return ()
+    horizons = tuple(sorted(set(horizons)))
+    if len(horizons) > 0 and (horizons[0] < 1 or horizons[-1] > n_time_steps):
+        raise ValueError('Time horizons should be between 1 and the number of simulated time steps.')
+    return horizons
+
+
+def _extract_horizon_outcomes(outcomes, store, horizon):
+    """ extracts the outcomes of a cohort simulated as a whole at a time horizon
+    :param outcomes: (CohortOutcomes) outcomes of the cohort
+    :param store: (CohortStore) states and outcomes of all patients
+    :param horizon: time horizon
+    """
+    outcomes.extract_horizon_outcomes(horizon=horizon,
+                                      survival_times=store.get_survival_times(),
+                                      costs=store.costs,
+                                      utilities=store.utilities)
+
+
+def _get_uniforms(cohort_id, pop_size, rng_streams):
+    """
+    :param cohort_id: cohort ID
+    :param pop_size: population size of the cohort
+    :param rng_streams: (RNGStreams) random number streams
+        (if None, one RandomState seeded with the cohort ID is used)
+    :return: an object whose get_next() returns one uniform random number per patient
+    """
+
+    if rng_streams is not None:
+        return rng_streams.get_uniforms(cohort_id=cohort_id, n_patients=pop_size)
+    else:
+        return _RandomStateUniforms(rng=np.random.RandomState(seed=cohort_id), pop_size=pop_size)
+
+
+class _RandomStateUniforms:
+    """ one uniform random number per patient drawn from a RandomState """
+    def __init__(self, rng, pop_size):
+        self._rng = rng
+        self._popSize = pop_size
+
+    def get_next(self):
+        return self._rng.random_sample(self._popSize)
+
+
+class CohortStore:
+    """ states and outcomes of all patients of a cohort stored as columns (one element per patient) """
+    def __init__(self, pop_size, first_id=0, track_exposures=False):
+        """
+        :param pop_size: population size of the cohort
+        :param first_id: ID of the first patient (patient i has ID first_id + i)
+        :param track_exposures: set to True to also store the discounted time each patient spends
+            in each state and under treatment (to re-price the cohort, see PriceSweepClasses)
+        """
+
+        self.firstID = first_id
+        self.states = np.full(pop_size, CKDStates.STAGE1.value, dtype=np.uint8)    # current health states
+        self.survivalTimes = np.full(pop_size, np.nan, dtype=np.float32)            # survival times
+        self.costs = np.zeros(pop_size)                                             # discounted costs
+        self.utilities = np.zeros(pop_size)                                         # discounted utilities
+        self.stateTimes = None              # discounted time in each state (one row per patient)
+        self.treatmentExposures = None      # discounted time under treatment
+        if track_exposures:
+            self.stateTimes = np.zeros((pop_size, len(CKDStates)))
+            self.treatmentExposures = np.zeros(pop_size)
+
+    def __len__(self):
+        return len(self.states)
+
+    def get_nbytes(self):
+        """ :return: number of bytes used to store the patients """
+        n_bytes = self.states.nbytes + self.survivalTimes.nbytes + self.costs.nbytes + self.utilities.nbytes
+        if self.stateTimes is not None:
+            n_bytes += self.stateTimes.nbytes + self.treatmentExposures.nbytes
+        return n_bytes
+
+    def get_survival_times(self):
+        """ :return: survival times of patients who reached stage 5 """
+        return self.survivalTimes[~np.isnan(self.survivalTimes)]
+
+    def get_patient(self, i):
+        """
+        :param i: index of a patient in this cohort
+        :return: (PatientView) a view of the i-th patient (for debugging)
+        """
+        return PatientView(store=self, index=i)
+
+
+class PatientView:
+    """ a patient stored in a CohortStore, with the attributes of Patient, PatientStateMonitor,
+    and PatientCostUtilityMonitor that are used to inspect a simulated patient """
+    def __init__(self, store, index):
+
+        self._store = store
+        self._index = index
+        self.id = store.firstID + index
+
+    @property
+    def stateMonitor(self):
+        return self
+
+    @property
+    def costUtilityMonitor(self):
+        return self
+
+    @property
+    def currentState(self):
+        return CKDStates(int(self._store.states[self._index]))
+
+    @property
+    def survivalTime(self):
+        survival_time = self._store.survivalTimes[self._index]
+        return None if np.isnan(survival_time) else float(survival_time)
+
+    @property
+    def totalDiscountedCost(self):
+        return float(self._store.costs[self._index])
+
+    @property
+    def totalDiscountedUtility(self):
+        return float(self._store.utilities[self._index])
+
+    @property
+    def horizonTotals(self):
+        # totals at time horizons are only kept for the whole cohort (see CohortOutcomes.horizonOutcomes)
+        return {}
+
+    def get_if_alive(self):
+        """ returns true if the patient is still alive """
+        return self.currentState != CKDStates.STAGE5
+
+
+class _CohortArm:
+    """ a cohort simulated as a whole under one therapy
+    (only patients who have not reached stage 5 are moved at each time step) """
+    def __init__(self, store, transition_prob_matrix, payoffs):
+        """
+        :param store: (CohortStore) states and outcomes of all patients
+        :param transition_prob_matrix: transition probability matrix
+        :param payoffs: (PayoffTable) discounted costs and utilities of transitions
+        """
+
+        self.store = store
+        self.payoffs = payoffs
+        # indices of patients who have not reached stage 5
+        self.aliveIndices = np.flatnonzero(store.states != CKDStates.STAGE5.value)
+        self.nPatientSteps = 0  # number of patient-steps simulated
+
+        # cumulative transition probabilities out of each state
+        self.cumProbs = get_cumulative_probs(transition_prob_matrix)
+
+    def get_n_alive(self):
+        """ :return: number of patients who have not reached stage 5 """
+        return len(self.aliveIndices)
+
+    @PROFILER.profile(name='_CohortArm.update')
+    def update(self, k, u):
+        """ moves all living patients to their next state
+        :param k: simulation time step
+        :param u: one uniform random draw per patient (including those who reached stage 5)
+        """
+
+        alive = self.aliveIndices
+        states = self.store.states[alive]
+
+        # sample the next state of living patients
+        new_states = get_next_states(cum_probs=self.cumProbs[states], u=u[alive])
+
+        # discounted cost and utility of this time step
+        cost, utility = self.payoffs.get_discounted_payoffs(k=k,
+                                                            current_state_index=states,
+                                                            next_state_index=new_states)
+        self.store.costs[alive] += cost
+        self.store.utilities[alive] += utility
+        if self.store.stateTimes is not None:
+            self._update_exposures(k=k, alive=alive, states=states, new_states=new_states)
+
+        # update current health states
+        self.store.states[alive] = new_states
+        self.nPatientSteps += len(alive)
+
+        # update survival time of patients who reached stage 5 during this time step
+        # (corrected for the half-cycle effect) and drop them from the living patients
+        reached_stage5 = new_states == CKDStates.STAGE5.value
+        if reached_stage5.any():
+            self.store.survivalTimes[alive[reached_stage5]] = k + 0.5
+            self.aliveIndices = alive[~reached_stage5]
+
+    def _update_exposures(self, k, alive, states, new_states):
+        """ adds the discounted time of time step k to the state and treatment exposures of living patients
+        (so that the discounted cost is stateTimes @ annual state costs + treatmentExposures * annual
+        treatment cost, and the discounted utility is stateTimes @ annual state utilities) """
+
+        discount = self.payoffs.discountFactors[k]
+        # each transition is valued at the average of its current and next state
+        self.store.stateTimes[alive, states] += 0.5 * discount
+        self.store.stateTimes[alive, new_states] += 0.5 * discount
+        # treatment is paid for half a year if the patient moves to stage 5
+        self.store.treatmentExposures[alive] += np.where(
+            new_states == CKDStates.STAGE5.value, 0.5 * discount, discount)
+
+
+def get_cumulative_probs(transition_prob_matrix):
+    """
+    :param transition_prob_matrix: transition probability matrix (or an array of matrices, one per cohort)
+    :return: (array) cumulative transition probabilities out of each state
+        (the last column is set to 1 to protect against rounding errors)
+    """
+
+    cum_probs = np.cumsum(np.array(transition_prob_matrix, dtype=float), axis=-1)
+    cum_probs[..., -1] = 1
+    return cum_probs
+
+
+def get_next_states(cum_probs, u):
+    """
+    :param cum_probs: cumulative transition probabilities out of the current state of each patient
+        (one row per patient, see get_cumulative_probs)
+    :param u: one uniform random draw per patient
+    :return: (array) next state of each patient
+        (the first state whose cumulative probability exceeds the draw)
+    """
+    return (cum_probs <= u[:, np.newaxis]).sum(axis=1, dtype=np.uint8)
+
+
+class CohortTrace:
+    def __init__(self, pop_size, transition_prob_matrix_one, parameters):
+        """ create a deterministic cohort trace (expected state occupancy of the cohort over time)
+        :param pop_size: population size of this cohort (only used to scale the survival curve)
+        :param transition_prob_matrix_one: transition probability matrix
+        :param parameters: parameters of the selected therapy
+        """
+        self.popSize = pop_size
+        self.transitionProbMatrix = transition_prob_matrix_one
+        self.params = parameters
+        self.cohortOutcomes = CohortTraceOutcomes()  # outcomes of this cohort trace
+
+    @PROFILER.profile(name='CohortTrace.simulate')
+    def simulate(self, n_time_steps, horizons=None):
+        """ calculates the exact expected outcomes of the cohort over the specified number of time-steps
+        :param n_time_steps: number of time steps to trace the cohort
+        :param horizons: (list) time horizons (no more than n_time_steps) at which to also
+            report the cohort outcomes (see CohortTraceOutcomes.horizonOutcomes)
+        """
+
+        horizons = _check_horizons(n_time_steps=n_time_steps, horizons=horizons)
+
+        prob_matrix = np.array(self.transitionProbMatrix, dtype=float)
+        n_states = len(prob_matrix)
+        stage5 = CKDStates.STAGE5.value
+
+        # expected state occupancy at the beginning of each time step (row k is time k)
+        state_probs = np.zeros((n_time_steps + 1, n_states))
+        state_probs[0, CKDStates.STAGE1.value] = 1
+        for k in range(n_time_steps):
+            state_probs[k + 1] = state_probs[k] @ prob_matrix
+
+        # discounted costs and utilities of transitions
+        payoffs = get_payoff_table(parameters=self.params, n_time_steps=n_time_steps)
+
+        # expected cost and utility of one time step spent in each state
+        # (patients in stage 5 accrue no cost or utility)
+        expected_costs = (prob_matrix * payoffs.transitionCosts).sum(axis=1)
+        expected_utilities = (prob_matrix * payoffs.transitionUtilities).sum(axis=1)
+
+        # discount factors (corrected for the half-cycle effect)
+        discount_factors = payoffs.discountFactors
+
+        # probability of reaching stage 5 during each time step
+        probs_stage5 = np.diff(state_probs[:, stage5])
+
+        self.cohortOutcomes.calculate_cohort_outcomes(
+            pop_size=self.popSize,
+            state_probs=state_probs,
+            probs_stage5=probs_stage5,
+            discounted_costs=discount_factors * (state_probs[:-1] @ expected_costs),
+            discounted_utilities=discount_factors * (state_probs[:-1] @ expected_utilities),
+            horizons=horizons)
+
+
+class CohortTraceOutcomes:
     def __init__(self):
 
-        self.survivalTimes = []             # patients' survival times
+        self.stateProbs = None          # expected state occupancy over time
+        self.probStage5 = None          # probability of reaching stage 5 by the end of simulation
+        self.meanSurvivalTime = None    # expected survival time of patients who reach stage 5
+        self.meanCost = None            # expected discounted cost
+        self.meanUtility = None         # expected discounted utility
+        self.nLivingPatients = None     # survival curve (expected number of alive patients over time)
+        self.horizonOutcomes = {}       # dictionary of outcomes (HorizonOutcomes) at time horizons
+
+    def calculate_cohort_outcomes(self, pop_size, state_probs, probs_stage5,
+                                  discounted_costs, discounted_utilities, horizons=()):
+        """ calculates the cohort outcomes
+        :param pop_size: population size
+        :param state_probs: expected state occupancy at the beginning of each time step
+        :param probs_stage5: probability of reaching stage 5 during each time step
+        :param discounted_costs: expected discounted cost of each time step
+        :param discounted_utilities: expected discounted utility of each time step
+        :param horizons: time horizons at which to report the expected outcomes
+        """
+
+        self.stateProbs = state_probs
+        self.probStage5 = probs_stage5.sum()
+
+        # expected survival time (corrected for the half-cycle effect) of patients who reach stage 5
+        if self.probStage5 > 0:
+            self.meanSurvivalTime = (probs_stage5 @ (np.arange(len(probs_stage5)) + 0.5)) / self.probStage5
+
+        self.meanCost = discounted_costs.sum()
+        self.meanUtility = discounted_utilities.sum()
+
+        # survival curve
+        self.nLivingPatients = pop_size * (1 - state_probs[:, CKDStates.STAGE5.value])
+
+        # expected outcomes at time horizons
+        for horizon in horizons:
+            outcomes = HorizonOutcomes(horizon=horizon)
+            outcomes.nPatients = pop_size
+            outcomes.nStage5 = pop_size * probs_stage5[:horizon].sum()
+            outcomes.nLivingPatients = self.nLivingPatients[horizon]
+            if outcomes.nStage5 > 0:
+                outcomes.meanSurvivalTime = \
+                    (probs_stage5[:horizon] @ (np.arange(horizon) + 0.5)) / probs_stage5[:horizon].sum()
+            outcomes.meanCost = discounted_costs[:horizon].sum()
+            outcomes.meanUtility = discounted_utilities[:horizon].sum()
+            self.horizonOutcomes[horizon] = outcomes
+
+
+class TimeToStage5:
+    def __init__(self, transition_prob_matrix_one, initial_state=CKDStates.STAGE1):
+        """ calculates the exact distribution of time until stage 5 from the fundamental matrix
+        of the absorbing Markov chain (e.g. to validate simulated survival times)
+        :param transition_prob_matrix_one: transition probability matrix of the selected therapy
+        :param initial_state: (CKDStates) stage at the beginning of the simulation
+        """
+
+        prob_matrix = np.array(transition_prob_matrix_one, dtype=float)
+        stage5 = CKDStates.STAGE5.value
+        transient = [s.value for s in CKDStates if s != CKDStates.STAGE5]
+
+        self.initialState = initial_state
+        # transition probabilities between stages 1-4 and from stages 1-4 to stage 5
+        self._q = prob_matrix[np.ix_(transient, transient)]
+        self._r = prob_matrix[transient, stage5]
+
+        # fundamental matrix N = (I - Q)^-1
+        # (N[i, j] is the expected number of years spent in stage j when starting in stage i)
+        identity = np.identity(len(transient))
+        try:
+            self.fundamentalMatrix = np.linalg.inv(identity - self._q)
+        except np.linalg.LinAlgError:
+            raise ValueError('Stage 5 cannot be reached from every stage under this transition matrix.')
+
+        # mean and variance of the number of time steps until stage 5 from each starting stage
+        self.meanTimeSteps = self.fundamentalMatrix.sum(axis=1)
+        self.varTimeSteps = (2 * self.fundamentalMatrix - identity) @ self.meanTimeSteps - self.meanTimeSteps ** 2
+
+        # mean and variance of survival time from the selected initial stage
+        # (reaching stage 5 at time step k is recorded as a survival time of k + 0.5
+        # to correct for the half-cycle effect, as in PatientStateMonitor)
+        self.meanSurvivalTime = self.meanTimeSteps[initial_state.value] - 0.5
+        self.varSurvivalTime = self.varTimeSteps[initial_state.value]
+
+    def get_mean_survival_time(self, initial_state):
+        """
+        :param initial_state: (CKDStates) stage at the beginning of the simulation
+        :return: mean survival time (corrected for the half-cycle effect) when starting from initial_state
+        """
+        return self.meanTimeSteps[initial_state.value] - 0.5
+
+    def get_survival_time_probs(self, n_time_steps=None, tolerance=1e-12):
+        """
+        :param n_time_steps: number of time steps to calculate the probabilities for
+            (if None, continues until the probability of not having reached stage 5 drops below tolerance)
+        :param tolerance: probability of not having reached stage 5 at which to stop
+        :return: (survival times, probabilities) where probabilities[k] is the probability of
+            reaching stage 5 during time step k (survival time k + 0.5)
+        """
+
+        # distribution over stages 1-4 at the beginning of the current time step
+        probs_alive = np.zeros(len(self._r))
+        probs_alive[self.initialState.value] = 1
+
+        probs = []
+        while (n_time_steps is None and probs_alive.sum() > tolerance) or \
+                (n_time_steps is not None and len(probs) < n_time_steps):
+            probs.append(probs_alive @ self._r)
+            probs_alive = probs_alive @ self._q
+
+        return np.arange(len(probs)) + 0.5, np.array(probs)
+
+
+class CohortOutcomes:
+    def __init__(self, pop_size, keep_observations=True):
+        """ collects the outcomes of simulated patients one patient at a time
+        :param pop_size: number of patients to be extracted (used to preallocate arrays)
+        :param keep_observations: set to False to only keep the summary statistics of outcomes
+            (StreamingStat) and not the survival time, cost and utility of every patient
+        """
+
+        self.keepObservations = keep_observations
+        self.nPatients = 0                  # number of patients extracted so far
+        self.nSurvivalTimes = 0             # number of patients who reached stage 5
+        if not keep_observations:
+            # outcomes are summarized every STREAMING_BUFFER_SIZE patients
+            pop_size = min(pop_size, STREAMING_BUFFER_SIZE)
+        self._survivalTimes = np.empty(pop_size)    # patients' survival times
+        self._costs = np.empty(pop_size)            # patients' discounted costs
+        self._utilities = np.empty(pop_size)        # patients' discounted utilities
+        # number of patients (and survival times) in the arrays above
+        self._nBuffered = 0
+        self._nBufferedSurvivalTimes = 0
+        # number of survival times at each time step (if observations are not kept)
+        self._survivalTimeCounts = np.zeros(0, dtype=int)
+
+        # running sums
+        self.totalSurvivalTime = 0
+        self.totalCost = 0
+        self.totalUtility = 0
+
         self.meanSurvivalTime = None        # mean survival times
-        self.nLivingPatients = None         # survival curve (sample path of number of alive patients over time)
-        self.costs = []
-        self.utilities = []
+        self.meanCost = None                # mean discounted cost
+        self.meanUtility = None             # mean discounted utility
+        self.survivalCurve = None           # survival curve (SurvivalCurve)
+        self._nLivingPatients = None        # survival curve as a sample path (made when first used)
         self.statCost = None
         self.statUtility = None
         self.statSurvivalTime = None
+        if not keep_observations:
+            self.statCost = StreamingStat(name='Discounted cost')
+            self.statUtility = StreamingStat(name='Discounted utility')
+            self.statSurvivalTime = StreamingStat(name='Survival time')
+        self.horizonOutcomes = {}           # dictionary of outcomes (HorizonOutcomes) at time horizons
+
+    @property
+    def nLivingPatients(self):
+        """ survival curve (sample path of number of alive patients over time) """
+        if self._nLivingPatients is None and self.survivalCurve is not None:
+            self._nLivingPatients = self.survivalCurve.get_sample_path(name='# of living patients')
+        return self._nLivingPatients
+
+    @property
+    def survivalTimes(self):
+        """ survival times of patients who reached stage 5 (None if observations are not kept) """
+        if not self.keepObservations:
+            return None
+        return self._survivalTimes[:self.nSurvivalTimes]
+
+    @property
+    def costs(self):
+        """ discounted costs of all extracted patients (None if observations are not kept) """
+        if not self.keepObservations:
+            return None
+        return self._costs[:self.nPatients]
+
+    @property
+    def utilities(self):
+        """ discounted utilities of all extracted patients (None if observations are not kept) """
+        if not self.keepObservations:
+            return None
+        return self._utilities[:self.nPatients]
+
+    def _reserve(self, n):
+        """ makes sure the preallocated arrays have room for n more patients """
+
+        size = len(self._costs)
+        if self._nBuffered + n > size:
+            if not self.keepObservations:
+                # summarize the patients in the arrays to make room for new patients
+                self._summarize_buffered()
+                return
+            new_size = max(2 * size, self._nBuffered + n)
+            self._survivalTimes = np.resize(self._survivalTimes, new_size)
+            self._costs = np.resize(self._costs, new_size)
+            self._utilities = np.resize(self._utilities, new_size)
+
+    def _summarize_buffered(self):
+        """ adds the patients in the arrays to the summary statistics and empties the arrays """
 
-    def extract_outcome(self, simulated_patients):
+        self._summarize(survival_times=self._survivalTimes[:self._nBufferedSurvivalTimes],
+                        costs=self._costs[:self._nBuffered],
+                        utilities=self._utilities[:self._nBuffered])
+        self._nBuffered = 0
+        self._nBufferedSurvivalTimes = 0
+
+    def _summarize(self, survival_times, costs, utilities):
+        """ adds outcomes to the summary statistics """
+
+        # survival times are k + 0.5 where k is the time step in which stage 5 is reached
+        counts = np.bincount(np.asarray(survival_times, dtype=int))
+        if len(counts) > len(self._survivalTimeCounts):
+            self._survivalTimeCounts = np.concatenate(
+                [self._survivalTimeCounts, np.zeros(len(counts) - len(self._survivalTimeCounts), dtype=int)])
+        self._survivalTimeCounts[:len(counts)] += counts
+
+        self.statSurvivalTime.add(survival_times)
+        self.statCost.add(costs)
+        self.statUtility.add(utilities)
+
+    def extract_outcome(self, simulated_patient):
         """ extracts outcomes of a simulated patient
-        :param simulated_patients: a list of simulated patients"""
+        :param simulated_patient: a simulated patient"""
+
+        self._reserve(1)
+
+        # record survival time
+        survival_time = simulated_patient.stateMonitor.survivalTime
+        if survival_time is not None:
+            self._survivalTimes[self._nBufferedSurvivalTimes] = survival_time
+            self._nBufferedSurvivalTimes += 1
+            self.nSurvivalTimes += 1
+            self.totalSurvivalTime += survival_time
+
+        # record discounted cost and utility
+        cost = simulated_patient.stateMonitor.costUtilityMonitor.totalDiscountedCost
+        utility = simulated_patient.stateMonitor.costUtilityMonitor.totalDiscountedUtility
+        self._costs[self._nBuffered] = cost
+        self._utilities[self._nBuffered] = utility
+        self.totalCost += cost
+        self.totalUtility += utility
+
+        self._nBuffered += 1
+        self.nPatients += 1
+
+        # record outcomes at time horizons
+        for horizon, (cost, utility) in simulated_patient.stateMonitor.costUtilityMonitor.horizonTotals.items():
+            if survival_time is not None and survival_time < horizon:
+                survival_times = [survival_time]
+            else:
+                survival_times = []
+            self._get_horizon_outcomes(horizon=horizon).extract_outcomes(
+                n_patients=1, survival_times=survival_times, total_cost=cost, total_utility=utility)
+
+    def extract_horizon_outcomes(self, horizon, survival_times, costs, utilities):
+        """ extracts outcomes of a cohort simulated as a whole at a time horizon
+        :param horizon: time horizon
+        :param survival_times: survival times of patients who reached stage 5 by the time horizon
+        :param costs: discounted costs of all patients accumulated by the time horizon
+        :param utilities: discounted utilities of all patients accumulated by the time horizon
+        """
+
+        self._get_horizon_outcomes(horizon=horizon).extract_outcomes(
+            n_patients=len(costs), survival_times=survival_times,
+            total_cost=float(np.sum(costs)), total_utility=float(np.sum(utilities)))
+
+    def _get_horizon_outcomes(self, horizon):
+        """ :return: (HorizonOutcomes) outcomes at the time horizon """
+        if horizon not in self.horizonOutcomes:
+            self.horizonOutcomes[horizon] = HorizonOutcomes(horizon=horizon)
+        return self.horizonOutcomes[horizon]
+
+    def extract_outcomes(self, survival_times, costs, utilities):
+        """ extracts outcomes of a cohort simulated as a whole
+        :param survival_times: survival times of patients who reached stage 5
+        :param costs: discounted costs of all patients
+        :param utilities: discounted utilities of all patients
+        """
+
+        n = len(costs)
+        n_survival_times = len(survival_times)
 
-        # record survival time and time until post stroke health state
-        for patient in simulated_patients:
-            if patient.stateMonitor.survivalTime is not None:
-                self.survivalTimes.append(patient.stateMonitor.survivalTime)
-        # if simulated_patient.stateMonitor.timeToStage5 is not None:
-        #     self.timesToStage5.append(simulated_patient.stateMonitor.timeToPostStroke)
-                self.costs.append(patient.stateMonitor.costUtilityMonitor.totalDiscountedCost)
-                self.utilities.append(patient.stateMonitor.costUtilityMonitor.totalDiscountedUtility)
+        if self.keepObservations:
+            self._reserve(n)
+            self._survivalTimes[self._nBufferedSurvivalTimes:self._nBufferedSurvivalTimes + n_survival_times] = \
+                survival_times
+            self._costs[self._nBuffered:self._nBuffered + n] = costs
+            self._utilities[self._nBuffered:self._nBuffered + n] = utilities
+            self._nBufferedSurvivalTimes += n_survival_times
+            self._nBuffered += n
+        else:
+            # summarize without copying
+            self._summarize(survival_times=survival_times, costs=costs, utilities=utilities)
 
+        self.nSurvivalTimes += n_survival_times
+        self.nPatients += n
+        self.totalSurvivalTime += float(np.sum(survival_times))
+        self.totalCost += float(np.sum(costs))
+        self.totalUtility += float(np.sum(utilities))
 
     def calculate_cohort_outcomes(self, initial_pop_size):
         """ calculates the cohort outcomes
         :param initial_pop_size: initial population size
         """
 
-        # calculate mean survival time
-        self.meanSurvivalTime = sum(self.survivalTimes) / len(self.survivalTimes)
+        # calculate mean survival time (if any patient reached stage 5), cost and utility
+        if self.nSurvivalTimes > 0:
+            self.meanSurvivalTime = self.totalSurvivalTime / self.nSurvivalTimes
+        self.meanCost = self.totalCost / self.nPatients
+        self.meanUtility = self.totalUtility / self.nPatients
 
-        self.statSurvivalTime = Stat.SummaryStat(
-            name='Survival time', data=self.survivalTimes)
+        if self.keepObservations:
+            if self.nSurvivalTimes > 0:
+                self.statSurvivalTime = Stat.SummaryStat(
+                    name='Survival time', data=self.survivalTimes)
+            self.statCost = Stat.SummaryStat(
+                name='Discounted cost', data=self.costs)
+            self.statUtility = Stat.SummaryStat(
+                name='Discounted utility', data=self.utilities)
+        else:
+            self._summarize_buffered()
+            if self.nSurvivalTimes == 0:
+                self.statSurvivalTime = None
 
-        self.statCost = Stat.SummaryStat(
-            name='Discounted cost', data=self.costs)
-        self.statUtility = Stat.SummaryStat(
-            name='Discounted utility', data=self.utilities)
+        # outcomes at time horizons
+        for outcomes in self.horizonOutcomes.values():
+            outcomes.calculate_outcomes()
 
-# survival curve
-        self.nLivingPatients = Path.PrevalencePathBatchUpdate(
-            name='# of living patients',
-            initial_size=initial_pop_size,
-            times_of_changes=self.survivalTimes,
-            increments=[-1]*len(self.survivalTimes)
-        )
+        # survival curve (from the number of patients who reached stage 5 in each time step)
+        if self.keepObservations:
+            self._survivalTimeCounts = np.bincount(self.survivalTimes.astype(int))
+        self.survivalCurve = SurvivalCurve(initial_size=initial_pop_size,
+                                           n_absorbed=self._survivalTimeCounts)
+        self._nLivingPatients = None
+
+
+class HorizonOutcomes:
+    """ cohort outcomes accumulated up to a time horizon """
+    def __init__(self, horizon):
+
+        self.horizon = horizon              # time horizon
+        self.nPatients = 0                  # number of patients
+        self.nStage5 = 0                    # number of patients who reached stage 5 by the time horizon
+        self.totalSurvivalTime = 0          # total survival time of patients who reached stage 5
+        self.totalCost = 0                  # total discounted cost
+        self.totalUtility = 0               # total discounted utility
+
+        self.nLivingPatients = None         # number of patients alive at the time horizon
+        self.meanSurvivalTime = None        # mean survival time of patients who reached stage 5
+        self.meanCost = None                # mean discounted cost
+        self.meanUtility = None             # mean discounted utility
+
+    def extract_outcomes(self, n_patients, survival_times, total_cost, total_utility):
+        """ extracts outcomes of simulated patients at this time horizon
+        :param n_patients: number of patients
+        :param survival_times: survival times of patients who reached stage 5 by the time horizon
+        :param total_cost: total discounted cost of patients by the time horizon
+        :param total_utility: total discounted utility of patients by the time horizon
+        """
+
+        self.nPatients += n_patients
+        self.nStage5 += len(survival_times)
+        self.totalSurvivalTime += float(np.sum(survival_times))
+        self.totalCost += total_cost
+        self.totalUtility += total_utility
+
+    def calculate_outcomes(self):
+        """ calculates the outcomes at this time horizon """
+
+        self.nLivingPatients = self.nPatients - self.nStage5
+        if self.nStage5 > 0:
+            self.meanSurvivalTime = self.totalSurvivalTime / self.nStage5
+        self.meanCost = self.totalCost / self.nPatients
+        self.meanUtility = self.totalUtility / self.nPatients
 
+
+class SurvivalCurve:
+    """ number of living patients over time, kept as the number of patients
+    who reached stage 5 during each time step """
+    def __init__(self, initial_size, n_absorbed):
+        """
+        :param initial_size: initial population size
+        :param n_absorbed: number of patients who reached stage 5 during time steps 0, 1, 2, ...
+        """
+
+        self.initialSize = initial_size
+        self.nAbsorbed = np.asarray(n_absorbed, dtype=int)
+
+    def get_n_living(self, n_time_steps=None):
+        """
+        :param n_time_steps: number of time steps (if None, up to the last time step
+            in which a patient reached stage 5)
+        :return: (array) number of living patients at times 0, 1, ..., n_time_steps
+        """
+
+        if n_time_steps is None:
+            n_time_steps = len(self.nAbsorbed)
+        n_absorbed = np.zeros(n_time_steps, dtype=int)
+        n = min(n_time_steps, len(self.nAbsorbed))
+        n_absorbed[:n] = self.nAbsorbed[:n]
+        return self.initialSize - np.concatenate([[0], np.cumsum(n_absorbed)])
+
+    def get_sample_path(self, name='# of living patients'):
+        """
+        :param name: name of the sample path
+        :return: (PrevalencePathBatchUpdate) the survival curve as a sample path to plot
+            (patients reaching stage 5 during time step k are removed at time k + 0.5)
+        """
+
+        # imported here so that runs that make no figure do not import the plotting modules
+        import SimPy.Plots.SamplePaths as Path
+
+        time_steps = np.flatnonzero(self.nAbsorbed)
+        return Path.PrevalencePathBatchUpdate(
+            name=name,
+            initial_size=self.initialSize,
+            times_of_changes=(time_steps + 0.5).tolist(),
+            increments=(-self.nAbsorbed[time_steps]).tolist()
+        )
@@ -1,56 +1,84 @@
+import time
+
 import numpy as np
 
 import SimPy.Markov as Markov
-import SimPy.Plots.SamplePaths as Path
 from InputDataNoTreatment import CKDStates
-import SimPy.EconEval as Econ
-import SimPy.Statistics as Stat
+from PayoffClasses import PayoffTable, get_payoff_table
+from MarkovModelClasses import CohortOutcomes, SurvivalCurve, get_cumulative_probs, get_next_states
+from ProfilerClasses import PROFILER
 
 
 class Patient:
-    def __init__(self, id, transition_prob_matrix_one, parameters):
+    def __init__(self, id, transition_prob_matrix_one, parameters, payoffs=None, rng=None):
         """ initiates a patient
         :param id: ID of the patient
         :param transition_prob_matrix_one: transition probability matrix
+        :param payoffs: (PayoffTable) discounted payoffs shared by the patients of a cohort
+            (if None, the table is made when the patient is simulated)
+        :param rng: random number generator of this patient (e.g. from RNGStreams.get_patient_rng)
+            (if None, a RandomState seeded with the patient ID is used)
         """
         self.id = id
         self.transProbMatrix = transition_prob_matrix_one
         self.params = parameters
-        self.stateMonitor = PatientStateMonitor(parameters=parameters)
+        self.rng = rng
+        self.stateMonitor = PatientStateMonitor(parameters=parameters, payoffs=payoffs)
+        self.nTimeSteps = 0     # number of time steps simulated before the patient reached stage 5
 
     def simulate(self, n_time_steps):
         """ simulate the patient over the specified simulation length """
 
+        # table of discounted payoffs
+        if self.stateMonitor.costUtilityMonitor.payoffs is None:
+            self.stateMonitor.costUtilityMonitor.payoffs = get_payoff_table(
+                parameters=self.params, n_time_steps=n_time_steps)
+
         # random number generator
-        rng = np.random.RandomState(seed=self.id)
+        rng = self.rng
+        if rng is None:
+            rng = np.random.RandomState(seed=self.id)
         # jump process
         markov_jump = Markov.MarkovJumpProcess(transition_prob_matrix=self.transProbMatrix)
 
         k = 0  # simulation time step
+        profiling = PROFILER.enabled  # to time state transitions and payoffs
 
         # while the patient is alive and simulation length is not yet reached
         while self.stateMonitor.get_if_alive() and k < n_time_steps:
 
+            if profiling:
+                start = time.perf_counter()
+
             # sample from the Markov jump process to get a new state
             # (returns an integer from {0, 1, 2, ...})
             new_state_index = markov_jump.get_next_state(
                 current_state_index=self.stateMonitor.currentState.value,
                 rng=rng)
 
+            if profiling:
+                transition_end = time.perf_counter()
+
             # update health state
             self.stateMonitor.update(time_step=k, new_state=CKDStates(new_state_index))
 
+            if profiling:
+                PROFILER.add_time(name='MarkovJumpProcess.get_next_state', seconds=transition_end - start)
+                PROFILER.add_time(name='PatientStateMonitor.update', seconds=time.perf_counter() - transition_end)
+
             # increment time
             k += 1
 
+        self.nTimeSteps = k
+
 
 class PatientStateMonitor:
     """ to update patient outcomes (years survived, cost, etc.) throughout the simulation """
-    def __init__(self, parameters):
+    def __init__(self, parameters, payoffs=None):
 
         self.currentState = CKDStates.STAGE1    # current health state
         self.survivalTime = None                # survival time
-        self.costUtilityMonitor = PatientCostUtilityMonitor(parameters=parameters)
+        self.costUtilityMonitor = PatientCostUtilityMonitor(parameters=parameters, payoffs=payoffs)
 
     def update(self, time_step, new_state):
         """
@@ -80,14 +108,18 @@ class PatientStateMonitor:
 
 class PatientCostUtilityMonitor:
 
-    def __init__(self, parameters):
+    def __init__(self, parameters, payoffs=None):
 
         # model parameters for this patient
         self.params = parameters
+        # table of discounted costs and utilities of transitions
+        self.payoffs = payoffs
 
         # total cost and utility
         self.totalDiscountedCost = 0
         self.totalDiscountedUtility = 0
+        # (total cost, total utility) at time horizons
+        self.horizonTotals = {}
 
     def update(self, k, current_state, next_state):
         """ updates the discounted total cost and health utility
@@ -96,113 +128,184 @@ class PatientCostUtilityMonitor:
         :param next_state: next health state
         """
 
-        # update cost
-        cost = 0.5 * (self.params.annualStateCosts[current_state.value] +
-                      self.params.annualStateCosts[next_state.value])
-        # update utility
-       #  utility = 0.5 * (self.params.annualStateUtilities[current_state.value] +
-                         # self.params.annualStateUtilities[next_state.value])
-
-        # add the cost of treatment
-        if next_state == CKDStates.STAGE5:
-            cost += 0.5 * self.params.annualTreatmentCost
-        else:
-            cost += 1 * self.params.annualTreatmentCost
-
-        # update total discounted cost and utility (corrected for the half-cycle effect)
-        self.totalDiscountedCost += Econ.pv_single_payment(payment=cost,
-                                                           discount_rate=self.params.discountRate / 2,
-                                                           discount_period=2 * k + 1)
-
-
+        # discounted cost and utility of this transition (including the cost of
+        # treatment and corrected for the half-cycle effect)
+        cost, utility = self.payoffs.get_discounted_payoffs(k=k,
+                                                            current_state_index=current_state.value,
+                                                            next_state_index=next_state.value)
 
+        # update total discounted cost and utility
+        self.totalDiscountedCost += cost
+        self.totalDiscountedUtility += utility
 
+    def record_horizon(self, horizon):
+        """ records the total discounted cost and utility at a time horizon
+        :param horizon: time horizon (time step)
+        """
+        self.horizonTotals[horizon] = (self.totalDiscountedCost, self.totalDiscountedUtility)
 
 
 class Cohort:
-    def __init__(self, id, pop_size, transition_prob_matrix_one, parameters):
+    def __init__(self, id, pop_size, transition_prob_matrix_one, parameters, rng_streams=None,
+                 keep_observations=True):
         """ create a cohort of patients
         :param id: cohort ID
         :param pop_size: population size of this cohort
         :param transition_prob_matrix_one: transition probability matrix
+        :param rng_streams: (RNGStreams) random number streams of patients
+            (if None, each patient uses a RandomState seeded with id * pop_size + n)
+        :param keep_observations: set to False to only keep the summary statistics of patient outcomes
         """
         self.id = id
         self.popSize = pop_size
         self.transitionProbMatrix = transition_prob_matrix_one
         self.params = parameters
-        self.cohortOutcomes = CohortOutcomes()  # outcomes of this simulated cohort
+        self.rngStreams = rng_streams
+        # outcomes of this simulated cohort
+        self.cohortOutcomes = CohortOutcomes(pop_size=pop_size, keep_observations=keep_observations)
+        self.nPatientSteps = 0  # number of patient-steps simulated
 
+    @PROFILER.profile(name='Cohort.simulate')
     def simulate(self, n_time_steps):
         """ simulate the cohort of patients over the specified number of time-steps
         :param n_time_steps: number of time steps to simulate the cohort
         """
-        # populate the cohort
-        patients = []  # list of patients
+
+        # table of discounted payoffs (shared by all patients)
+        payoffs = get_payoff_table(parameters=self.params, n_time_steps=n_time_steps)
+
+        # key of this cohort's random number streams
+        if self.rngStreams is not None:
+            cohort_key = self.rngStreams.get_cohort_key(cohort_id=self.id)
+
         for i in range(self.popSize):
+            # random number generator of this patient
+            rng = None
+            if self.rngStreams is not None:
+                rng = self.rngStreams.get_patient_rng(cohort_id=self.id, patient_index=i, cohort_key=cohort_key)
+
             # create a new patient (use id * pop_size + n as patient id)
             patient = Patient(id=self.id * self.popSize + i,
-                              parameters=self.params, transition_prob_matrix_one=self.transitionProbMatrix)
-            # add the patient to the cohort
-
-            patients.append(patient)
-
-        for patient in patients:
+                              parameters=self.params, transition_prob_matrix_one=self.transitionProbMatrix,
+                              payoffs=payoffs, rng=rng)
+            # simulate
             patient.simulate(n_time_steps=n_time_steps)
+            self.nPatientSteps += patient.nTimeSteps
 
             # store outputs of this simulation
-            self.cohortOutcomes.extract_outcome(simulated_patients=patients)
+            # (the patient is not kept once its outcomes are extracted)
+            self.cohortOutcomes.extract_outcome(simulated_patient=patient)
 
         # calculate cohort outcomes
-        self.cohortOutcomes.calculate_cohort_outcomes(initial_pop_size=self.popSize)
-
-
-class CohortOutcomes:
-    def __init__(self):
-
-        self.survivalTimes = []             # patients' survival times
-        self.meanSurvivalTime = None        # mean survival times
-        self.nLivingPatients = None         # survival curve (sample path of number of alive patients over time)
-        self.costs = []
-        self.utilities = []
-        self.statCost = None
-        self.statUtility = None
-        self.statSurvivalTime = None
-
-    def extract_outcome(self, simulated_patients):
-        """ extracts outcomes of a simulated patient
-        :param simulated_patients: a list of simulated patients"""
-
-        # record survival time and time until post stroke health state
-        for patient in simulated_patients:
-            if patient.stateMonitor.survivalTime is not None:
-                self.survivalTimes.append(patient.stateMonitor.survivalTime)
-        # if simulated_patient.stateMonitor.timeToStage5 is not None:
-        #     self.timesToStage5.append(simulated_patient.stateMonitor.timeToPostStroke)
-                self.costs.append(patient.stateMonitor.costUtilityMonitor.totalDiscountedCost)
-                self.utilities.append(patient.stateMonitor.costUtilityMonitor.totalDiscountedUtility)
-
-
-    def calculate_cohort_outcomes(self, initial_pop_size):
-        """ calculates the cohort outcomes
-        :param initial_pop_size: initial population size
-        """
+        with PROFILER.timer(name='CohortOutcomes.calculate_cohort_outcomes'):
+            self.cohortOutcomes.calculate_cohort_outcomes(initial_pop_size=self.popSize)
 
-        # calculate mean survival time
-        self.meanSurvivalTime = sum(self.survivalTimes) / len(self.survivalTimes)
+        if PROFILER.enabled:
+            PROFILER.add_count(name='patients', n=self.popSize)
+            PROFILER.add_count(name='patient-steps', n=self.nPatientSteps)
 
-        self.statSurvivalTime = Stat.SummaryStat(
-            name='Survival time', data=self.survivalTimes)
 
-        self.statCost = Stat.SummaryStat(
-            name='Discounted cost', data=self.costs)
-        self.statUtility = Stat.SummaryStat(
-            name='Discounted utility', data=self.utilities)
+class CohortBatch:
+    def __init__(self, ids, pop_size, parameter_batch):
+        """ create a batch of cohorts, one for each parameter set, to be simulated together
+        :param ids: (list) of cohort ids
+        :param pop_size: population size of each cohort
+        :param parameter_batch: (ParameterBatch) parameter sets of the cohorts
+        """
+        self.ids = ids
+        self.popSize = pop_size
+        self.params = parameter_batch
+        self.meanCosts = None       # average patient cost of each cohort
+        self.meanQALYs = None       # average patient QALY of each cohort
+        self.nPatientSteps = 0      # number of patient-steps simulated
+        self.survivalCurves = None  # survival curve (SurvivalCurve) of each cohort
+
+    @PROFILER.profile(name='CohortBatch.simulate')
+    def simulate(self, n_time_steps, seed=0, rng_streams=None):
+        """ simulate all patients of all cohorts together over the specified number of time-steps
+        :param n_time_steps: number of time steps to simulate the cohorts
+        :param seed: seed of the random number generator
+        :param rng_streams: (RNGStreams) random number streams (if provided, each cohort draws
+            from its own stream and seed is not used)
+
+        Without random number streams, one number is drawn per living patient at each time step,
+        so the cost of a time step scales with the number of living patients. With random number
+        streams, one number is still drawn per patient of each cohort (including those who reached
+        stage 5): patient i of a cohort then gets the same draws whatever happens to the other patients,
+        which keeps cohorts simulated with the same streams (e.g. under two therapies) paired.
+        """
+
+        if rng_streams is not None:
+            # one stream of random numbers per cohort
+            uniforms = [rng_streams.get_uniforms(cohort_id=cohort_id, n_patients=self.popSize)
+                        for cohort_id in self.ids]
+        else:
+            rng = np.random.RandomState(seed=seed)
+        n_cohorts = len(self.ids)
+
+        # cumulative transition probabilities out of each state of each cohort
+        cum_probs = get_cumulative_probs(self.params.probMatrices)
+
+        # current state and discounted cost and utility of all patients (one row per cohort)
+        states = np.full((n_cohorts, self.popSize), CKDStates.STAGE1.value, dtype=int)
+        costs = np.zeros((n_cohorts, self.popSize))
+        utilities = np.zeros((n_cohorts, self.popSize))
+
+        # discounted costs and utilities of transitions of each cohort
+        payoffs = PayoffTable(annual_state_costs=self.params.annualStateCosts,
+                              annual_state_utilities=self.params.annualStateUtilities,
+                              annual_treatment_cost=self.params.annualTreatmentCosts,
+                              discount_rate=self.params.discountRate,
+                              n_time_steps=n_time_steps)
+
+        # (cohort, patient) indices of patients who have not reached stage 5
+        alive_cohorts, alive_patients = np.nonzero(states != CKDStates.STAGE5.value)
+        self.nPatientSteps = 0
+        # number of patients of each cohort who reach stage 5 during each time step
+        n_absorbed = np.zeros((n_cohorts, n_time_steps), dtype=int)
+
+        k = 0
+        # while some patients are alive and simulation length is not yet reached
+        while len(alive_cohorts) > 0 and k < n_time_steps:
+
+            if rng_streams is not None:
+                # one draw per patient of each stream (including those who reached stage 5,
+                # so that the draws of a patient do not depend on the other patients)
+                u = np.stack([cohort_uniforms.get_next() for cohort_uniforms in uniforms])
+                u = u[alive_cohorts, alive_patients]
+            else:
+                # one draw per living patient
+                u = rng.random_sample(len(alive_cohorts))
+
+            # sample the next state of living patients against the transition
+            # probabilities of each patient's cohort
+            current_states = states[alive_cohorts, alive_patients]
+            new_states = get_next_states(cum_probs=cum_probs[alive_cohorts, current_states], u=u)
+
+            # update total discounted cost and utility (including the cost of treatment and
+            # corrected for the half-cycle effect)
+            cost, utility = payoffs.get_discounted_payoffs(k=k,
+                                                           current_state_index=current_states,
+                                                           next_state_index=new_states,
+                                                           parameter_set_index=alive_cohorts)
+            costs[alive_cohorts, alive_patients] += cost
+            utilities[alive_cohorts, alive_patients] += utility
+
+            # update current health states and drop patients who reached stage 5
+            states[alive_cohorts, alive_patients] = new_states
+            self.nPatientSteps += len(alive_cohorts)
+            still_alive = new_states != CKDStates.STAGE5.value
+            n_absorbed[:, k] = np.bincount(alive_cohorts[~still_alive], minlength=n_cohorts)
+            alive_cohorts = alive_cohorts[still_alive]
+            alive_patients = alive_patients[still_alive]
+
+            k += 1
 
-# survival curve
-        self.nLivingPatients = Path.PrevalencePathBatchUpdate(
-            name='# of living patients',
-            initial_size=initial_pop_size,
-            times_of_changes=self.survivalTimes,
-            increments=[-1]*len(self.survivalTimes)
-        )
+        if PROFILER.enabled:
+            PROFILER.add_count(name='patients', n=n_cohorts * self.popSize)
+            PROFILER.add_count(name='patient-steps', n=self.nPatientSteps)
 
+        # average patient cost and QALY of each cohort
+        self.meanCosts = costs.mean(axis=1)
+        self.meanQALYs = utilities.mean(axis=1)
+        self.survivalCurves = [SurvivalCurve(initial_size=self.popSize, n_absorbed=row) for row in n_absorbed]
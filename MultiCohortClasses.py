@@ -1,8 +1,13 @@
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 
 import SimPy.Statistics as Stat
-from MarkovModelClassesMultiCohorts import Cohort
+from MarkovModelClassesMultiCohorts import Cohort, CohortBatch
 from NealClasses import ParameterGenerator
+from ProfilerClasses import PROFILER
+from StoppingRuleClasses import PrecisionMonitor
+from StreamingStatClasses import StreamingStat
 
 import InputDataNoTreatment as DataNT
 
@@ -12,17 +17,21 @@ import InputDataTreatment as DataT
 class MultiCohort:
     """ simulates multiple cohorts with different parameters """
 
-    def __init__(self, ids, pop_size, therapy):
+    def __init__(self, ids, pop_size, therapy, rng_streams=None):
         """
         :param ids: (list) of ids for cohorts to simulate
         :param pop_size: (int) population size of cohorts to simulate
         :param therapy: selected therapy
+        :param rng_streams: (RNGStreams) random number streams of cohorts and patients
+            (if None, patients use RandomStates seeded with their IDs)
         """
         self.ids = ids
         self.popSize = pop_size
         self.therapy = therapy
+        self.rngStreams = rng_streams
         self.paramSets = []  # list of parameter sets each of which corresponds to a cohort
         self.multiCohortOutcomes = MultiCohortOutcomes()
+        self.nPatientSteps = 0  # number of patient-steps simulated (over all cohorts)
 
     def __populate_parameter_sets(self):
 
@@ -36,34 +45,161 @@ class MultiCohort:
             # get and store a new set of parameter
             self.paramSets.append(param_generator.get_new_parameters(rng=rng))
 
-    def simulate(self, sim_length):
+    @PROFILER.profile(name='MultiCohort.simulate')
+    def simulate(self, sim_length, n_workers=1, stopping_rule=None, ref_multi_cohort=None):
         """ simulates all cohorts
         :param sim_length: simulation length
+        :param n_workers: number of worker processes to simulate cohorts in parallel
+            (cohorts are simulated in this process if set to 1)
+        :param stopping_rule: (StoppingRule) if provided, cohorts are simulated in batches until the
+            confidence intervals of mean cost, QALY (and incremental net monetary benefit) are narrow
+            enough (ids are then the cohorts to simulate at most)
+        :param ref_multi_cohort: (MultiCohort) cohorts under the reference therapy to simulate
+            batch by batch together with these cohorts (needed to check the half-width of
+            incremental net monetary benefit)
         """
 
         # create parameter sets
-        self.__populate_parameter_sets()
+        with PROFILER.timer(name='MultiCohort: parameter sampling'):
+            self.__populate_parameter_sets()
+            multi_cohorts = [self]
+            if ref_multi_cohort is not None:
+                ref_multi_cohort.__populate_parameter_sets()
+                multi_cohorts.append(ref_multi_cohort)
 
-        for i in range(len(self.ids)):
-            # create a cohort
-            cohort = Cohort(id=self.ids[i],
-                            pop_size=self.popSize,
-                            parameters=self.paramSets[i], transition_prob_matrix_one=DataNT.trans_prob_matrix_one)
+        # batches of cohorts to simulate before checking the stopping rule
+        if stopping_rule is None:
+            batches = [range(len(self.ids))]
+        else:
+            batches = stopping_rule.get_batches(n=len(self.ids))
+            precision_monitor = PrecisionMonitor(stopping_rule=stopping_rule)
+
+        executor = None
+        if n_workers > 1:
+            # pool of worker processes shared by all batches
+            executor = ProcessPoolExecutor(max_workers=n_workers)
+
+        try:
+            for batch in batches:
+                for multi_cohort in multi_cohorts:
+                    multi_cohort.__simulate_cohorts(
+                        indices=batch, sim_length=sim_length, n_workers=n_workers, executor=executor)
+
+                # stop if the estimates are precise enough
+                if stopping_rule is not None:
+                    if ref_multi_cohort is None:
+                        precision_monitor.update(costs=self.multiCohortOutcomes.meanCosts[batch.start:],
+                                                 utilities=self.multiCohortOutcomes.meanQALYs[batch.start:])
+                    else:
+                        precision_monitor.update(
+                            costs=self.multiCohortOutcomes.meanCosts[batch.start:],
+                            utilities=self.multiCohortOutcomes.meanQALYs[batch.start:],
+                            ref_costs=ref_multi_cohort.multiCohortOutcomes.meanCosts[batch.start:],
+                            ref_utilities=ref_multi_cohort.multiCohortOutcomes.meanQALYs[batch.start:])
+                    if precision_monitor.get_if_precise():
+                        break
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        # calculate the summary statistics of outcomes from all cohorts
+        with PROFILER.timer(name='MultiCohortOutcomes.calculate_summary_stats'):
+            for multi_cohort in multi_cohorts:
+                multi_cohort.multiCohortOutcomes.calculate_summary_stats()
+
+    def __simulate_cohorts(self, indices, sim_length, n_workers, executor):
+        """ simulates some of the cohorts and extracts their outcomes
+        :param indices: indices of cohorts to simulate
+        :param sim_length: simulation length
+        :param n_workers: number of worker processes
+        :param executor: pool of worker processes (None to simulate cohorts in this process)
+            (the profiler only times the phases of cohorts simulated in this process)
+        """
+
+        # arguments to simulate each cohort
+        cohort_ids = [self.ids[i] for i in indices]
+        pop_sizes = [self.popSize] * len(cohort_ids)
+        param_sets = [self.paramSets[i] for i in indices]
+        matrices = [param.transRateMatrix for param in param_sets]
+        sim_lengths = [sim_length] * len(cohort_ids)
+        rng_streams = [self.rngStreams] * len(cohort_ids)
+
+        if executor is not None:
+            # simulate cohorts in a pool of worker processes
+            # (results are returned in the order of cohort ids)
+            outcomes = executor.map(
+                simulate_cohort, cohort_ids, pop_sizes, param_sets, matrices, sim_lengths, rng_streams,
+                chunksize=max(1, len(cohort_ids) // (4 * n_workers)))
+        else:
+            outcomes = map(simulate_cohort, cohort_ids, pop_sizes, param_sets, matrices, sim_lengths, rng_streams)
+
+        # extract the outcomes of simulated cohorts
+        with PROFILER.timer(name='MultiCohort: cohort simulation'):
+            for mean_cost, mean_qaly, survival_curve, n_patient_steps in outcomes:
+                self.multiCohortOutcomes.extract_cohort_means(mean_cost=mean_cost, mean_qaly=mean_qaly,
+                                                              survival_curve=survival_curve)
+                self.nPatientSteps += n_patient_steps
+        if PROFILER.enabled:
+            PROFILER.add_count(name='cohorts', n=len(cohort_ids))
+
+    @PROFILER.profile(name='MultiCohort.simulate_batched')
+    def simulate_batched(self, sim_length, seed=0):
+        """ simulates all cohorts together as one batch
+        :param sim_length: simulation length
+        :param seed: seed of the random number generator used to sample
+            parameter sets (and to simulate the cohorts if no random number streams are provided)
+        """
+
+        # sample all parameter sets at once
+        with PROFILER.timer(name='MultiCohort: parameter sampling'):
+            param_generator = ParameterGenerator(therapy=self.therapy)
+            param_batch = param_generator.get_parameter_batch(n=len(self.ids), seed=seed)
+            self.paramSets = [param_batch.get_parameters(i) for i in range(param_batch.nSets)]
 
-            # simulate the cohort
-            cohort.simulate(n_time_steps=sim_length)
+        # simulate all cohorts in one pass
+        cohort_batch = CohortBatch(ids=self.ids, pop_size=self.popSize, parameter_batch=param_batch)
+        cohort_batch.simulate(n_time_steps=sim_length, seed=seed, rng_streams=self.rngStreams)
+        self.nPatientSteps += cohort_batch.nPatientSteps
 
-            # extract the outcomes of this simulated cohort
-            self.multiCohortOutcomes.extract_outcomes(simulated_cohort=cohort)
+        # extract the outcomes of simulated cohorts
+        for mean_cost, mean_qaly, survival_curve in zip(
+                cohort_batch.meanCosts, cohort_batch.meanQALYs, cohort_batch.survivalCurves):
+            self.multiCohortOutcomes.extract_cohort_means(mean_cost=mean_cost, mean_qaly=mean_qaly,
+                                                          survival_curve=survival_curve)
 
         # calculate the summary statistics of outcomes from all cohorts
-        self.multiCohortOutcomes.calculate_summary_stats()
+        with PROFILER.timer(name='MultiCohortOutcomes.calculate_summary_stats'):
+            self.multiCohortOutcomes.calculate_summary_stats()
+
+
+def simulate_cohort(cohort_id, pop_size, parameters, transition_prob_matrix_one, sim_length, rng_streams=None):
+    """ simulates one cohort (can be run in a worker process)
+    :param cohort_id: cohort ID
+    :param pop_size: population size of the cohort
+    :param parameters: parameter set of the cohort
+    :param transition_prob_matrix_one: transition probability matrix
+    :param sim_length: simulation length
+    :param rng_streams: (RNGStreams) random number streams of patients
+    :return: (mean cost, mean QALY, survival curve, number of patient-steps) of the simulated cohort
+    """
+
+    # create and simulate the cohort
+    cohort = Cohort(id=cohort_id,
+                    pop_size=pop_size,
+                    parameters=parameters, transition_prob_matrix_one=transition_prob_matrix_one,
+                    rng_streams=rng_streams,
+                    keep_observations=False)
+    cohort.simulate(n_time_steps=sim_length)
+
+    # return only the outcomes needed by MultiCohortOutcomes
+    return (cohort.cohortOutcomes.statCost.get_mean(), cohort.cohortOutcomes.statUtility.get_mean(),
+            cohort.cohortOutcomes.survivalCurve, cohort.nPatientSteps)
 
 
 class MultiCohortOutcomes:
     def __init__(self):
 
-        # self.survivalCurves = []  # list of survival curves from all simulated cohorts
+        self.survivalCurves = []     # list of survival curves (SurvivalCurve) from all simulated cohorts
 
         # self.meanSurvivalTimes = []  # list of average patient survival time from each simulated cohort
         # self.meanTimeToAIDS = []     # list of average patient time until AIDS from each simulated cohort
@@ -79,18 +215,31 @@ class MultiCohortOutcomes:
         """ extracts outcomes of a simulated cohort
         :param simulated_cohort: a cohort after being simulated"""
 
-        # # append the survival curve of this cohort
-        # self.survivalCurves.append(simulated_cohort.cohortOutcomes.nLivingPatients)
-
         # # store mean survival time from this cohort
         # self.meanSurvivalTimes.append(simulated_cohort.cohortOutcomes.statSurvivalTime.get_mean())
         # # store mean time to AIDS from this cohort
         # self.meanTimeToAIDS.append(simulated_cohort.cohortOutcomes.statTimeToAIDS.get_mean())
 
+        # store mean cost, mean QALY, and the survival curve of this cohort
+        self.extract_cohort_means(mean_cost=simulated_cohort.cohortOutcomes.statCost.get_mean(),
+                                  mean_qaly=simulated_cohort.cohortOutcomes.statUtility.get_mean(),
+                                  survival_curve=simulated_cohort.cohortOutcomes.survivalCurve)
+
+    def extract_cohort_means(self, mean_cost, mean_qaly, survival_curve=None):
+        """ extracts the mean outcomes of a simulated cohort
+        :param mean_cost: mean cost of the simulated cohort
+        :param mean_qaly: mean QALY of the simulated cohort
+        :param survival_curve: (SurvivalCurve) survival curve of the simulated cohort
+        """
+
+        # append the survival curve of this cohort
+        if survival_curve is not None:
+            self.survivalCurves.append(survival_curve)
+
         # store mean cost from this cohort
-        self.meanCosts.append(simulated_cohort.cohortOutcomes.statCost.get_mean())
+        self.meanCosts.append(mean_cost)
         # store mean QALY from this cohort
-        self.meanQALYs.append(simulated_cohort.cohortOutcomes.statUtility.get_mean())
+        self.meanQALYs.append(mean_qaly)
 
     def calculate_summary_stats(self):
         """
@@ -104,8 +253,19 @@ class MultiCohortOutcomes:
         # self.statMeanTimeToAIDS = Stat.SummaryStat(name='Average time to AIDS',
         #                                            data=self.meanTimeToAIDS)
         # summary statistics of mean cost
-        self.statMeanCost = Stat.SummaryStat(name='Average cost',
-                                             data=self.meanCosts)
+        self.statMeanCost = StreamingStat(name='Average cost')
+        self.statMeanCost.add(self.meanCosts)
         # summary statistics of mean QALY
-        self.statMeanQALY = Stat.SummaryStat(name='Average QALY',
-                                             data=self.meanQALYs)
+        self.statMeanQALY = StreamingStat(name='Average QALY')
+        self.statMeanQALY.add(self.meanQALYs)
+
+    def get_survival_curves(self, n_time_steps=None):
+        """
+        :param n_time_steps: number of time steps (if None, up to the last time step
+            in which a patient of any cohort reached stage 5)
+        :return: (2-D array) number of living patients of each cohort (rows) at times 0, 1, ... (columns)
+        """
+
+        if n_time_steps is None:
+            n_time_steps = max(len(curve.nAbsorbed) for curve in self.survivalCurves)
+        return np.vstack([curve.get_n_living(n_time_steps=n_time_steps) for curve in self.survivalCurves])
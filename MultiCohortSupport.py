@@ -2,9 +2,11 @@ import SimPy.EconEval as Econ
 import SimPy.Plots.Histogram as Hist
 import SimPy.Plots.SamplePaths as Path
 import SimPy.Statistics as Stat
+from ProfilerClasses import PROFILER
 import InputDataTreatment as D
 
 
+@PROFILER.profile(name='MultiCohortSupport.print_outcomes')
 def print_outcomes(multi_cohort_outcomes, therapy_name):
     """ prints the outcomes of a simulated cohort
     :param multi_cohort_outcomes: outcomes of a simulated multi-cohort
@@ -90,6 +92,7 @@ def print_outcomes(multi_cohort_outcomes, therapy_name):
 #     )
 
 
+@PROFILER.profile(name='MultiCohortSupport.print_comparative_outcomes')
 def print_comparative_outcomes(multi_cohort_outcomes_mono, multi_cohort_outcomes_combo):
     """ prints average increase in survival time, discounted cost, and discounted utility
     under combination therapy compared to mono therapy
@@ -141,6 +144,7 @@ def print_comparative_outcomes(multi_cohort_outcomes_mono, multi_cohort_outcomes
           estimate_PI)
 
 
+@PROFILER.profile(name='MultiCohortSupport.report_CEA_CBA')
 def report_CEA_CBA(multi_cohort_outcomes_mono, multi_cohort_outcomes_combo):
     """ performs cost-effectiveness and cost-benefit analyses
     :param multi_cohort_outcomes_mono: outcomes of a multi-cohort simulated under mono therapy
@@ -1,7 +1,11 @@
+import numpy as np
+
 import SimPy.RandomVariateGenerators as RVGs
+from ProfilerClasses import PROFILER
 from ParameterClasses import *  # import everything from the ParameterClass module
 import InputDataNoTreatment as Data
 import InputDataNoTreatment as DataNT
+import InputDataTreatment as DataT
 
 class Parameters:
     """ class to include parameter information to simulate the model """
@@ -29,21 +33,31 @@ class ParameterGenerator:
         self.annualStateUtilityRVG = []  # list of beta distributions for the annual utility of states
         self.annualTreatmentCostRVG = None   # gamma distribution for treatment cost
 
+        # parameters of the above distributions (to sample parameter sets in batches)
+        self.probMatrixRows = []            # dirichlet concentrations for the rows of the transition matrix
+        self.annualStateCostFits = []       # (shape, scale) of gamma distributions (None if cost is zero)
+        self.annualStateUtilityFits = []    # (a, b) of beta distributions (None if utility is zero)
+        self.annualTreatmentCostFit = None  # (shape, scale) of the gamma distribution for treatment cost
+
+        # transition probability matrix of the selected therapy
+        # (and the number of patients its probabilities are estimated from)
+        if self.therapy == Therapies.RAMPIRIL:
+            trans_prob_matrix = DataT.trans_prob_matrix_one
+            n_obs = DataT.N_OBS
+        else:
+            trans_prob_matrix = DataNT.trans_prob_matrix_one
+            n_obs = DataNT.N_OBS
+
         # create Dirichlet distributions for transition probabilities
-        j = 0
-        for probs in Data.trans_prob_matrix_one:
+        for probs in trans_prob_matrix:
+            # the concentration of a row is the expected number of observed transitions out of the state
+            # (so the sampled probabilities have the mean probs and shrink around it as n_obs grows)
+            concentrations = [n_obs * prob for prob in probs]
             # note:  for a Dirichlet distribution all values of the argument 'a' should be non-zero.
             # setting if_ignore_0s to True allows the Dirichlet distribution to take 'a' with zero values.
             self.probMatrixRVG.append(RVGs.Dirichlet(
-                a=probs, if_ignore_0s = True))
-            j += 1
-        i = 0
-        for probs in DataNT.trans_prob_matrix_one:
-            # note:  for a Dirichlet distribution all values of the argument 'a' should be non-zero.
-            # setting if_ignore_0s to True allows the Dirichlet distribution to take 'a' with zero values.
-            self.probMatrixRVG.append(RVGs.Dirichlet(
-                a=probs, if_ignore_0s = True))
-            i += 1
+                a=concentrations, if_ignore_0s = True))
+            self.probMatrixRows.append(concentrations)
 
         # create gamma distributions for annual state cost
         for cost in Data.ANNUAL_STATE_COST:
@@ -51,6 +65,7 @@ class ParameterGenerator:
             # if cost is zero, add a constant 0, otherwise add a gamma distribution
             if cost == 0:
                 self.annualStateCostRVG.append(RVGs.Constant(value=0))
+                self.annualStateCostFits.append(None)
             else:
                 # find shape and scale of the assumed gamma distribution
                 # no data available to estimate the standard deviation, so we assumed st_dev=cost / 5
@@ -60,6 +75,7 @@ class ParameterGenerator:
                     RVGs.Gamma(a=fit_output["a"],
                                loc=0,
                                scale=fit_output["scale"]))
+                self.annualStateCostFits.append((fit_output["a"], fit_output["scale"]))
 
         # create a gamma distribution for annual treatment cost
         if self.therapy == Therapies.RAMPIRIL:
@@ -70,9 +86,26 @@ class ParameterGenerator:
         self.annualTreatmentCostRVG = RVGs.Gamma(a=fit_output["a"],
                                                  loc=0,
                                                  scale=fit_output["scale"])
+        self.annualTreatmentCostFit = (fit_output["a"], fit_output["scale"])
+
+        # create beta distributions for annual state utility
+        for utility in Data.ANNUAL_STATE_UTILITY:
+            # if utility is zero, add a constant 0, otherwise add a beta distribution
+            if utility == 0:
+                self.annualStateUtilityRVG.append(RVGs.Constant(value=0))
+                self.annualStateUtilityFits.append(None)
+            else:
+                # find alpha and beta of the assumed beta distribution
+                # no data available to estimate the standard deviation, so we assumed st_dev=utility / 5
+                fit_output = RVGs.Beta.fit_mm(mean=utility, st_dev=utility / 5)
+                # append the distribution
+                self.annualStateUtilityRVG.append(
+                    RVGs.Beta(a=fit_output["a"], b=fit_output["b"]))
+                self.annualStateUtilityFits.append((fit_output["a"], fit_output["b"]))
 
 
 
+    @PROFILER.profile(name='ParameterGenerator.get_new_parameters')
     def get_new_parameters(self, rng):
         """
         :param rng: random number generator
@@ -92,14 +125,13 @@ class ParameterGenerator:
                 # fill in the transition probabilities out of this state
                 prob_matrix.append(self.probMatrixRVG[s.value].sample(rng))
 
-        # calculate transition probabilities between hiv states
-        if self.therapy == Therapies.RAMPIRIL:
-            # calculate transition probability matrix for the mono therapy
-            param.transRateMatrix = Data.trans_prob_matrix_one
+        # stage 5 is absorbing
+        absorbing_row = [0] * len(Data.CKDStates)
+        absorbing_row[Data.CKDStates.STAGE5.value] = 1
+        prob_matrix.append(absorbing_row)
 
-        elif self.therapy == Therapies.NONE:
-            # calculate transition probability matrix for the combination therapy
-            param.transRateMatrix = DataNT.trans_prob_matrix_one
+        # use the sampled transition probability matrix of the selected therapy
+        param.transRateMatrix = prob_matrix
 
         # sample from gamma distributions that are assumed for annual state costs
         for dist in self.annualStateCostRVG:
@@ -108,8 +140,77 @@ class ParameterGenerator:
         # sample from the gamma distribution that is assumed for the treatment cost
         param.annualTreatmentCost = self.annualTreatmentCostRVG.sample(rng)
 
-
+        # sample from beta distributions that are assumed for annual state utilities
+        for dist in self.annualStateUtilityRVG:
+            param.annualStateUtilities.append(dist.sample(rng))
 
         # return the parameter set
         return param
 
+    @PROFILER.profile(name='ParameterGenerator.get_parameter_batch')
+    def get_parameter_batch(self, n, seed):
+        """
+        :param n: number of parameter sets to sample
+        :param seed: seed of the random number generator
+        :return: (ParameterBatch) n parameter sets sampled together
+        """
+
+        rng = np.random.RandomState(seed=seed)
+        batch = ParameterBatch(therapy=self.therapy, n=n)
+
+        # sample the transition probabilities out of each state from its dirichlet distribution
+        for s in Data.CKDStates:
+            if s == Data.CKDStates.STAGE5:
+                # stage 5 is absorbing
+                batch.probMatrices[:, s.value, s.value] = 1
+            else:
+                # the dirichlet distribution is only over states with non-zero probability
+                concentrations = np.array(self.probMatrixRows[s.value], dtype=float)
+                idx = np.flatnonzero(concentrations)
+                batch.probMatrices[:, s.value, idx] = rng.dirichlet(concentrations[idx], size=n)
+
+        # sample annual state costs from gamma distributions
+        for i, fit in enumerate(self.annualStateCostFits):
+            if fit is not None:
+                batch.annualStateCosts[:, i] = rng.gamma(shape=fit[0], scale=fit[1], size=n)
+
+        # sample the treatment cost from its gamma distribution
+        batch.annualTreatmentCosts[:] = rng.gamma(shape=self.annualTreatmentCostFit[0],
+                                                  scale=self.annualTreatmentCostFit[1], size=n)
+
+        # sample annual state utilities from beta distributions
+        for i, fit in enumerate(self.annualStateUtilityFits):
+            if fit is not None:
+                batch.annualStateUtilities[:, i] = rng.beta(a=fit[0], b=fit[1], size=n)
+
+        return batch
+
+
+class ParameterBatch:
+    """ class to store many parameter sets as arrays (one row per parameter set) """
+
+    def __init__(self, therapy, n):
+
+        n_states = len(Data.CKDStates)
+
+        self.therapy = therapy              # selected therapy
+        self.nSets = n                      # number of parameter sets
+        self.probMatrices = np.zeros((n, n_states, n_states))   # transition probability matrices
+        self.annualStateCosts = np.zeros((n, n_states))         # annual state costs
+        self.annualStateUtilities = np.zeros((n, n_states))     # annual state utilities
+        self.annualTreatmentCosts = np.zeros(n)                 # annual treatment costs
+        self.discountRate = Data.Discount   # discount rate
+
+    def get_parameters(self, i):
+        """
+        :param i: index of a parameter set
+        :return: (Parameters) the i-th parameter set
+        """
+
+        param = Parameters(therapy=self.therapy)
+        param.transRateMatrix = self.probMatrices[i].tolist()
+        param.annualStateCosts = self.annualStateCosts[i].tolist()
+        param.annualStateUtilities = self.annualStateUtilities[i].tolist()
+        param.annualTreatmentCost = float(self.annualTreatmentCosts[i])
+        return param
+
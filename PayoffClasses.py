@@ -0,0 +1,98 @@
+from functools import lru_cache
+
+import numpy as np
+
+from InputDataNoTreatment import CKDStates
+
+
+@lru_cache(maxsize=None)
+def get_discount_factors(discount_rate, n_time_steps):
+    """
+    :param discount_rate: annual discount rate
+    :param n_time_steps: number of time steps
+    :return: (read-only array) factors to discount a payment made during time step k,
+        1/(1+r/2)^(2k+1) for k = 0, 1, ..., n_time_steps-1 (corrected for the half-cycle effect)
+    """
+
+    factors = np.power(1 + discount_rate / 2, -(2 * np.arange(n_time_steps) + 1.0))
+    factors.flags.writeable = False
+    return factors
+
+
+class PayoffTable:
+    """ cost and utility of every transition (current state, next state) together with
+    the discount factors of every time step, so that discounted payoffs can be looked up """
+
+    def __init__(self, annual_state_costs, annual_state_utilities, annual_treatment_cost,
+                 discount_rate, n_time_steps):
+        """
+        :param annual_state_costs: annual state costs (or an array with one row per parameter set)
+        :param annual_state_utilities: annual state utilities (or an array with one row per parameter set)
+        :param annual_treatment_cost: annual treatment cost (or an array with one value per parameter set)
+        :param discount_rate: annual discount rate
+        :param n_time_steps: number of time steps
+        """
+
+        state_costs = np.asarray(annual_state_costs, dtype=float)
+        state_utilities = np.asarray(annual_state_utilities, dtype=float)
+        treatment_cost = np.asarray(annual_treatment_cost, dtype=float)[..., np.newaxis, np.newaxis]
+        stage5 = CKDStates.STAGE5.value
+
+        # cost and utility of each transition are the average of the costs and utilities
+        # of the current and the next state
+        self.transitionCosts = 0.5 * (state_costs[..., :, np.newaxis] + state_costs[..., np.newaxis, :])
+        self.transitionUtilities = 0.5 * (state_utilities[..., :, np.newaxis] + state_utilities[..., np.newaxis, :])
+
+        # add the cost of treatment (only half a year if the patient moves to stage 5)
+        treatment_costs = np.ones(self.transitionCosts.shape[-2:])
+        treatment_costs[:, stage5] = 0.5
+        self.transitionCosts = self.transitionCosts + treatment_costs * treatment_cost
+
+        # patients in stage 5 accrue no cost or utility
+        self.transitionCosts[..., stage5, :] = 0
+        self.transitionUtilities[..., stage5, :] = 0
+
+        # discount factors (corrected for the half-cycle effect)
+        self.discountFactors = get_discount_factors(discount_rate, n_time_steps)
+
+    def get_discounted_payoffs(self, k, current_state_index, next_state_index, parameter_set_index=None):
+        """
+        :param k: simulation time step
+        :param current_state_index: index of the current state (or an array of indices)
+        :param next_state_index: index of the next state (or an array of indices)
+        :param parameter_set_index: index of the parameter set of each transition
+            (if the table is made with one row per parameter set; None for all parameter sets)
+        :return: (discounted cost, discounted utility) of the transition(s) during time step k
+        """
+
+        discount = self.discountFactors[k]
+        if parameter_set_index is None:
+            return (discount * self.transitionCosts[..., current_state_index, next_state_index],
+                    discount * self.transitionUtilities[..., current_state_index, next_state_index])
+        return (discount * self.transitionCosts[parameter_set_index, current_state_index, next_state_index],
+                discount * self.transitionUtilities[parameter_set_index, current_state_index, next_state_index])
+
+    def get_path_payoffs(self, state_indices):
+        """
+        :param state_indices: indices of the states visited by a patient at time steps 0, 1, 2, ...
+        :return: (total discounted cost, total discounted utility) of the state path
+        """
+
+        state_indices = np.asarray(state_indices)
+        discounts = self.discountFactors[:len(state_indices) - 1]
+        return (discounts @ self.transitionCosts[state_indices[:-1], state_indices[1:]],
+                discounts @ self.transitionUtilities[state_indices[:-1], state_indices[1:]])
+
+
+def get_payoff_table(parameters, n_time_steps):
+    """
+    :param parameters: parameters of the selected therapy
+    :param n_time_steps: number of time steps
+    :return: (PayoffTable) payoffs under the selected therapy
+    """
+
+    return PayoffTable(annual_state_costs=parameters.annualStateCosts,
+                       annual_state_utilities=parameters.annualStateUtilities,
+                       annual_treatment_cost=parameters.annualTreatmentCost,
+                       discount_rate=parameters.discountRate,
+                       n_time_steps=n_time_steps)
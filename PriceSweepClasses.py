@@ -0,0 +1,171 @@
+import numpy as np
+
+from MarkovModelClasses import PairedCohort
+
+
+class CohortExposures:
+    """ discounted time each patient of a simulated cohort spent in each state and under treatment
+    (discounted costs and utilities are linear in the annual state costs, state utilities, and
+    treatment cost, so a simulated cohort can be re-priced without simulating it again) """
+
+    def __init__(self, state_times, treatment_exposures):
+        """
+        :param state_times: discounted time in each state (one row per patient, one column per state)
+        :param treatment_exposures: discounted time under treatment (one value per patient)
+        """
+
+        self.stateTimes = np.asarray(state_times, dtype=float)
+        self.treatmentExposures = np.asarray(treatment_exposures, dtype=float)
+        self.meanStateTimes = self.stateTimes.mean(axis=0)
+        self.meanTreatmentExposure = self.treatmentExposures.mean()
+
+    def get_costs(self, annual_state_costs, annual_treatment_costs):
+        """
+        :param annual_state_costs: annual state costs
+        :param annual_treatment_costs: annual treatment cost (or an array of treatment costs)
+        :return: discounted cost of each patient (one column per treatment cost if an array is provided)
+        """
+
+        state_costs = self.stateTimes @ np.asarray(annual_state_costs, dtype=float)
+        treatment_costs = np.asarray(annual_treatment_costs, dtype=float)
+        if treatment_costs.ndim == 0:
+            return state_costs + self.treatmentExposures * treatment_costs
+        return state_costs[:, np.newaxis] + np.multiply.outer(self.treatmentExposures, treatment_costs)
+
+    def get_utilities(self, annual_state_utilities):
+        """
+        :param annual_state_utilities: annual state utilities
+        :return: discounted utility of each patient
+        """
+        return self.stateTimes @ np.asarray(annual_state_utilities, dtype=float)
+
+    def get_mean_costs(self, annual_state_costs, annual_treatment_costs):
+        """
+        :param annual_state_costs: annual state costs (or an array with one row per set of state costs)
+        :param annual_treatment_costs: annual treatment cost (or an array of treatment costs)
+        :return: mean discounted cost for every combination of state costs (rows) and treatment costs (columns)
+        """
+
+        state_costs = np.asarray(annual_state_costs, dtype=float) @ self.meanStateTimes
+        treatment_costs = np.asarray(annual_treatment_costs, dtype=float) * self.meanTreatmentExposure
+        return np.add.outer(state_costs, treatment_costs)
+
+    def get_mean_utilities(self, annual_state_utilities):
+        """
+        :param annual_state_utilities: annual state utilities (or an array with one row per set of utilities)
+        :return: mean discounted utility for each set of state utilities
+        """
+        return np.asarray(annual_state_utilities, dtype=float) @ self.meanStateTimes
+
+
+def get_exposures(store):
+    """
+    :param store: (CohortStore) states and outcomes of a cohort simulated with track_exposures=True
+    :return: (CohortExposures) exposures of the patients of the cohort
+    """
+
+    if store.stateTimes is None:
+        raise ValueError('The cohort should be simulated with track_exposures=True to be re-priced.')
+    return CohortExposures(state_times=store.stateTimes, treatment_exposures=store.treatmentExposures)
+
+
+class PriceSweep:
+    """ simulates a cohort under a reference and an alternative therapy once (with common random numbers)
+    and re-prices the alternative therapy over many treatment costs, state costs, and willingness-to-pay values """
+
+    def __init__(self, id, pop_size,
+                 ref_transition_prob_matrix, ref_parameters,
+                 transition_prob_matrix, parameters, rng_streams=None):
+        """
+        :param id: cohort ID
+        :param pop_size: population size of the cohort
+        :param ref_transition_prob_matrix: transition probability matrix of the reference therapy
+        :param ref_parameters: parameters of the reference therapy
+        :param transition_prob_matrix: transition probability matrix of the alternative therapy
+        :param parameters: parameters of the alternative therapy
+        :param rng_streams: (RNGStreams) random number streams
+            (if None, one RandomState seeded with the cohort ID is used)
+        """
+
+        self.pairedCohort = PairedCohort(id=id, pop_size=pop_size,
+                                         ref_transition_prob_matrix=ref_transition_prob_matrix,
+                                         ref_parameters=ref_parameters,
+                                         transition_prob_matrix=transition_prob_matrix,
+                                         parameters=parameters,
+                                         rng_streams=rng_streams,
+                                         track_exposures=True)
+        self.refParams = ref_parameters
+        self.params = parameters
+        self.refExposures = None    # exposures of patients under the reference therapy (CohortExposures)
+        self.exposures = None       # exposures of patients under the alternative therapy (CohortExposures)
+
+    def simulate(self, n_time_steps):
+        """ simulates the cohort under both therapies
+        :param n_time_steps: number of time steps
+        """
+
+        self.pairedCohort.simulate(n_time_steps=n_time_steps)
+        self.refExposures = get_exposures(store=self.pairedCohort.refStore)
+        self.exposures = get_exposures(store=self.pairedCohort.store)
+
+    def get_incremental_costs(self, annual_treatment_costs, annual_state_costs=None):
+        """
+        :param annual_treatment_costs: annual cost of the alternative therapy (or an array of costs)
+        :param annual_state_costs: annual state costs (or an array with one row per set of state costs)
+            (if None, the state costs of the simulated parameters)
+        :return: mean increase in discounted cost for every combination of state costs (rows)
+            and treatment costs (columns)
+        """
+
+        if annual_state_costs is None:
+            annual_state_costs = self.params.annualStateCosts
+        # mean cost under the reference therapy for each set of state costs
+        ref_costs = self.refExposures.get_mean_costs(annual_state_costs=annual_state_costs,
+                                                     annual_treatment_costs=self.refParams.annualTreatmentCost)
+        if np.ndim(annual_treatment_costs) > 0:
+            ref_costs = ref_costs[..., np.newaxis]
+        return self.exposures.get_mean_costs(annual_state_costs=annual_state_costs,
+                                             annual_treatment_costs=annual_treatment_costs) - ref_costs
+
+    def get_incremental_utility(self, annual_state_utilities=None):
+        """
+        :param annual_state_utilities: annual state utilities (or an array with one row per set of utilities)
+            (if None, the state utilities of the simulated parameters)
+        :return: mean increase in discounted utility (for each set of state utilities)
+        """
+
+        if annual_state_utilities is None:
+            annual_state_utilities = self.params.annualStateUtilities
+        return self.exposures.get_mean_utilities(annual_state_utilities=annual_state_utilities) \
+            - self.refExposures.get_mean_utilities(annual_state_utilities=annual_state_utilities)
+
+    def get_incremental_nmbs(self, wtps, annual_treatment_costs=None, annual_state_costs=None):
+        """
+        :param wtps: willingness-to-pay values for one additional QALY
+        :param annual_treatment_costs: annual costs of the alternative therapy
+            (if None, the treatment cost of the simulated parameters)
+        :param annual_state_costs: annual state costs (if None, the state costs of the simulated parameters)
+        :return: (2-D array) mean incremental net monetary benefit for every treatment cost (rows)
+            and willingness-to-pay value (columns)
+        """
+
+        if annual_treatment_costs is None:
+            annual_treatment_costs = self.params.annualTreatmentCost
+        d_costs = self.get_incremental_costs(annual_treatment_costs=np.atleast_1d(annual_treatment_costs),
+                                             annual_state_costs=annual_state_costs)
+        return np.asarray(wtps, dtype=float) * self.get_incremental_utility() - d_costs[..., np.newaxis]
+
+    def get_break_even_prices(self, wtps, annual_state_costs=None):
+        """
+        :param wtps: willingness-to-pay values for one additional QALY
+        :param annual_state_costs: annual state costs (if None, the state costs of the simulated parameters)
+        :return: annual cost of the alternative therapy at which its mean incremental net monetary benefit
+            is zero (for each willingness-to-pay value)
+        """
+
+        # the incremental net monetary benefit is linear in the annual treatment cost:
+        # wtp * dU - (dC at a treatment cost of 0) - price * (mean treatment exposure)
+        d_cost_no_treatment = self.get_incremental_costs(annual_treatment_costs=0,
+                                                         annual_state_costs=annual_state_costs)
+        return (np.asarray(wtps, dtype=float) * self.get_incremental_utility() - d_cost_no_treatment) \
+            / self.exposures.meanTreatmentExposure
@@ -0,0 +1,124 @@
+import functools
+import json
+import time
+
+
+class Profiler:
+    """ named timers and counters to find where the time of a run goes
+    (disabled by default; a disabled profiler records nothing) """
+
+    def __init__(self):
+
+        self.enabled = False
+        self._timers = {}       # dictionary of [number of calls, total seconds] keyed by timer name
+        self._counters = {}     # dictionary of counts keyed by counter name
+
+    def enable(self):
+        """ starts recording """
+        self.enabled = True
+
+    def disable(self):
+        """ stops recording (recorded timers and counters are kept) """
+        self.enabled = False
+
+    def reset(self):
+        """ removes recorded timers and counters """
+        self._timers = {}
+        self._counters = {}
+
+    def timer(self, name):
+        """
+        :param name: name of the timer
+        :return: a context manager that adds the time spent in its block to the timer
+        """
+        if self.enabled:
+            return _Timer(profiler=self, name=name)
+        return _NO_TIMER
+
+    def add_time(self, name, seconds, calls=1):
+        """ adds time to a timer
+        :param name: name of the timer
+        :param seconds: time to add (seconds)
+        :param calls: number of calls the time is spent over
+        """
+        timer = self._timers.setdefault(name, [0, 0.0])
+        timer[0] += calls
+        timer[1] += seconds
+
+    def add_count(self, name, n=1):
+        """ increments a counter
+        :param name: name of the counter
+        :param n: value to add
+        """
+        self._counters[name] = self._counters.get(name, 0) + n
+
+    def profile(self, name):
+        """ a decorator that times every call of a function
+        :param name: name of the timer
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Timer(profiler=self, name=name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def get_report(self):
+        """ :return: (dictionary) timers (calls, total and mean seconds) and counters """
+
+        timers = {}
+        for name, (calls, total) in sorted(self._timers.items(), key=lambda item: -item[1][1]):
+            timers[name] = dict(calls=calls, total_seconds=total, mean_seconds=total / calls if calls > 0 else 0)
+        return dict(timers=timers, counters=dict(sorted(self._counters.items())))
+
+    def export(self, file_name):
+        """ writes the report to a JSON file
+        :param file_name: name of the file
+        """
+        with open(file_name, 'w') as file:
+            json.dump(self.get_report(), file, indent=2)
+
+    def print_report(self):
+        """ prints the timers (longest first) and counters """
+
+        report = self.get_report()
+        print('Timers:')
+        for name, timer in report['timers'].items():
+            print('  {}: {:.4f}s in {:,} call(s)'.format(name, timer['total_seconds'], timer['calls']))
+        print('Counters:')
+        for name, count in report['counters'].items():
+            print('  {}: {:,}'.format(name, count))
+
+
+class _Timer:
+    """ adds the time spent in a with-block to a timer of a profiler """
+    def __init__(self, profiler, name):
+        self._profiler = profiler
+        self._name = name
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._profiler.add_time(name=self._name, seconds=time.perf_counter() - self._start)
+        return False
+
+
+class _NoTimer:
+    """ a with-block that records nothing (used when the profiler is disabled) """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NO_TIMER = _NoTimer()
+
+# profiler shared by the model classes and reporting functions
+PROFILER = Profiler()
@@ -0,0 +1,84 @@
+import numpy as np
+
+
+class RNGStreams:
+    """ independent and reproducible streams of random numbers for every
+    (scenario, cohort, patient) built on the counter-based Philox generator
+
+    Each (scenario, cohort) gets its own Philox key derived with SeedSequence from
+    (seed, scenario, cohort ID), so streams of different cohorts do not overlap no matter
+    the population sizes. Within a cohort, patient i draws from the counter range that
+    starts at [0, i, 0, 0] and the whole cohort draws in bulk from the range that starts
+    at [0, 0, 1, 0], so creating a patient's stream costs no more than setting a counter.
+    """
+
+    def __init__(self, seed=0, scenario=0):
+        """
+        :param seed: (int) seed shared by all streams
+        :param scenario: (int) ID of the scenario (e.g. the index of a therapy or of a sensitivity run)
+        """
+        self.seed = seed
+        self.scenario = scenario
+
+    def get_cohort_key(self, cohort_id):
+        """
+        :param cohort_id: (int) cohort ID
+        :return: the Philox key of the cohort
+        """
+        seed_seq = np.random.SeedSequence(entropy=self.seed, spawn_key=(self.scenario, cohort_id))
+        return seed_seq.generate_state(2, dtype=np.uint64)
+
+    def get_patient_rng(self, cohort_id, patient_index, cohort_key=None):
+        """
+        :param cohort_id: (int) cohort ID
+        :param patient_index: (int) index of the patient in the cohort
+        :param cohort_key: the Philox key of the cohort (to avoid calculating it for every patient)
+        :return: (numpy.random.Generator) random number generator of the patient
+        """
+        if cohort_key is None:
+            cohort_key = self.get_cohort_key(cohort_id)
+        counter = np.array([0, patient_index, 0, 0], dtype=np.uint64)
+        return np.random.Generator(np.random.Philox(key=cohort_key, counter=counter))
+
+    def get_cohort_rng(self, cohort_id):
+        """
+        :param cohort_id: (int) cohort ID
+        :return: (numpy.random.Generator) random number generator to draw for all patients of a cohort in bulk
+        """
+        counter = np.array([0, 0, 1, 0], dtype=np.uint64)
+        return np.random.Generator(np.random.Philox(key=self.get_cohort_key(cohort_id), counter=counter))
+
+    def get_uniforms(self, cohort_id, n_patients, block_size=64):
+        """
+        :param cohort_id: (int) cohort ID
+        :param n_patients: number of patients in the cohort
+        :param block_size: number of time steps to draw at once
+        :return: (UniformBlocks) one uniform random number per patient and time step
+        """
+        return UniformBlocks(rng=self.get_cohort_rng(cohort_id), n_patients=n_patients, block_size=block_size)
+
+
+class UniformBlocks:
+    """ uniform random numbers for all patients of a cohort, drawn a block of time steps at a time
+    (the number drawn for a patient at a time step does not depend on the block size) """
+
+    def __init__(self, rng, n_patients, block_size=64):
+        """
+        :param rng: (numpy.random.Generator) random number generator of the cohort
+        :param n_patients: number of patients in the cohort
+        :param block_size: number of time steps to draw at once
+        """
+        self._rng = rng
+        self._nPatients = n_patients
+        self._blockSize = block_size
+        self._block = np.empty((0, n_patients))
+        self._row = 0
+
+    def get_next(self):
+        """ :return: (array) one uniform random number per patient for the next time step """
+
+        if self._row == len(self._block):
+            self._block = self._rng.random((self._blockSize, self._nPatients))
+            self._row = 0
+        self._row += 1
+        return self._block[self._row - 1]
@@ -0,0 +1,131 @@
+import json
+import os
+
+import numpy as np
+
+METADATA_FILE = 'metadata.json'
+
+
+class ResultsStore:
+    """ results saved as one binary array file (.npy) per column with a small metadata header (JSON)
+    (columns are memory-mapped when loaded, so only the parts of a column that are used are read) """
+
+    def __init__(self, directory, mmap_mode='r'):
+        """
+        :param directory: directory of the store (see write_results)
+        :param mmap_mode: mode to memory-map the columns ('r', 'r+', 'c', or None to read them into memory)
+        """
+
+        with open(os.path.join(directory, METADATA_FILE)) as file:
+            header = json.load(file)
+
+        self.directory = directory
+        self.mmapMode = mmap_mode
+        self.metadata = header['metadata']  # dictionary of information about the results (scenario, seeds, ...)
+        self.columns = header['columns']    # dictionary of (file, dtype, shape) of each column keyed by column name
+
+    def get_names(self, prefix=None):
+        """
+        :param prefix: (string) if provided, only names of columns in this group (e.g. a therapy) are returned
+        :return: (list) names of columns
+        """
+        if prefix is None:
+            return list(self.columns)
+        return [name for name in self.columns if name.startswith(prefix + '/')]
+
+    def get_column(self, name):
+        """
+        :param name: name of the column
+        :return: (numpy array) values of the column (memory-mapped unless mmap_mode is None)
+        """
+        if name not in self.columns:
+            raise KeyError("Column '{}' is not in the results store {}.".format(name, self.directory))
+        return np.load(os.path.join(self.directory, self.columns[name]['file']), mmap_mode=self.mmapMode)
+
+    def get_columns(self, prefix):
+        """
+        :param prefix: (string) group of columns (e.g. a therapy)
+        :return: (dictionary) values of the columns in this group keyed by their names without the prefix
+        """
+        return {name[len(prefix) + 1:]: self.get_column(name) for name in self.get_names(prefix=prefix)}
+
+
+def write_results(directory, columns, metadata=None):
+    """ writes results as a columnar store
+    :param directory: directory to write the store to
+    :param columns: (dictionary) arrays keyed by column names (use '/' to group columns, e.g. 'RAMPIRIL/costs')
+    :param metadata: (dictionary) information about the results (must be serializable to JSON)
+    :return: (ResultsStore) the written store
+    """
+
+    header = dict(metadata={} if metadata is None else metadata, columns={})
+    for name, values in columns.items():
+        file_name = name + '.npy'
+        if os.path.isabs(file_name) or '..' in name.split('/'):
+            raise ValueError("Invalid column name '{}'.".format(name))
+
+        # (np.ascontiguousarray would turn a single value into an array of one element)
+        values = np.require(values, requirements='C')
+        path = os.path.join(directory, file_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.save(path, values)
+        header['columns'][name] = dict(file=file_name, dtype=values.dtype.str, shape=list(values.shape))
+
+    # the header is written last, so a store that failed to be written completely cannot be loaded
+    with open(os.path.join(directory, METADATA_FILE), 'w') as file:
+        json.dump(header, file, indent=2)
+
+    return ResultsStore(directory=directory)
+
+
+def get_cohort_columns(cohort_outcomes, n_time_steps=None, keep_patients=True):
+    """
+    :param cohort_outcomes: (CohortOutcomes) outcomes of a simulated cohort
+    :param n_time_steps: number of time steps of the survival curve (if None, up to the
+        last time step in which a patient reached stage 5)
+    :param keep_patients: set to False to not store the outcomes of each patient
+    :return: (dictionary) columns of the mean outcomes, the survival curve, and
+        (if kept) the outcomes of each patient
+    """
+
+    columns = dict(mean_cost=np.array(cohort_outcomes.statCost.get_mean()),
+                   mean_utility=np.array(cohort_outcomes.statUtility.get_mean()),
+                   n_living=cohort_outcomes.survivalCurve.get_n_living(n_time_steps=n_time_steps))
+
+    if keep_patients:
+        if cohort_outcomes.costs is None:
+            raise ValueError('Outcomes of patients are not kept by this cohort (keep_observations=False).')
+        columns['costs'] = np.asarray(cohort_outcomes.costs, dtype=float)
+        columns['utilities'] = np.asarray(cohort_outcomes.utilities, dtype=float)
+        columns['survival_times'] = np.asarray(cohort_outcomes.survivalTimes, dtype=float)
+
+    return columns
+
+
+def get_multi_cohort_columns(multi_cohort_outcomes, param_sets=None, n_time_steps=None):
+    """
+    :param multi_cohort_outcomes: (MultiCohortOutcomes) outcomes of simulated cohorts
+    :param param_sets: (list) parameter sets of cohorts (to store the parameter draws)
+    :param n_time_steps: number of time steps of the survival curves
+    :return: (dictionary) columns of the mean cost and QALY of each cohort, the survival curves,
+        and the parameter draws (one row per cohort)
+    """
+
+    columns = dict(mean_costs=np.asarray(multi_cohort_outcomes.meanCosts, dtype=float),
+                   mean_qalys=np.asarray(multi_cohort_outcomes.meanQALYs, dtype=float))
+    if len(multi_cohort_outcomes.survivalCurves) > 0:
+        columns['n_living'] = multi_cohort_outcomes.get_survival_curves(n_time_steps=n_time_steps)
+
+    if param_sets is not None:
+        # cohorts simulated before a stopping rule was met
+        param_sets = param_sets[:len(columns['mean_costs'])]
+        columns['params/trans_prob_matrices'] = np.array([param.transRateMatrix for param in param_sets],
+                                                         dtype=float)
+        columns['params/annual_state_costs'] = np.array([param.annualStateCosts for param in param_sets],
+                                                        dtype=float)
+        columns['params/annual_state_utilities'] = np.array([param.annualStateUtilities for param in param_sets],
+                                                            dtype=float)
+        columns['params/annual_treatment_costs'] = np.array([param.annualTreatmentCost for param in param_sets],
+                                                            dtype=float)
+
+    return columns
@@ -25,7 +25,7 @@ multiCohort_therapy.simulate(sim_length=D.SIM_TIME_STEPS)
 
 # # plot the sample paths
 # Path.plot_sample_paths(
-#     sample_paths=multiCohort.multiCohortOutcomes.survivalCurves,
+#     sample_paths=[curve.get_sample_path() for curve in multiCohort.multiCohortOutcomes.survivalCurves],
 #     title='Survival Curves',
 #     x_label='Time-Step (Year)',
 #     y_label='Number Survived',
@@ -0,0 +1,470 @@
+""" runs a named scenario without drawing any figure and writes its results to disk;
+figures are drawn in a separate stage from the saved results
+
+usage:
+    python RunScenario.py list
+    python RunScenario.py run costs --output results
+    python RunScenario.py run multi_cohort --output results --cohorts 50 --workers 4
+    python RunScenario.py plot results/costs
+"""
+
+# (the model and the plotting modules are imported only by the stage that needs them,
+# so that the command line starts quickly)
+import argparse
+import json
+import os
+
+import numpy as np
+
+# therapies simulated in every scenario (the first is the reference therapy)
+THERAPIES = ['NONE', 'RAMPIRIL']
+
+# named scenarios
+# (kind: 'cohort' (one cohort per therapy) or 'multi_cohort' (cohorts with sampled parameters),
+# engine: how cohorts are simulated ('object', 'vectorized', or 'paired' for cohorts,
+# 'object' or 'batched' for multi-cohorts), horizon: number of time steps,
+# pop_size: population size of each cohort, n_cohorts: number of cohorts of each therapy,
+# n_workers: number of worker processes, seed: seed of random number streams (None: legacy seeding))
+SCENARIOS = {
+    'costs': dict(kind='cohort', engine='object', horizon=20, pop_size=2000,
+                  n_cohorts=1, n_workers=1, seed=None),
+    'costs_paired': dict(kind='cohort', engine='paired', horizon=20, pop_size=2000,
+                         n_cohorts=1, n_workers=1, seed=0),
+    'survival': dict(kind='cohort', engine='vectorized', horizon=500, pop_size=2000,
+                     n_cohorts=1, n_workers=1, seed=None),
+    'multi_cohort': dict(kind='multi_cohort', engine='object', horizon=10, pop_size=100,
+                         n_cohorts=200, n_workers=1, seed=None),
+    'psa_batched': dict(kind='multi_cohort', engine='batched', horizon=10, pop_size=100,
+                        n_cohorts=200, n_workers=1, seed=0),
+}
+# modules whose code affects the results of cohorts (and multi-cohorts)
+# (results cached before any of them is edited are not reused; the input data modules are not
+# listed since the values they hold are part of the inputs of each therapy, so editing the data
+# of one therapy does not invalidate the cached results of the others)
+COHORT_MODULES = ['MarkovModelClasses', 'ParameterClasses', 'PayoffClasses', 'ResultsStoreClasses',
+                  'RNGClasses', 'StreamingStatClasses']
+MULTI_COHORT_MODULES = COHORT_MODULES + ['MarkovModelClassesMultiCohorts', 'MultiCohortClasses', 'NealClasses']
+
+
+def get_scenario(name, **overrides):
+    """
+    :param name: name of the scenario (a key of SCENARIOS)
+    :param overrides: settings to change (settings set to None are not changed)
+    :return: (dictionary) settings of the scenario
+    """
+
+    if name not in SCENARIOS:
+        raise ValueError("Unknown scenario '{}'. Scenarios are: {}.".format(name, ', '.join(SCENARIOS)))
+
+    scenario = dict(SCENARIOS[name], name=name)
+    for key, value in overrides.items():
+        if value is not None:
+            scenario[key] = value
+    return scenario
+
+
+def run_scenario(scenario, output_dir, cache=None):
+    """ simulates a scenario and writes its results (without drawing any figure)
+    :param scenario: (dictionary) settings of the scenario (see get_scenario)
+    :param output_dir: directory to write the results to
+    :param cache: (ScenarioCache) if provided, the outcomes of a therapy are loaded from this cache
+        when its inputs are unchanged (and are added to it otherwise)
+    :return: directory where the results are written
+    """
+
+    from ResultsStoreClasses import write_results
+
+    if scenario['kind'] == 'cohort':
+        outcomes = _run_cohorts(scenario, cache=cache)
+    else:
+        outcomes = _run_multi_cohorts(scenario, cache=cache)
+
+    results_dir = os.path.join(output_dir, scenario['name'])
+    write_results(directory=results_dir, columns=outcomes,
+                  metadata=dict(scenario=scenario, therapies=THERAPIES,
+                                summary=get_summary(scenario=scenario, outcomes=outcomes)))
+
+    return results_dir
+
+
+def get_random_streams(scenario, therapy_index):
+    """
+    :param scenario: (dictionary) settings of the scenario
+    :param therapy_index: index of a therapy in THERAPIES
+    :return: (dictionary) the random numbers the cohorts of a therapy draw from: the seed and scenario of
+        their RNGStreams (seed None: RandomStates seeded with cohort and patient IDs) and the cohort IDs
+    """
+
+    if scenario['kind'] == 'cohort':
+        # every therapy simulates the same cohort
+        return dict(seed=scenario['seed'], scenario=0, cohort_ids=[1])
+
+    # the cohorts of each therapy have their own IDs and streams
+    n_cohorts = scenario['n_cohorts']
+    return dict(seed=scenario['seed'], scenario=therapy_index,
+                cohort_ids=list(range(therapy_index * n_cohorts, (therapy_index + 1) * n_cohorts)))
+
+
+def get_if_paired(scenario):
+    """
+    :param scenario: (dictionary) settings of the scenario
+    :return: True if the therapies are simulated with common random numbers
+        (patient i of every therapy draws from the same random numbers), so their outcomes are paired
+    """
+
+    if scenario['engine'] == 'paired':
+        return True
+    streams = get_random_streams(scenario=scenario, therapy_index=0)
+    return all(get_random_streams(scenario=scenario, therapy_index=i) == streams for i in range(len(THERAPIES)))
+
+
+def _get_rng_streams(streams):
+    """
+    :param streams: (dictionary) random numbers of a therapy (see get_random_streams)
+    :return: (RNGStreams) random number streams (None to use RandomStates seeded with IDs)
+    """
+
+    from RNGClasses import RNGStreams
+
+    if streams['seed'] is None:
+        return None
+    return RNGStreams(seed=streams['seed'], scenario=streams['scenario'])
+
+
+def _run_cohorts(scenario, cache=None):
+    """ simulates one cohort of each therapy
+    :param cache: (ScenarioCache) cache of the outcomes of each therapy
+        (both therapies are cached together if they are simulated as a paired cohort)
+    :return: (dictionary) columns of mean outcomes, discounted costs, discounted utilities,
+        survival times, and number of living patients over time under each therapy
+    """
+
+    import InputDataNoTreatment as DataNT
+    import InputDataTreatment as DataT
+    import MarkovModelClasses as Cls
+    import ParameterClasses as P
+    from ResultsStoreClasses import get_cohort_columns
+    from ScenarioCacheClasses import get_code_version
+
+    matrices = {'NONE': DataNT.trans_prob_matrix_one, 'RAMPIRIL': DataT.trans_prob_matrix_one}
+    parameters = {therapy: P.Parameters(therapy=P.Therapies[therapy]) for therapy in THERAPIES}
+    # (every therapy draws from the same random numbers)
+    streams = get_random_streams(scenario=scenario, therapy_index=0)
+    cohort_id = streams['cohort_ids'][0]
+    rng_streams = _get_rng_streams(streams)
+
+    def get_inputs(therapy):
+        # every input that affects the outcomes of a therapy
+        param = parameters[therapy]
+        return dict(kind=scenario['kind'], engine=scenario['engine'], therapy=therapy,
+                    pop_size=scenario['pop_size'], horizon=scenario['horizon'], seed=scenario['seed'],
+                    transition_prob_matrix=matrices[therapy], initial_state=param.initialHealthState,
+                    annual_state_costs=param.annualStateCosts, annual_state_utilities=param.annualStateUtilities,
+                    annual_treatment_cost=param.annualTreatmentCost, discount_rate=param.discountRate,
+                    code_version=get_code_version(COHORT_MODULES))
+
+    def run_paired():
+        cohort = Cls.PairedCohort(id=cohort_id, pop_size=scenario['pop_size'],
+                                  ref_transition_prob_matrix=matrices[THERAPIES[0]],
+                                  ref_parameters=parameters[THERAPIES[0]],
+                                  transition_prob_matrix=matrices[THERAPIES[1]],
+                                  parameters=parameters[THERAPIES[1]],
+                                  rng_streams=rng_streams)
+        cohort.simulate(n_time_steps=scenario['horizon'])
+        columns = {}
+        for therapy, cohort_outcomes in zip(THERAPIES, [cohort.refCohortOutcomes, cohort.cohortOutcomes]):
+            for name, values in get_cohort_columns(cohort_outcomes=cohort_outcomes,
+                                                   n_time_steps=scenario['horizon']).items():
+                columns[therapy + '/' + name] = values
+        return columns
+
+    def run_cohort(therapy):
+        cohort_class = Cls.Cohort if scenario['engine'] == 'object' else Cls.VectorizedCohort
+        cohort = cohort_class(id=cohort_id, pop_size=scenario['pop_size'],
+                              transition_prob_matrix_one=matrices[therapy],
+                              parameters=parameters[therapy],
+                              rng_streams=rng_streams)
+        cohort.simulate(n_time_steps=scenario['horizon'])
+        return get_cohort_columns(cohort_outcomes=cohort.cohortOutcomes, n_time_steps=scenario['horizon'])
+
+    if scenario['engine'] == 'paired':
+        return _get_columns(cache=cache, inputs=dict(arms=[get_inputs(therapy) for therapy in THERAPIES]), run=run_paired)
+
+    outcomes = {}
+    for therapy in THERAPIES:
+        columns = _get_columns(cache=cache, inputs=get_inputs(therapy), run=lambda: run_cohort(therapy))
+        for name, values in columns.items():
+            outcomes[therapy + '/' + name] = values
+    return outcomes
+
+
+def _run_multi_cohorts(scenario, cache=None):
+    """ simulates cohorts with sampled parameters under each therapy
+    :param cache: (ScenarioCache) cache of the outcomes of each therapy
+    :return: (dictionary) columns of mean discounted cost, mean discounted QALY, number of living
+        patients over time, and parameter draws of each cohort under each therapy
+    """
+
+    import MultiCohortClasses as Cls
+    import NealClasses as P
+    from ResultsStoreClasses import get_multi_cohort_columns
+    from ScenarioCacheClasses import get_code_version
+
+    outcomes = {}
+    for i, therapy in enumerate(THERAPIES):
+        streams = get_random_streams(scenario=scenario, therapy_index=i)
+        ids = streams['cohort_ids']
+        rng_streams = _get_rng_streams(streams)
+
+        # every input that affects the outcomes of this therapy
+        generator = P.ParameterGenerator(therapy=P.Therapies[therapy])
+        inputs = dict(kind=scenario['kind'], engine=scenario['engine'], therapy=therapy, ids=ids,
+                      pop_size=scenario['pop_size'], horizon=scenario['horizon'], seed=scenario['seed'],
+                      transition_prob_rows=generator.probMatrixRows,
+                      annual_state_cost_fits=generator.annualStateCostFits,
+                      annual_state_utility_fits=generator.annualStateUtilityFits,
+                      annual_treatment_cost_fit=generator.annualTreatmentCostFit,
+                      discount_rate=P.Data.Discount,
+                      code_version=get_code_version(MULTI_COHORT_MODULES))
+
+        def run():
+            multi_cohort = Cls.MultiCohort(ids=ids, pop_size=scenario['pop_size'],
+                                           therapy=P.Therapies[therapy], rng_streams=rng_streams)
+            if scenario['engine'] == 'batched':
+                multi_cohort.simulate_batched(sim_length=scenario['horizon'],
+                                              seed=0 if scenario['seed'] is None else scenario['seed'])
+            else:
+                multi_cohort.simulate(sim_length=scenario['horizon'], n_workers=scenario['n_workers'])
+            return get_multi_cohort_columns(multi_cohort_outcomes=multi_cohort.multiCohortOutcomes,
+                                            param_sets=multi_cohort.paramSets,
+                                            n_time_steps=scenario['horizon'])
+
+        for name, values in _get_columns(cache=cache, inputs=inputs, run=run).items():
+            outcomes[therapy + '/' + name] = values
+    return outcomes
+
+
+def _get_columns(cache, inputs, run):
+    """
+    :param cache: (ScenarioCache) cache of results (None to always run)
+    :param inputs: (dictionary) every input that affects the results
+    :param run: function that simulates and returns the results as a dictionary of columns
+    :return: (dictionary) columns of results (loaded from the cache if the inputs are unchanged)
+    """
+
+    if cache is None:
+        return run()
+    store = cache.get_or_run(inputs=inputs, run=run)
+    return {name: store.get_column(name) for name in store.get_names()}
+
+
+def get_summary(scenario, outcomes, alpha=0.05):
+    """
+    :param scenario: (dictionary) settings of the scenario
+    :param outcomes: (dictionary) outcomes returned by simulating the scenario
+    :param alpha: significance level of the intervals
+    :return: (dictionary) mean and (1-alpha) interval of cost and utility under each therapy,
+        and of the increase in cost and utility with respect to the reference therapy
+        (normal confidence intervals for cohorts and percentile intervals for multi-cohorts)
+    """
+
+    from EconEvalClasses import CostEffectiveness
+
+    if scenario['kind'] == 'cohort':
+        cost_key, utility_key, interval_type = 'costs', 'utilities', 'c'
+    else:
+        cost_key, utility_key, interval_type = 'mean_costs', 'mean_qalys', 'p'
+
+    # costs and utilities are paired if patients (or cohorts) share random numbers (or parameters)
+    cea = CostEffectiveness(costs=[outcomes[therapy + '/' + cost_key] for therapy in THERAPIES],
+                            effects=[outcomes[therapy + '/' + utility_key] for therapy in THERAPIES],
+                            names=THERAPIES, ref_index=0, if_paired=get_if_paired(scenario))
+
+    def get_estimate(estimates, i):
+        means, intervals = estimates
+        return dict(mean=float(means[i]), interval=[float(bound) for bound in intervals[i]])
+
+    costs = cea.get_costs(interval_type=interval_type, alpha=alpha)
+    utilities = cea.get_effects(interval_type=interval_type, alpha=alpha)
+    increases_in_cost = cea.get_incremental_costs(interval_type=interval_type, alpha=alpha)
+    increases_in_utility = cea.get_incremental_effects(interval_type=interval_type, alpha=alpha)
+    icers, _ = cea.get_icers(interval_type=interval_type, alpha=alpha)
+
+    summary = {}
+    for i, therapy in enumerate(THERAPIES):
+        summary[therapy] = dict(cost=get_estimate(costs, i),
+                                utility=get_estimate(utilities, i),
+                                n_living_at_end=np.mean(outcomes[therapy + '/n_living'][..., -1]).item())
+        if i != cea.refIndex:
+            summary[therapy]['increase_in_cost'] = get_estimate(increases_in_cost, i)
+            summary[therapy]['increase_in_utility'] = get_estimate(increases_in_utility, i)
+            summary[therapy]['icer'] = None if np.isnan(icers[i]) else float(icers[i])
+    return summary
+
+
+def load_results(results_dir):
+    """
+    :param results_dir: directory where the results of a scenario are written
+    :return: (scenario settings, summary, dictionary of outcomes (memory-mapped arrays))
+    """
+
+    from ResultsStoreClasses import ResultsStore
+
+    store = ResultsStore(directory=results_dir)
+    outcomes = {name: store.get_column(name) for name in store.get_names()}
+    return store.metadata['scenario'], store.metadata['summary'], outcomes
+
+
+def plot_results(results_dir, figures=('survival', 'cea')):
+    """ draws the figures of a scenario from its saved results (and saves them in the same directory)
+    :param results_dir: directory where the results of a scenario are written
+    :param figures: figures to draw ('survival': survival curves (and histograms of survival times),
+        'cea': cost-effectiveness plane and incremental net monetary benefit)
+    :return: (list) names of the figure files
+    """
+
+    # the plotting modules are imported only here
+    import matplotlib.pyplot as plt
+
+    scenario, summary, outcomes = load_results(results_dir)
+    if scenario['kind'] == 'cohort':
+        import Support as Support
+        outcomes_none, outcomes_therapy = [_CohortOutcomesFromResults(outcomes=outcomes, therapy=therapy)
+                                           for therapy in THERAPIES]
+        if 'survival' in figures:
+            Support.plot_survival_curves_and_histograms(sim_outcomes_mono=outcomes_none,
+                                                        sim_outcomes_combo=outcomes_therapy)
+        if 'cea' in figures:
+            Support.report_CEA_CBA(sim_outcomes_none=outcomes_none, sim_outcomes_anticoag=outcomes_therapy,
+                                   if_paired=get_if_paired(scenario))
+    else:
+        import MultiCohortSupport as Support
+        outcomes_none, outcomes_therapy = [_MultiCohortOutcomesFromResults(outcomes=outcomes, therapy=therapy)
+                                           for therapy in THERAPIES]
+        if 'survival' in figures:
+            _plot_sets_of_survival_curves(multi_cohort_outcomes_list=[outcomes_none, outcomes_therapy])
+        if 'cea' in figures:
+            Support.report_CEA_CBA(multi_cohort_outcomes_mono=outcomes_none,
+                                   multi_cohort_outcomes_combo=outcomes_therapy)
+
+    # save the figures drawn by the reporting functions (nothing is displayed with a non-interactive backend)
+    file_names = []
+    for i, number in enumerate(plt.get_fignums()):
+        figure = plt.figure(number)
+        title = figure.axes[0].get_title() if len(figure.axes) > 0 else ''
+        file_name = os.path.join(results_dir, '{}_{}.png'.format(
+            i + 1, ''.join(c if c.isalnum() else '_' for c in title.lower()).strip('_') or 'figure'))
+        figure.savefig(file_name, bbox_inches='tight')
+        file_names.append(file_name)
+    plt.close('all')
+
+    return file_names
+
+
+def _plot_sets_of_survival_curves(multi_cohort_outcomes_list):
+    """ draws the survival curves of all cohorts of each therapy """
+
+    import SimPy.Plots.SamplePaths as Path
+
+    Path.plot_sets_of_sample_paths(
+        sets_of_sample_paths=[[curve.get_sample_path() for curve in outcomes.survivalCurves]
+                              for outcomes in multi_cohort_outcomes_list],
+        title='Survival Curves',
+        x_label='Simulation Time Step (year)',
+        y_label='Number of Patients Alive',
+        legends=['No Therapy', 'Rampiril'],
+        transparency=0.4,
+        color_codes=['green', 'blue']
+    )
+
+
+def _get_survival_curve(n_living):
+    """ :return: (SurvivalCurve) survival curve with the given number of living patients at times 0, 1, ... """
+
+    from MarkovModelClasses import SurvivalCurve
+
+    n_living = np.asarray(n_living)
+    return SurvivalCurve(initial_size=int(n_living[0]), n_absorbed=-np.diff(n_living))
+
+
+class _CohortOutcomesFromResults:
+    """ saved outcomes of a cohort with the attributes the reporting functions use
+    (memory-mapped columns are read into arrays since the statistics classes do not accept them) """
+
+    def __init__(self, outcomes, therapy):
+        import SimPy.Statistics as Stat
+
+        self.costs = np.asarray(outcomes[therapy + '/costs'])
+        self.utilities = np.asarray(outcomes[therapy + '/utilities'])
+        self.survivalTimes = np.asarray(outcomes[therapy + '/survival_times'])
+        self.survivalCurve = _get_survival_curve(outcomes[therapy + '/n_living'])
+        self.nLivingPatients = self.survivalCurve.get_sample_path(name='# of living patients')
+        self.statCost = Stat.SummaryStat(name='Discounted cost', data=self.costs)
+        self.statUtility = Stat.SummaryStat(name='Discounted utility', data=self.utilities)
+
+
+class _MultiCohortOutcomesFromResults:
+    """ saved outcomes of a multi-cohort with the attributes the reporting functions use """
+
+    def __init__(self, outcomes, therapy):
+        from StreamingStatClasses import StreamingStat
+
+        self.meanCosts = np.asarray(outcomes[therapy + '/mean_costs'])
+        self.meanQALYs = np.asarray(outcomes[therapy + '/mean_qalys'])
+        self.survivalCurves = [_get_survival_curve(n_living) for n_living in outcomes[therapy + '/n_living']]
+        self.statMeanCost = StreamingStat(name='Average cost')
+        self.statMeanCost.add(self.meanCosts)
+        self.statMeanQALY = StreamingStat(name='Average QALY')
+        self.statMeanQALY.add(self.meanQALYs)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Runs named scenarios of the CKD Markov models.')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    subparsers.add_parser('list', help='lists the named scenarios')
+
+    run_parser = subparsers.add_parser('run', help='simulates a scenario and writes its results')
+    run_parser.add_argument('scenario', choices=list(SCENARIOS), help='name of the scenario')
+    run_parser.add_argument('--output', default='results', help='directory to write the results to')
+    run_parser.add_argument('--horizon', type=int, default=None, help='number of time steps')
+    run_parser.add_argument('--pop-size', type=int, default=None, help='population size of each cohort')
+    run_parser.add_argument('--cohorts', type=int, default=None, help='number of cohorts of each therapy')
+    run_parser.add_argument('--workers', type=int, default=None, help='number of worker processes')
+    run_parser.add_argument('--seed', type=int, default=None, help='seed of random number streams')
+    run_parser.add_argument('--cache', default=None,
+                            help='directory of a cache to reuse the outcomes of therapies whose inputs are unchanged')
+    run_parser.add_argument('--cache-size', type=float, default=1024, help='maximum size of the cache (MB)')
+
+    plot_parser = subparsers.add_parser('plot', help='draws the figures of a scenario from its saved results')
+    plot_parser.add_argument('results', help='directory where the results of the scenario are written')
+    plot_parser.add_argument('--figures', nargs='+', choices=['survival', 'cea'], default=['survival', 'cea'],
+                             help='figures to draw')
+
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for scenario_name, settings in SCENARIOS.items():
+            print(scenario_name + ': ' + ', '.join('{}={}'.format(key, value) for key, value in settings.items()))
+
+    elif args.command == 'run':
+        selected_scenario = get_scenario(args.scenario, horizon=args.horizon, pop_size=args.pop_size,
+                                         n_cohorts=args.cohorts, n_workers=args.workers, seed=args.seed)
+        scenario_cache = None
+        if args.cache is not None:
+            from ScenarioCacheClasses import ScenarioCache
+            scenario_cache = ScenarioCache(directory=args.cache, max_size_mb=args.cache_size)
+        directory = run_scenario(scenario=selected_scenario, output_dir=args.output, cache=scenario_cache)
+        print(json.dumps(load_results(results_dir=directory)[1], indent=2))
+        if scenario_cache is not None:
+            print('Outcomes loaded from the cache: {} of {}'.format(
+                scenario_cache.nHits, scenario_cache.nHits + scenario_cache.nMisses))
+        print('Results are written to', directory)
+
+    else:
+        # draw no figure window unless a backend is selected
+        os.environ.setdefault('MPLBACKEND', 'Agg')
+        for figure_file in plot_results(results_dir=args.results, figures=args.figures):
+            print('Figure is written to', figure_file)
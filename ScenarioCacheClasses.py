@@ -0,0 +1,159 @@
+import hashlib
+import importlib
+import json
+import os
+import shutil
+import uuid
+from enum import Enum
+
+import numpy as np
+
+from ResultsStoreClasses import METADATA_FILE, ResultsStore, write_results
+
+
+class ScenarioCache:
+    """ results of simulated scenarios (or arms of scenarios) saved on disk under a hash of their inputs,
+    so that a run with unchanged inputs loads its results instead of simulating again
+    (the least recently used results are removed once the cache grows beyond its limits) """
+
+    def __init__(self, directory, max_size_mb=1024, max_entries=None):
+        """
+        :param directory: directory of the cache
+        :param max_size_mb: maximum size of the cache (MB)
+        :param max_entries: maximum number of cached results (None: no limit)
+        """
+
+        self.directory = directory
+        self.maxSize = max_size_mb * 2 ** 20
+        self.maxEntries = max_entries
+        self.nHits = 0      # number of results loaded from the cache
+        self.nMisses = 0    # number of results simulated because they were not in the cache
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, key):
+        """
+        :param key: (string) hash of the inputs (see get_key)
+        :return: (ResultsStore) cached results (None if not in the cache)
+        """
+
+        entry_dir = os.path.join(self.directory, key)
+        if not os.path.exists(os.path.join(entry_dir, METADATA_FILE)):
+            return None
+
+        # mark as the most recently used
+        os.utime(os.path.join(entry_dir, METADATA_FILE))
+        return ResultsStore(directory=entry_dir)
+
+    def put(self, key, columns, metadata=None):
+        """ adds results to the cache (and removes the least recently used results if needed)
+        :param key: (string) hash of the inputs (see get_key)
+        :param columns: (dictionary) arrays of results keyed by column names
+        :param metadata: (dictionary) information about the results (must be serializable to JSON)
+        :return: (ResultsStore) cached results
+        """
+
+        # write to a temporary directory first, so that other runs never see a partly written entry
+        entry_dir = os.path.join(self.directory, key)
+        temp_dir = os.path.join(self.directory, '.tmp-' + uuid.uuid4().hex)
+        write_results(directory=temp_dir, columns=columns, metadata=metadata)
+        try:
+            os.rename(temp_dir, entry_dir)
+        except OSError:
+            # the same results were added by another run
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        self.evict(keep=key)
+        return ResultsStore(directory=entry_dir)
+
+    def get_or_run(self, inputs, run):
+        """
+        :param inputs: (dictionary) every input that affects the results (see get_key)
+        :param run: function that takes no argument and returns the results as a dictionary of arrays
+        :return: (ResultsStore) results loaded from the cache, or results of run (which are then cached)
+        """
+
+        key = get_key(inputs=inputs)
+        store = self.get(key=key)
+        if store is not None:
+            self.nHits += 1
+            return store
+
+        self.nMisses += 1
+        return self.put(key=key, columns=run(), metadata=dict(inputs=_to_json(inputs)))
+
+    def get_entries(self):
+        """ :return: (list) of (key, size in bytes, time last used) of cached results, least recently used first """
+
+        entries = []
+        for key in os.listdir(self.directory):
+            metadata_file = os.path.join(self.directory, key, METADATA_FILE)
+            if key.startswith('.') or not os.path.exists(metadata_file):
+                continue
+            size = sum(os.path.getsize(os.path.join(root, file_name))
+                       for root, _, file_names in os.walk(os.path.join(self.directory, key))
+                       for file_name in file_names)
+            entries.append((key, size, os.path.getmtime(metadata_file)))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def evict(self, keep=None):
+        """ removes the least recently used results until the cache is within its limits
+        :param keep: key of results not to remove (e.g. the results just added)
+        """
+
+        entries = self.get_entries()
+        total_size = sum(entry[1] for entry in entries)
+        n_entries = len(entries)
+        for key, size, _ in entries:
+            if total_size <= self.maxSize and (self.maxEntries is None or n_entries <= self.maxEntries):
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+            total_size -= size
+            n_entries -= 1
+
+    def clear(self):
+        """ removes all cached results """
+        for key in os.listdir(self.directory):
+            shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+
+
+def get_key(inputs):
+    """
+    :param inputs: (dictionary) every input that affects the results (transition probabilities, costs,
+        utilities, discount rate, population size, time horizon, seeds, code version, ...)
+        (values can be numbers, strings, enums, lists, dictionaries, and numpy arrays)
+    :return: (string) hash of the inputs
+    """
+    text = json.dumps(_to_json(inputs), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def get_code_version(module_names):
+    """
+    :param module_names: (list) names of the modules the results depend on
+    :return: (string) hash of the source code of these modules (changes whenever any of them is edited)
+    """
+
+    digest = hashlib.sha256()
+    for name in sorted(module_names):
+        with open(importlib.import_module(name).__file__, 'rb') as file:
+            digest.update(name.encode('utf-8'))
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def _to_json(value):
+    """ :return: the value with enums, tuples, and numpy types converted to what can be serialized to JSON """
+
+    if isinstance(value, dict):
+        return {str(key): _to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, range)):
+        return [_to_json(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, Enum):
+        return type(value).__name__ + '.' + value.name
+    return value
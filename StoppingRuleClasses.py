@@ -0,0 +1,90 @@
+import numpy as np
+
+from StreamingStatClasses import StreamingStat
+
+
+class StoppingRule:
+    """ when to stop simulating more patients (or cohorts): once the half-width of the
+    t-confidence interval of each selected outcome falls below its target """
+
+    def __init__(self, batch_size, cost_half_width=None, utility_half_width=None,
+                 nmb_half_width=None, wtp=None, alpha=0.05, min_n=None):
+        """
+        :param batch_size: number of patients (or cohorts) to simulate between checks
+        :param cost_half_width: target half-width for the mean discounted cost
+        :param utility_half_width: target half-width for the mean discounted utility (QALY)
+        :param nmb_half_width: target half-width for the mean incremental net monetary benefit
+            (needs outcomes under a reference therapy)
+        :param wtp: willingness-to-pay per QALY (to calculate the net monetary benefit)
+        :param alpha: significance level of the confidence intervals
+        :param min_n: minimum number of patients (or cohorts) to simulate (default: batch_size)
+        """
+
+        if batch_size < 2:
+            raise ValueError('batch_size should be at least 2.')
+        if nmb_half_width is not None and wtp is None:
+            raise ValueError('wtp is needed to check the half-width of incremental net monetary benefit.')
+
+        self.batchSize = batch_size
+        self.costHalfWidth = cost_half_width
+        self.utilityHalfWidth = utility_half_width
+        self.nmbHalfWidth = nmb_half_width
+        self.wtp = wtp
+        self.alpha = alpha
+        self.minN = batch_size if min_n is None else max(min_n, 2)
+
+    def get_batches(self, n):
+        """
+        :param n: maximum number of patients (or cohorts)
+        :return: (list) of ranges of indices to simulate in each batch
+        """
+        return [range(i, min(i + self.batchSize, n)) for i in range(0, n, self.batchSize)]
+
+
+class PrecisionMonitor:
+    """ updates the summary statistics of outcomes batch by batch to check a stopping rule """
+
+    def __init__(self, stopping_rule):
+        """
+        :param stopping_rule: (StoppingRule) stopping rule to check
+        """
+
+        self.stoppingRule = stopping_rule
+        self.statCost = StreamingStat(name='Cost')
+        self.statUtility = StreamingStat(name='Utility')
+        self.statNMB = StreamingStat(name='Incremental net monetary benefit')
+
+    def update(self, costs, utilities, ref_costs=None, ref_utilities=None):
+        """ adds a batch of observations
+        :param costs: discounted costs
+        :param utilities: discounted utilities
+        :param ref_costs: discounted costs under the reference therapy (paired with costs)
+        :param ref_utilities: discounted utilities under the reference therapy (paired with utilities)
+        """
+
+        costs = np.asarray(costs, dtype=float)
+        utilities = np.asarray(utilities, dtype=float)
+        if ref_costs is not None:
+            self.statNMB.add(
+                self.stoppingRule.wtp * (utilities - np.asarray(ref_utilities)) - (costs - np.asarray(ref_costs)))
+        elif self.stoppingRule.nmbHalfWidth is not None:
+            raise ValueError('Outcomes under a reference therapy are needed to check '
+                             'the half-width of incremental net monetary benefit.')
+        self.statCost.add(costs)
+        self.statUtility.add(utilities)
+
+    def get_half_widths(self):
+        """ :return: half-widths of the t-confidence intervals of mean cost, utility, and
+        incremental net monetary benefit """
+
+        return [stat.get_t_half_length(self.stoppingRule.alpha) if stat.get_n() > 1 else np.inf
+                for stat in (self.statCost, self.statUtility, self.statNMB)]
+
+    def get_if_precise(self):
+        """ :return: True if every target half-width of the stopping rule is met """
+
+        if self.statCost.get_n() < self.stoppingRule.minN:
+            return False
+        half_widths = self.get_half_widths()
+        targets = [self.stoppingRule.costHalfWidth, self.stoppingRule.utilityHalfWidth, self.stoppingRule.nmbHalfWidth]
+        return all(target is None or half_width <= target for half_width, target in zip(half_widths, targets))
@@ -0,0 +1,163 @@
+import math
+
+import numpy as np
+
+import SimPy.Statistics as Stat
+
+
+class StreamingStat(Stat._Statistics):
+    """ summary statistics of observations that are added one batch at a time and not stored
+    (count, mean, variance, minimum and maximum are exact, percentiles are from a QuantileSketch);
+    statistics of different batches (e.g. from worker processes) can be merged """
+
+    def __init__(self, name=None, sketch_size=1024):
+        """
+        :param name: name of this statistics
+        :param sketch_size: number of observations the quantile sketch keeps per level
+            (percentiles are exact while no more observations than this are added)
+        """
+
+        Stat._Statistics.__init__(self, name)
+        self._total = 0
+        self._sumSquares = 0    # sum of squared deviations from the mean
+        self._sketch = QuantileSketch(size=sketch_size)
+
+    def add(self, data):
+        """ adds observations
+        :param data: an observation or a list or numpy.array of observations
+        """
+
+        data = np.asarray(data, dtype=float).ravel()
+        if len(data) == 0:
+            return
+
+        mean = float(np.mean(data))
+        self._combine(n=len(data), total=float(np.sum(data)), mean=mean,
+                      sum_squares=float(np.sum((data - mean) ** 2)),
+                      min_value=float(np.min(data)), max_value=float(np.max(data)))
+        self._sketch.add(data)
+
+    def merge(self, other):
+        """ adds the observations summarized by another StreamingStat
+        :param other: (StreamingStat) statistics to merge into this one
+        """
+
+        if other._n == 0:
+            return
+        self._combine(n=other._n, total=other._total, mean=other._mean, sum_squares=other._sumSquares,
+                      min_value=other._min, max_value=other._max)
+        self._sketch.merge(other._sketch)
+
+    def _combine(self, n, total, mean, sum_squares, min_value, max_value):
+        """ combines the summary of a batch of observations with the current summary """
+
+        n_combined = self._n + n
+        delta = mean - self._mean
+        self._mean += delta * n / n_combined
+        self._sumSquares += sum_squares + delta ** 2 * self._n * n / n_combined
+        self._n = n_combined
+        self._total += total
+        self._min = min(self._min, min_value)
+        self._max = max(self._max, max_value)
+
+    def get_n(self):
+        return self._n
+
+    def get_total(self):
+        return self._total
+
+    def get_mean(self):
+        return self._mean if self._n > 0 else math.nan
+
+    def get_stdev(self):
+        return math.sqrt(self._sumSquares / (self._n - 1)) if self._n > 1 else math.nan
+
+    def get_min(self):
+        return self._min
+
+    def get_max(self):
+        return self._max
+
+    def get_percentile(self, q):
+        """
+        :param q: percentile to compute (q in range [0, 100])
+        :returns: qth percentile """
+
+        return self._sketch.get_percentile(q)
+
+    def get_PI(self, alpha=0.05):
+        """
+        :param alpha: significance level (between 0 and 1)
+        :return: percentile interval in the format of list [l, u]
+        """
+        return [self.get_percentile(100 * alpha / 2), self.get_percentile(100 * (1 - alpha / 2))]
+
+
+class QuantileSketch:
+    """ a mergeable sketch to estimate percentiles from a bounded number of observations
+    (each level keeps at most 'size' observations; when a level is full, every other one of its
+    sorted observations moves to the next level, where each observation counts twice as much) """
+
+    def __init__(self, size=1024):
+        """
+        :param size: number of observations kept per level
+        """
+
+        self.size = size
+        self._levels = [np.empty(0)]    # observations of level i have weight 2^i
+        self._nCompactions = 0          # to alternate which half of observations is kept
+
+    def add(self, data):
+        """ adds a numpy.array of observations """
+
+        self._levels[0] = np.concatenate([self._levels[0], data])
+        self._compact()
+
+    def merge(self, other):
+        """ adds the observations kept by another QuantileSketch """
+
+        for i, level in enumerate(other._levels):
+            if i == len(self._levels):
+                self._levels.append(np.empty(0))
+            self._levels[i] = np.concatenate([self._levels[i], level])
+        self._compact()
+
+    def _compact(self):
+        """ moves half of the observations of each full level to the next level """
+
+        i = 0
+        while i < len(self._levels):
+            level = self._levels[i]
+            if len(level) > self.size:
+                level = np.sort(level)
+                # an odd observation out stays at this level
+                n_even = len(level) - len(level) % 2
+                if i + 1 == len(self._levels):
+                    self._levels.append(np.empty(0))
+                self._levels[i + 1] = np.concatenate(
+                    [self._levels[i + 1], level[self._nCompactions % 2:n_even:2]])
+                self._levels[i] = level[n_even:]
+                self._nCompactions += 1
+            i += 1
+
+    def get_percentile(self, q):
+        """
+        :param q: percentile to compute (q in range [0, 100])
+        :returns: estimated qth percentile """
+
+        if len(self._levels) == 1:
+            # no observation is dropped yet
+            if len(self._levels[0]) == 0:
+                return math.nan
+            return float(np.percentile(self._levels[0], q))
+
+        # weighted observations sorted by value
+        values = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** i) for i, level in enumerate(self._levels)])
+        order = np.argsort(values)
+        values = values[order]
+        weights = weights[order]
+
+        # position of each observation in the distribution (at the middle of its weight)
+        positions = (np.cumsum(weights) - weights / 2) / np.sum(weights)
+        return float(np.interp(q / 100, positions, values))
@@ -4,8 +4,10 @@ import SimPy.EconEval as Econ
 import SimPy.Plots.Histogram as Hist
 import SimPy.Plots.SamplePaths as Path
 import SimPy.Statistics as Stat
+from ProfilerClasses import PROFILER
 
 
+@PROFILER.profile(name='Support.print_outcomes')
 def print_outcomes(sim_outcomes, therapy_name):
     """ prints the outcomes of a simulated cohort
     :param sim_outcomes: outcomes of a simulated cohort
@@ -51,6 +53,7 @@ def print_outcomes(sim_outcomes, therapy_name):
     print("")
 
 
+@PROFILER.profile(name='Support.plot_survival_curves_and_histograms')
 def plot_survival_curves_and_histograms(sim_outcomes_mono, sim_outcomes_combo):
     """ draws the survival curves and the histograms of time until HIV deaths
     :param sim_outcomes_mono: outcomes of a cohort simulated under mono therapy
@@ -92,13 +95,22 @@ def plot_survival_curves_and_histograms(sim_outcomes_mono, sim_outcomes_combo):
     )
 
 
-def print_comparative_outcomes(sim_outcomes_none, sim_outcomes_anticoag):
+@PROFILER.profile(name='Support.print_comparative_outcomes')
+def print_comparative_outcomes(sim_outcomes_none, sim_outcomes_anticoag, if_paired=False):
     """ prints average increase in survival time, discounted cost, and discounted utility
     under combination therapy compared to mono therapy
     :param sim_outcomes_none: outcomes of a cohort simulated under mono therapy
     :param sim_outcomes_anticoag: outcomes of a cohort simulated under combination therapy
+    :param if_paired: set to True if both cohorts are simulated with common random numbers
+        (e.g. by MarkovModelClasses.PairedCohort)
     """
 
+    # paired differences if patients are simulated with common random numbers
+    if if_paired:
+        difference_stat = Stat.DifferenceStatPaired
+    else:
+        difference_stat = Stat.DifferenceStatIndp
+
     # # increase in mean survival time under combination therapy with respect to mono therapy
     # increase_survival_time = Stat.DifferenceStatIndp(
     #     name='Increase in mean survival time',
@@ -114,7 +126,7 @@ def print_comparative_outcomes(sim_outcomes_none, sim_outcomes_anticoag):
     #       estimate_CI)
 
     # increase in mean discounted cost under combination therapy with respect to mono therapy
-    increase_discounted_cost = Stat.DifferenceStatIndp(
+    increase_discounted_cost = difference_stat(
         name='Increase in mean discounted cost',
         x=sim_outcomes_anticoag.costs,
         y_ref=sim_outcomes_none.costs)
@@ -129,7 +141,7 @@ def print_comparative_outcomes(sim_outcomes_none, sim_outcomes_anticoag):
           estimate_CI)
 
     # increase in mean discounted utility under combination therapy with respect to mono therapy
-    increase_discounted_utility = Stat.DifferenceStatIndp(
+    increase_discounted_utility = difference_stat(
         name='Increase in mean discounted utility',
         x=sim_outcomes_anticoag.utilities,
         y_ref=sim_outcomes_none.utilities)
@@ -146,10 +158,12 @@ def print_comparative_outcomes(sim_outcomes_none, sim_outcomes_anticoag):
 
 
 
-def report_CEA_CBA(sim_outcomes_none, sim_outcomes_anticoag):
+@PROFILER.profile(name='Support.report_CEA_CBA')
+def report_CEA_CBA(sim_outcomes_none, sim_outcomes_anticoag, if_paired=False):
     """ performs cost-effectiveness and cost-benefit analyses
     :param sim_outcomes_none: outcomes of a cohort simulated under mono therapy
     :param sim_outcomes_anticoag: outcomes of a cohort simulated under combination therapy
+    :param if_paired: set to True if both cohorts are simulated with common random numbers
     """
 
     # define two strategies
@@ -170,7 +184,7 @@ def report_CEA_CBA(sim_outcomes_none, sim_outcomes_anticoag):
     # (the first strategy in the list of strategies is assumed to be the 'Base' strategy)
     CEA = Econ.CEA(
         strategies=[no_therapy_strategy, anticoag_therapy_strategy],
-        if_paired=False
+        if_paired=if_paired
     )
 
     # plot cost-effectiveness figure
@@ -196,7 +210,7 @@ def report_CEA_CBA(sim_outcomes_none, sim_outcomes_anticoag):
     NBA = Econ.CBA(
         strategies=[no_therapy_strategy, anticoag_therapy_strategy],
         wtp_range=[0, 50000],
-        if_paired=False
+        if_paired=if_paired
     )
     # show the net monetary benefit figure
     NBA.plot_incremental_nmbs(
@@ -0,0 +1,140 @@
+import itertools
+from functools import lru_cache
+
+import numpy as np
+
+from EconEvalClasses import CostEffectiveness
+from InputDataNoTreatment import CKDStates
+
+
+class ValueOfInformation:
+    """ expected value of perfect information (EVPI) and of partial perfect information (EVPPI)
+    from the costs and effects of strategies over probabilistic sensitivity analysis draws
+    (EVPPI is estimated by regressing costs and effects on the parameters of interest
+    (Strong, Oakley, and Brennan 2014), so it needs no nested simulation) """
+
+    def __init__(self, costs, effects, names=None):
+        """
+        :param costs: mean discounted cost of each draw (one row per draw, one column per strategy),
+            or a list with the costs of each strategy
+        :param effects: mean discounted effect (e.g. QALY) of each draw with the same shape as costs
+        :param names: (list) names of strategies
+        """
+        self.costEffectiveness = CostEffectiveness(costs=costs, effects=effects, names=names)
+
+    def get_evpi(self, wtps):
+        """
+        :param wtps: willingness-to-pay values for one unit of effect
+        :return: expected value of perfect information at each willingness-to-pay value
+        """
+        return self.costEffectiveness.get_evpi(wtps=wtps)
+
+    def get_evppi(self, params, wtps, degree=2):
+        """
+        :param params: values of the parameters of interest (one row per draw, one column per parameter)
+        :param wtps: willingness-to-pay values for one unit of effect
+        :param degree: degree of the polynomial regression of costs and effects on the parameters
+            (a high degree with many parameters and few draws over-fits and over-estimates EVPPI)
+        :return: expected value of partial perfect information at each willingness-to-pay value
+        """
+
+        design = get_design_matrix(params=params, degree=degree)
+        if design.shape[1] >= self.costEffectiveness.nDraws:
+            raise ValueError('The number of draws should be larger than the number of regression terms ({}).'
+                             .format(design.shape[1]))
+
+        # costs and effects expected given the parameters of interest
+        # (the net monetary benefit is linear in costs and effects, so it does not need to be
+        # regressed again at each willingness-to-pay value)
+        fitted = CostEffectiveness(costs=_get_fitted_values(design, self.costEffectiveness.costs),
+                                   effects=_get_fitted_values(design, self.costEffectiveness.effects))
+
+        # expected value of learning the parameters of interest (negative values are due to noise)
+        return np.maximum(fitted.get_evpi(wtps=wtps), 0)
+
+    def get_evppis(self, parameter_groups, wtps, degree=2):
+        """
+        :param parameter_groups: (dictionary) values of the parameters of each group keyed by group names
+            (see get_parameter_groups)
+        :param wtps: willingness-to-pay values for one unit of effect
+        :param degree: degree of the polynomial regression
+        :return: (dictionary) expected value of partial perfect information of each group
+            at each willingness-to-pay value
+        """
+        return {name: self.get_evppi(params=params, wtps=wtps, degree=degree)
+                for name, params in parameter_groups.items()}
+
+
+def get_design_matrix(params, degree=2, means=None, st_devs=None):
+    """
+    :param params: values of parameters (one row per draw, one column per parameter)
+    :param degree: degree of the polynomial (at least 1)
+    :param means: means to standardize the parameters with (if None, the means of params)
+    :param st_devs: standard deviations to standardize the parameters with (if None, those of params)
+        (e.g. the means and standard deviations of the draws a regression is fitted on, to predict new draws)
+    :return: (2-D array) intercept and every product of up to 'degree' standardized parameters
+        (parameters whose standard deviation is zero are left out)
+    """
+
+    params = np.asarray(params, dtype=float)
+    if params.ndim == 1:
+        params = params[:, np.newaxis]
+    if means is None:
+        means = params.mean(axis=0)
+    if st_devs is None:
+        st_devs = params.std(axis=0)
+
+    # standardize parameters (to keep the regression well-conditioned)
+    varying = np.flatnonzero(np.asarray(st_devs) > 0)
+    x = (params[:, varying] - np.asarray(means)[varying]) / np.asarray(st_devs)[varying]
+
+    # every product of up to 'degree' parameters (a column of ones stands for the missing factors)
+    x = np.hstack([x, np.ones((len(x), 1))])
+    return np.prod(x[:, _get_terms(n_params=len(varying), degree=degree)], axis=2)
+
+
+@lru_cache(maxsize=None)
+def _get_terms(n_params, degree):
+    """ :return: (2-D array) indices of the parameters multiplied in each term of a polynomial
+    (one row per term, padded with n_params, the index of a column of ones) """
+
+    if degree < 1:
+        raise ValueError('degree should be at least 1.')
+    return np.array([terms + (n_params,) * (degree - d)
+                     for d in range(degree + 1)
+                     for terms in itertools.combinations_with_replacement(range(n_params), d)],
+                    dtype=np.intp).reshape(-1, degree)
+
+
+def _get_fitted_values(design, values):
+    """
+    :param design: design matrix of the regression
+    :param values: values to regress (one column per strategy)
+    :return: values fitted by least squares
+    """
+    coefficients = np.linalg.lstsq(design, values, rcond=None)[0]
+    return design @ coefficients
+
+
+def get_parameter_groups(param_columns):
+    """
+    :param param_columns: (list) parameter draws of each strategy as returned by
+        ResultsStoreClasses.get_multi_cohort_columns (or ResultsStore.get_columns of a therapy)
+        (the draws of strategies are paired by their index)
+    :return: (dictionary) values of the parameters of each group (one row per draw) keyed by group name:
+        transition probabilities out of each state, annual state costs, annual state utilities,
+        and annual treatment cost (parameters of all strategies are combined)
+    """
+
+    groups = {}
+    for columns in param_columns:
+        matrices = np.asarray(columns['params/trans_prob_matrices'])
+        for s in CKDStates:
+            if s != CKDStates.STAGE5:
+                groups.setdefault('Transition probabilities out of ' + s.name, []).append(matrices[:, s.value, :])
+        groups.setdefault('Annual state costs', []).append(np.asarray(columns['params/annual_state_costs']))
+        groups.setdefault('Annual state utilities', []).append(np.asarray(columns['params/annual_state_utilities']))
+        groups.setdefault('Annual treatment cost', []).append(
+            np.asarray(columns['params/annual_treatment_costs'])[:, np.newaxis])
+
+    return {name: np.hstack(values) for name, values in groups.items()}
@@ -0,0 +1,114 @@
+from statistics import NormalDist
+
+import numpy as np
+import pytest
+
+import EconEvalClasses as Econ
+
+
+def get_draws(n=2000, seed=1):
+    """ :return: (costs, effects) of three strategies whose costs and effects are correlated within draws """
+    rng = np.random.RandomState(seed=seed)
+    common = rng.normal(size=(n, 1))
+    costs = np.array([1000, 1500, 1300]) + 100 * common + 50 * rng.normal(size=(n, 3))
+    effects = np.array([1, 1.2, 1.1]) + 0.05 * common + 0.02 * rng.normal(size=(n, 3)) + 0.0001 * costs
+    return costs, effects
+
+
+def test_paired_increases_are_measured_within_draws():
+    """ with paired draws, increases are the mean and spread of the differences within draws """
+
+    costs, effects = get_draws()
+    cea = Econ.CostEffectiveness(costs=costs, effects=effects)
+    z = NormalDist().inv_cdf(0.975)
+
+    d_costs = costs - costs[:, [0]]
+    d_effects = effects - effects[:, [0]]
+    means, intervals = cea.get_incremental_costs(interval_type='c')
+    assert np.allclose(means, d_costs.mean(axis=0))
+    assert np.allclose(intervals[:, 1] - means, z * d_costs.std(axis=0, ddof=1) / np.sqrt(len(costs)))
+    means, intervals = cea.get_incremental_effects(interval_type='p')
+    assert np.allclose(intervals, np.percentile(d_effects, [2.5, 97.5], axis=0).T)
+
+    icers, intervals = cea.get_icers(interval_type='c')
+    assert np.isnan(icers[0]) and np.all(np.isnan(intervals[0]))
+    assert np.allclose(icers[1:], d_costs.mean(axis=0)[1:] / d_effects.mean(axis=0)[1:])
+    assert np.all((intervals[1:, 0] < icers[1:]) & (icers[1:] < intervals[1:, 1]))
+
+    # the confidence interval of incremental NMB is that of the NMB of each draw
+    wtps = np.array([0, 5000, 20000])
+    means, intervals = cea.get_incremental_nmbs(wtps=wtps, interval_type='c')
+    nmbs = d_effects[:, :, np.newaxis] * wtps - d_costs[:, :, np.newaxis]
+    assert np.allclose(means, nmbs.mean(axis=0))
+    assert np.allclose(intervals[..., 1] - means, z * nmbs.std(axis=0, ddof=1) / np.sqrt(len(costs)))
+
+
+def test_unpaired_increases_compare_independent_draws():
+    """ with independent draws, increases are differences of means whose variances add up,
+    and percentile intervals come from pairs of draws sampled at random """
+
+    costs, effects = get_draws()
+    cea = Econ.CostEffectiveness(costs=costs, effects=effects, if_paired=False)
+    paired_cea = Econ.CostEffectiveness(costs=costs, effects=effects)
+    z = NormalDist().inv_cdf(0.975)
+
+    means, intervals = cea.get_incremental_costs(interval_type='c')
+    assert means[0] == 0 and np.allclose(means, costs.mean(axis=0) - costs[:, 0].mean())
+    variances = costs.var(axis=0, ddof=1) + costs[:, 0].var(ddof=1)
+    assert np.allclose(intervals[1:, 1] - means[1:], z * np.sqrt(variances[1:] / len(costs)))
+    # the costs are positively correlated within draws, so ignoring the pairing widens the intervals
+    paired_intervals = paired_cea.get_incremental_costs(interval_type='c')[1]
+    assert np.all(np.diff(intervals[1:], axis=1) > np.diff(paired_intervals[1:], axis=1))
+
+    means, intervals = cea.get_incremental_costs(interval_type='p')
+    assert len(cea.incrementalCosts) == max(len(costs), Econ.N_RESAMPLES)
+    assert np.all((intervals[1:, 0] < means[1:]) & (means[1:] < intervals[1:, 1]))
+    assert np.all(np.diff(intervals[1:], axis=1) > np.diff(paired_cea.get_incremental_costs('p')[1][1:], axis=1))
+
+    # the same draws give the same intervals
+    assert np.array_equal(intervals, Econ.CostEffectiveness(costs=costs, effects=effects, if_paired=False)
+                          .get_incremental_costs(interval_type='p')[1])
+
+
+def test_costs_and_effects_of_each_strategy():
+    """ the mean and interval of the cost and effect of each strategy """
+
+    costs, effects = get_draws()
+    cea = Econ.CostEffectiveness(costs=[costs[:, 0], costs[:, 1], costs[:, 2]], effects=effects)
+    means, intervals = cea.get_costs(interval_type='p')
+    assert np.allclose(means, costs.mean(axis=0))
+    assert np.allclose(intervals, np.percentile(costs, [2.5, 97.5], axis=0).T)
+    means, intervals = cea.get_effects(interval_type='c', alpha=0.1)
+    half_widths = NormalDist().inv_cdf(0.95) * effects.std(axis=0, ddof=1) / np.sqrt(len(effects))
+    assert np.allclose(intervals, np.column_stack([means - half_widths, means + half_widths]))
+
+    with pytest.raises(ValueError):
+        cea.get_costs(interval_type='x')
+    with pytest.raises(ValueError):
+        Econ.CostEffectiveness(costs=costs, effects=effects[:, :2])
+
+
+def test_acceptability_curves_and_evpi(monkeypatch):
+    """ acceptability curves are the frequencies with which each strategy is the best in a draw,
+    EVPI is the expected value of choosing the best strategy of each draw, and neither depends
+    on how many willingness-to-pay values are computed at once """
+
+    costs, effects = get_draws()
+    cea = Econ.CostEffectiveness(costs=costs, effects=effects)
+    wtps = np.linspace(0, 10000, 11)
+
+    nmbs = effects[:, :, np.newaxis] * wtps - costs[:, :, np.newaxis]
+    best = nmbs.argmax(axis=1)
+    curves = cea.get_acceptability_curves(wtps=wtps)
+    assert np.allclose(curves.sum(axis=0), 1)
+    assert np.allclose(curves, [(best == i).mean(axis=0) for i in range(3)])
+    evpi = cea.get_evpi(wtps=wtps)
+    assert np.allclose(evpi, nmbs.max(axis=1).mean(axis=0) - nmbs.mean(axis=0).max(axis=0))
+    assert np.all(evpi >= 0)
+    assert np.array_equal(cea.get_optimal_strategies(wtps=wtps), nmbs.mean(axis=0).argmax(axis=0))
+
+    p_intervals = cea.get_incremental_nmbs(wtps=wtps, interval_type='p')[1]
+    monkeypatch.setattr(Econ, 'MAX_GRID_SIZE', 3 * len(costs) * 2)
+    assert np.allclose(cea.get_acceptability_curves(wtps=wtps), curves)
+    assert np.allclose(cea.get_evpi(wtps=wtps), evpi)
+    assert np.allclose(cea.get_incremental_nmbs(wtps=wtps, interval_type='p')[1], p_intervals)
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+import MultiCohortClasses as MultiCls
+from EmulatorClasses import EmulatedCohortModel, PolynomialEmulator, fit_emulator
+from NealClasses import ParameterGenerator
+from ParameterClasses import Therapies
+from ResultsStoreClasses import get_multi_cohort_columns
+
+
+def test_emulator_recovers_a_polynomial():
+    """ without a penalty, a quadratic emulator of a quadratic function predicts it exactly """
+
+    rng = np.random.RandomState(seed=1)
+    params = rng.uniform(size=(200, 3))
+    params[:, 2] = 5    # a parameter that does not vary
+
+    def get_outcomes(x):
+        return np.column_stack([1 + 2 * x[:, 0] - 3 * x[:, 0] * x[:, 1], x[:, 1] ** 2])
+
+    emulator = PolynomialEmulator(degree=2, ridge=0)
+    emulator.fit(params=params, outcomes=get_outcomes(params))
+    assert np.allclose(emulator.testR2s, 1)
+    assert np.allclose(emulator.testErrors, 0, atol=1e-9)
+
+    queries = rng.uniform(size=(20, 3))
+    queries[:, 2] = 5
+    assert np.allclose(emulator.predict(queries), get_outcomes(queries))
+    assert np.allclose(emulator.predict(queries[0]), get_outcomes(queries[:1]))
+
+    with pytest.raises(ValueError):
+        PolynomialEmulator(degree=0)
+    with pytest.raises(ValueError):
+        PolynomialEmulator(degree=2).fit(params=params[:5], outcomes=get_outcomes(params[:5]), test_share=0)
+
+
+def test_domain_is_the_range_of_fitted_parameters():
+    """ queries are in the domain if each parameter is within its fitted range (widened by the tolerance) """
+
+    params = np.column_stack([np.linspace(0, 1, 50), np.linspace(10, 20, 50), np.full(50, 3.0)])
+    emulator = PolynomialEmulator(degree=1)
+    emulator.fit(params=params, outcomes=params[:, 0])
+
+    assert np.array_equal(emulator.get_if_in_domain([[0.5, 15, 3], [1.05, 15, 3], [0.5, 9, 3], [0.5, 15, 3.1]]),
+                          [True, False, False, False])
+    emulator.domainTolerance = 0.1
+    assert np.array_equal(emulator.get_if_in_domain([[1.05, 15, 3], [0.5, 9, 3], [0.5, 8, 3], [0.5, 15, 3.1]]),
+                          [True, True, False, False])
+
+
+def test_emulated_cohort_model_simulates_outside_the_domain():
+    """ an emulator fitted on PSA draws predicts the outcomes of cohorts within its domain
+    and cohorts outside it are simulated """
+
+    multi_cohort = MultiCls.MultiCohort(ids=range(400), pop_size=200, therapy=Therapies.RAMPIRIL)
+    multi_cohort.simulate_batched(sim_length=10, seed=1)
+    columns = get_multi_cohort_columns(multi_cohort_outcomes=multi_cohort.multiCohortOutcomes,
+                                       param_sets=multi_cohort.paramSets)
+    emulator = fit_emulator(columns=columns)
+    assert np.all(emulator.testR2s > 0.9)
+
+    model = EmulatedCohortModel(emulator=emulator, pop_size=200, sim_length=10)
+    parameters = multi_cohort.paramSets[0]
+    mean_cost, mean_qaly, if_emulated = model.get_outcomes(parameters=parameters)
+    assert if_emulated
+    assert abs(mean_cost - columns['mean_costs'][0]) < 4 * emulator.testErrors[0]
+    assert abs(mean_qaly - columns['mean_qalys'][0]) < 4 * emulator.testErrors[1]
+
+    # a treatment cost far above every sampled cost
+    parameters = ParameterGenerator(therapy=Therapies.RAMPIRIL).get_new_parameters(rng=np.random.RandomState(seed=0))
+    parameters.annualTreatmentCost = 10 * columns['params/annual_treatment_costs'].max()
+    mean_cost, mean_qaly, if_emulated = model.get_outcomes(parameters=parameters)
+    assert not if_emulated
+    assert mean_cost > columns['mean_costs'].max()
+    assert (model.nEmulated, model.nSimulated) == (1, 1)
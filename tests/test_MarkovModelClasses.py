@@ -0,0 +1,293 @@
+import numpy as np
+import pytest
+
+import MarkovModelClasses as Cls
+import ParameterClasses as P
+from InputDataNoTreatment import CKDStates
+from PayoffClasses import get_payoff_table
+from RNGClasses import RNGStreams
+
+
+def get_cohort(cohort_class, pop_size=2000, therapy=P.Therapies.RAMPIRIL, **kwargs):
+    """ :return: a cohort of the selected class with the parameters of the selected therapy """
+    param = P.Parameters(therapy=therapy)
+    return cohort_class(id=1, pop_size=pop_size, transition_prob_matrix_one=param.probMatrix,
+                        parameters=param, **kwargs)
+
+
+def get_trace(pop_size=2000, therapy=P.Therapies.RAMPIRIL):
+    """ :return: (CohortTrace) a cohort trace with the parameters of the selected therapy """
+    param = P.Parameters(therapy=therapy)
+    return Cls.CohortTrace(pop_size=pop_size, transition_prob_matrix_one=param.probMatrix, parameters=param)
+
+
+def assert_close_means(x, y, n_st_devs=4):
+    """ asserts that the means of two independent samples are within n_st_devs standard errors """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    st_error = np.sqrt(x.var(ddof=1) / len(x) + y.var(ddof=1) / len(y))
+    assert abs(x.mean() - y.mean()) <= n_st_devs * st_error
+
+
+def test_vectorized_cohort_replays_patients():
+    """ a VectorizedCohort gives every patient the outcomes of simulating it alone
+    with the same random numbers """
+
+    n_time_steps = 15
+    pop_size = 200
+    cohort = get_cohort(Cls.VectorizedCohort, pop_size=pop_size, rng_streams=RNGStreams(seed=1))
+    cohort.simulate(n_time_steps=n_time_steps)
+
+    # simulate each patient one time step at a time
+    payoffs = get_payoff_table(parameters=cohort.params, n_time_steps=n_time_steps)
+    cum_probs = np.cumsum(cohort.transitionProbMatrix, axis=1)
+    uniforms = RNGStreams(seed=1).get_uniforms(cohort_id=1, n_patients=pop_size)
+    states = np.zeros(pop_size, dtype=int)
+    survival_times = np.full(pop_size, np.nan)
+    costs = np.zeros(pop_size)
+    utilities = np.zeros(pop_size)
+    for k in range(n_time_steps):
+        u = uniforms.get_next()
+        for i in range(pop_size):
+            if states[i] == CKDStates.STAGE5.value:
+                continue
+            new_state = min(int(np.searchsorted(cum_probs[states[i]], u[i], side='right')), len(CKDStates) - 1)
+            cost, utility = payoffs.get_discounted_payoffs(k=k, current_state_index=states[i],
+                                                           next_state_index=new_state)
+            costs[i] += cost
+            utilities[i] += utility
+            if new_state == CKDStates.STAGE5.value:
+                survival_times[i] = k + 0.5
+            states[i] = new_state
+
+    assert np.array_equal(cohort.store.states, states)
+    assert np.array_equal(np.isnan(cohort.store.survivalTimes), np.isnan(survival_times))
+    assert np.allclose(cohort.store.get_survival_times(), survival_times[~np.isnan(survival_times)])
+    assert np.allclose(cohort.store.costs, costs)
+    assert np.allclose(cohort.store.utilities, utilities)
+    assert np.allclose(cohort.cohortOutcomes.costs, costs)
+    assert np.isclose(cohort.cohortOutcomes.meanCost, costs.mean())
+
+
+def test_vectorized_cohort_matches_cohort():
+    """ VectorizedCohort and Cohort simulate patients from the same distribution of outcomes """
+
+    cohort = get_cohort(Cls.Cohort)
+    cohort.simulate(n_time_steps=20)
+    vectorized_cohort = get_cohort(Cls.VectorizedCohort)
+    vectorized_cohort.simulate(n_time_steps=20)
+
+    assert_close_means(cohort.cohortOutcomes.costs, vectorized_cohort.cohortOutcomes.costs)
+    assert_close_means(cohort.cohortOutcomes.utilities, vectorized_cohort.cohortOutcomes.utilities)
+    assert_close_means(cohort.cohortOutcomes.survivalTimes, vectorized_cohort.cohortOutcomes.survivalTimes)
+
+
+def test_streaming_outcomes_match_kept_observations(monkeypatch):
+    """ a cohort that only keeps summary statistics reports the outcomes of one that keeps
+    every observation (also once patients are summarized in several buffers) """
+
+    monkeypatch.setattr(Cls, 'STREAMING_BUFFER_SIZE', 64)
+    kept = get_cohort(Cls.Cohort, pop_size=500)
+    kept.simulate(n_time_steps=20)
+    streamed = get_cohort(Cls.Cohort, pop_size=500, keep_observations=False)
+    streamed.simulate(n_time_steps=20)
+
+    assert streamed.cohortOutcomes.costs is None
+    assert streamed.cohortOutcomes.nPatients == kept.cohortOutcomes.nPatients
+    assert np.isclose(streamed.cohortOutcomes.meanCost, kept.cohortOutcomes.meanCost)
+    assert np.isclose(streamed.cohortOutcomes.meanUtility, kept.cohortOutcomes.meanUtility)
+    assert np.isclose(streamed.cohortOutcomes.meanSurvivalTime, kept.cohortOutcomes.meanSurvivalTime)
+    for name in ('statCost', 'statUtility', 'statSurvivalTime'):
+        streamed_stat = getattr(streamed.cohortOutcomes, name)
+        kept_stat = getattr(kept.cohortOutcomes, name)
+        assert np.isclose(streamed_stat.get_mean(), kept_stat.get_mean())
+        assert np.isclose(streamed_stat.get_stdev(), kept_stat.get_stdev())
+        assert (streamed_stat.get_min(), streamed_stat.get_max()) == (kept_stat.get_min(), kept_stat.get_max())
+    assert np.array_equal(streamed.cohortOutcomes.survivalCurve.get_n_living(20),
+                          kept.cohortOutcomes.survivalCurve.get_n_living(20))
+
+
+def test_patients_extracted_one_at_a_time_match_bulk_extraction():
+    """ CohortOutcomes grows its arrays as patients are extracted one at a time
+    and gets the outcomes of extracting them all at once """
+
+    param = P.Parameters(therapy=P.Therapies.NONE)
+    patients = []
+    for i in range(300):
+        patient = Cls.Patient(id=i, transition_prob_matrix_one=param.probMatrix, parameters=param)
+        patient.simulate(n_time_steps=20)
+        patients.append(patient)
+
+    # start with arrays too small for the cohort
+    outcomes = Cls.CohortOutcomes(pop_size=10)
+    for patient in patients:
+        outcomes.extract_outcome(simulated_patient=patient)
+    outcomes.calculate_cohort_outcomes(initial_pop_size=len(patients))
+
+    survival_times = [p.stateMonitor.survivalTime for p in patients if p.stateMonitor.survivalTime is not None]
+    costs = [p.stateMonitor.costUtilityMonitor.totalDiscountedCost for p in patients]
+    utilities = [p.stateMonitor.costUtilityMonitor.totalDiscountedUtility for p in patients]
+    bulk_outcomes = Cls.CohortOutcomes(pop_size=len(patients))
+    bulk_outcomes.extract_outcomes(survival_times=survival_times, costs=costs, utilities=utilities)
+    bulk_outcomes.calculate_cohort_outcomes(initial_pop_size=len(patients))
+
+    assert np.array_equal(outcomes.costs, bulk_outcomes.costs)
+    assert np.array_equal(outcomes.utilities, bulk_outcomes.utilities)
+    assert np.array_equal(outcomes.survivalTimes, bulk_outcomes.survivalTimes)
+    assert np.isclose(outcomes.meanCost, bulk_outcomes.meanCost)
+    assert np.array_equal(outcomes.survivalCurve.get_n_living(20), bulk_outcomes.survivalCurve.get_n_living(20))
+
+
+def test_cohort_trace_is_the_expected_outcome_of_patients():
+    """ the state occupancy of CohortTrace follows the powers of the transition matrix and
+    its expected outcomes are the means of simulated patients """
+
+    n_time_steps = 20
+    trace = get_trace()
+    trace.simulate(n_time_steps=n_time_steps, horizons=[5])
+    prob_matrix = np.array(trace.transitionProbMatrix)
+    for k in (1, 5, n_time_steps):
+        assert np.allclose(trace.cohortOutcomes.stateProbs[k], np.linalg.matrix_power(prob_matrix, k)[0])
+
+    cohort = get_cohort(Cls.VectorizedCohort, pop_size=20000, rng_streams=RNGStreams(seed=1))
+    cohort.simulate(n_time_steps=n_time_steps)
+    for values, expected in ((cohort.cohortOutcomes.costs, trace.cohortOutcomes.meanCost),
+                             (cohort.cohortOutcomes.utilities, trace.cohortOutcomes.meanUtility),
+                             (cohort.cohortOutcomes.survivalTimes, trace.cohortOutcomes.meanSurvivalTime)):
+        assert abs(values.mean() - expected) <= 4 * values.std(ddof=1) / np.sqrt(len(values))
+    n_stage5 = cohort.popSize - cohort.cohortOutcomes.survivalCurve.get_n_living(n_time_steps)[-1]
+    prob_stage5 = trace.cohortOutcomes.probStage5
+    assert abs(n_stage5 / cohort.popSize - prob_stage5) <= 4 * np.sqrt(prob_stage5 * (1 - prob_stage5) / cohort.popSize)
+
+    # outcomes at a time horizon are those of a shorter trace
+    short_trace = get_trace()
+    short_trace.simulate(n_time_steps=5)
+    horizon_outcomes = trace.cohortOutcomes.horizonOutcomes[5]
+    assert np.isclose(horizon_outcomes.meanCost, short_trace.cohortOutcomes.meanCost)
+    assert np.isclose(horizon_outcomes.meanUtility, short_trace.cohortOutcomes.meanUtility)
+    assert np.isclose(horizon_outcomes.meanSurvivalTime, short_trace.cohortOutcomes.meanSurvivalTime)
+    assert np.isclose(horizon_outcomes.nLivingPatients, short_trace.cohortOutcomes.nLivingPatients[-1])
+
+
+def test_time_to_stage5_matches_simulated_survival_times():
+    """ the mean and variance of time until stage 5 from the fundamental matrix are those of
+    its distribution and of simulated survival times """
+
+    param = P.Parameters(therapy=P.Therapies.RAMPIRIL)
+    time_to_stage5 = Cls.TimeToStage5(transition_prob_matrix_one=param.probMatrix)
+
+    survival_times, probs = time_to_stage5.get_survival_time_probs()
+    mean = probs @ survival_times
+    assert np.isclose(probs.sum(), 1)
+    assert np.isclose(mean, time_to_stage5.meanSurvivalTime)
+    assert np.isclose(probs @ (survival_times - mean) ** 2, time_to_stage5.varSurvivalTime)
+
+    cohort = get_cohort(Cls.VectorizedCohort, pop_size=20000, rng_streams=RNGStreams(seed=1))
+    cohort.simulate(n_time_steps=1000)
+    simulated = cohort.cohortOutcomes.survivalTimes
+    assert len(simulated) == cohort.popSize
+    assert abs(simulated.mean() - time_to_stage5.meanSurvivalTime) <= 4 * simulated.std(ddof=1) / np.sqrt(len(simulated))
+    assert np.isclose(simulated.var(ddof=1), time_to_stage5.varSurvivalTime, rtol=0.05)
+
+
+def test_time_to_stage5_needs_an_absorbing_chain():
+    """ TimeToStage5 rejects transition matrices under which stage 5 cannot be reached """
+
+    prob_matrix = np.identity(len(CKDStates))
+    with pytest.raises(ValueError):
+        Cls.TimeToStage5(transition_prob_matrix_one=prob_matrix)
+
+
+def test_patient_views_read_the_cohort_store():
+    """ patients of a CohortStore are viewed with the attributes of simulated Patients
+    and can be extracted one at a time like them """
+
+    cohort = get_cohort(Cls.VectorizedCohort, pop_size=300)
+    cohort.simulate(n_time_steps=20)
+    store = cohort.store
+    assert len(store) == cohort.popSize
+    assert store.get_nbytes() == cohort.popSize * (1 + 4 + 8 + 8)
+
+    outcomes = Cls.CohortOutcomes(pop_size=cohort.popSize)
+    for i in range(cohort.popSize):
+        patient = store.get_patient(i)
+        assert patient.id == cohort.id * cohort.popSize + i
+        assert patient.currentState.value == store.states[i]
+        assert patient.get_if_alive() == (store.states[i] != CKDStates.STAGE5.value)
+        assert (patient.stateMonitor.survivalTime is None) == patient.get_if_alive()
+        assert patient.stateMonitor.costUtilityMonitor.totalDiscountedCost == store.costs[i]
+        outcomes.extract_outcome(simulated_patient=patient)
+    outcomes.calculate_cohort_outcomes(initial_pop_size=cohort.popSize)
+
+    assert np.array_equal(outcomes.costs, cohort.cohortOutcomes.costs)
+    assert np.array_equal(outcomes.utilities, cohort.cohortOutcomes.utilities)
+    assert np.array_equal(outcomes.survivalTimes, cohort.cohortOutcomes.survivalTimes)
+
+
+@pytest.mark.parametrize('cohort_class', [Cls.Cohort, Cls.VectorizedCohort])
+def test_horizon_outcomes_match_shorter_runs(cohort_class):
+    """ outcomes reported at a time horizon are those of simulating the cohort up to the horizon """
+
+    cohort = get_cohort(cohort_class, pop_size=300, rng_streams=RNGStreams(seed=1))
+    cohort.simulate(n_time_steps=20, horizons=[1, 5, 10])
+
+    for horizon in (1, 5, 10):
+        shorter_cohort = get_cohort(cohort_class, pop_size=300, rng_streams=RNGStreams(seed=1))
+        shorter_cohort.simulate(n_time_steps=horizon)
+        outcomes = cohort.cohortOutcomes.horizonOutcomes[horizon]
+        assert outcomes.nPatients == shorter_cohort.cohortOutcomes.nPatients
+        assert outcomes.nLivingPatients == shorter_cohort.cohortOutcomes.survivalCurve.get_n_living(horizon)[-1]
+        assert np.isclose(outcomes.meanCost, shorter_cohort.cohortOutcomes.meanCost)
+        assert np.isclose(outcomes.meanUtility, shorter_cohort.cohortOutcomes.meanUtility)
+        # (no patient may have reached stage 5 by an early horizon)
+        if outcomes.meanSurvivalTime is None:
+            assert shorter_cohort.cohortOutcomes.meanSurvivalTime is None
+        else:
+            assert np.isclose(outcomes.meanSurvivalTime, shorter_cohort.cohortOutcomes.meanSurvivalTime)
+
+
+def test_horizons_beyond_the_simulation_are_rejected():
+    """ time horizons should be between 1 and the number of simulated time steps """
+
+    cohort = get_cohort(Cls.VectorizedCohort, pop_size=10)
+    with pytest.raises(ValueError):
+        cohort.simulate(n_time_steps=5, horizons=[10])
+
+
+@pytest.mark.parametrize('cohort_class', [Cls.Cohort, Cls.VectorizedCohort])
+def test_simulation_stops_once_every_patient_reaches_stage5(cohort_class):
+    """ a cohort only simulates patients until they reach stage 5, so a longer simulation
+    changes neither the outcomes nor the number of patient-steps once every patient has """
+
+    cohorts = []
+    for n_time_steps in (1000, 5000):
+        cohort = get_cohort(cohort_class, pop_size=200, rng_streams=RNGStreams(seed=1))
+        cohort.simulate(n_time_steps=n_time_steps)
+        cohorts.append(cohort)
+
+    survival_times = cohorts[0].cohortOutcomes.survivalTimes
+    assert len(survival_times) == cohorts[0].popSize
+    # a patient who reaches stage 5 during time step k (survival time k + 0.5) is simulated for k + 1 steps
+    assert cohorts[0].nPatientSteps == np.sum(survival_times + 0.5)
+    assert cohorts[1].nPatientSteps == cohorts[0].nPatientSteps
+    assert np.array_equal(cohorts[1].cohortOutcomes.costs, cohorts[0].cohortOutcomes.costs)
+    assert np.array_equal(cohorts[1].cohortOutcomes.survivalTimes, survival_times)
+
+
+def test_survival_curve_counts_living_patients():
+    """ the survival curve built from the number of patients reaching stage 5 in each time step
+    counts the patients whose survival time is later than each time """
+
+    cohort = get_cohort(Cls.VectorizedCohort, pop_size=500, rng_streams=RNGStreams(seed=1))
+    cohort.simulate(n_time_steps=30)
+    survival_times = cohort.cohortOutcomes.survivalTimes
+    curve = cohort.cohortOutcomes.survivalCurve
+
+    n_living = curve.get_n_living(n_time_steps=40)
+    assert len(n_living) == 41
+    assert np.array_equal(n_living, [cohort.popSize - np.sum(survival_times < t) for t in range(41)])
+    assert np.array_equal(curve.get_n_living(n_time_steps=10), n_living[:11])
+    assert curve.get_n_living()[-1] == n_living[-1]
+
+    # an empty histogram if no patient reaches stage 5
+    assert np.array_equal(Cls.SurvivalCurve(initial_size=10, n_absorbed=[]).get_n_living(3), [10] * 4)
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+import MultiCohortClasses as Cls
+from ParameterClasses import Therapies
+from RNGClasses import RNGStreams
+
+
+def simulate_multi_cohort(n_workers, rng_streams=None):
+    """ :return: (MultiCohort) a few cohorts under rampiril simulated with n_workers processes """
+    multi_cohort = Cls.MultiCohort(ids=range(8), pop_size=50, therapy=Therapies.RAMPIRIL, rng_streams=rng_streams)
+    multi_cohort.simulate(sim_length=10, n_workers=n_workers)
+    return multi_cohort
+
+
+@pytest.mark.parametrize('rng_streams', [None, RNGStreams(seed=1)])
+def test_parallel_multi_cohort_matches_serial(rng_streams):
+    """ cohorts simulated in worker processes have exactly the outcomes of a serial run """
+
+    serial = simulate_multi_cohort(n_workers=1, rng_streams=rng_streams)
+    parallel = simulate_multi_cohort(n_workers=2, rng_streams=rng_streams)
+
+    assert parallel.multiCohortOutcomes.meanCosts == serial.multiCohortOutcomes.meanCosts
+    assert parallel.multiCohortOutcomes.meanQALYs == serial.multiCohortOutcomes.meanQALYs
+    assert np.array_equal(parallel.multiCohortOutcomes.get_survival_curves(),
+                          serial.multiCohortOutcomes.get_survival_curves())
+    assert parallel.nPatientSteps == serial.nPatientSteps
+    assert parallel.multiCohortOutcomes.statMeanCost.get_mean() == serial.multiCohortOutcomes.statMeanCost.get_mean()
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+import InputDataNoTreatment as DataNT
+import InputDataTreatment as DataT
+import NealClasses as P
+
+
+@pytest.mark.parametrize('therapy, data', [(P.Therapies.NONE, DataNT), (P.Therapies.RAMPIRIL, DataT)])
+def test_dirichlet_rows_match_concentration(therapy, data):
+    """ sampled transition probabilities have the mean and variance of a Dirichlet
+    distribution with concentration N_OBS * probabilities """
+
+    generator = P.ParameterGenerator(therapy=therapy)
+    matrices = generator.get_parameter_batch(n=20000, seed=1).probMatrices
+
+    for s in data.CKDStates:
+        if s == data.CKDStates.STAGE5:
+            assert np.all(matrices[:, s.value, s.value] == 1)
+            continue
+
+        probs = np.array(data.trans_prob_matrix_one[s.value])
+        assert np.allclose(generator.probMatrixRows[s.value], data.N_OBS * probs)
+
+        # mean p and variance p (1 - p) / (N_OBS + 1) of each element of the row
+        variances = probs * (1 - probs) / (data.N_OBS + 1)
+        rows = matrices[:, s.value, :]
+        assert np.allclose(rows.sum(axis=1), 1)
+        assert np.all(np.abs(rows.mean(axis=0) - probs) <= 5 * np.sqrt(variances / len(rows)) + 1e-12)
+        assert np.allclose(rows.var(axis=0), variances, rtol=0.05, atol=1e-12)
+
+
+def test_single_parameter_sets_match_concentration():
+    """ parameter sets sampled one at a time use the same concentrations as batches """
+
+    generator = P.ParameterGenerator(therapy=P.Therapies.RAMPIRIL)
+    matrices = np.array([generator.get_new_parameters(rng=np.random.RandomState(seed=i)).transRateMatrix
+                         for i in range(2000)])
+
+    probs = np.array(DataT.trans_prob_matrix_one)
+    variances = probs * (1 - probs) / (DataT.N_OBS + 1)
+    assert np.allclose(matrices.sum(axis=2), 1)
+    assert np.all(np.abs(matrices.mean(axis=0) - probs) <= 5 * np.sqrt(variances / len(matrices)) + 1e-12)
+    assert np.allclose(matrices.var(axis=0), variances, rtol=0.2, atol=1e-12)
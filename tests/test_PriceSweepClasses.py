@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+import MarkovModelClasses as Cls
+import ParameterClasses as P
+from PriceSweepClasses import PriceSweep
+from RNGClasses import RNGStreams
+
+
+def get_price_sweep(pop_size=300, n_time_steps=20):
+    """ :return: (PriceSweep) a simulated price sweep of rampiril against no treatment """
+
+    ref_param = P.Parameters(therapy=P.Therapies.NONE)
+    param = P.Parameters(therapy=P.Therapies.RAMPIRIL)
+    price_sweep = PriceSweep(id=1, pop_size=pop_size,
+                             ref_transition_prob_matrix=ref_param.probMatrix, ref_parameters=ref_param,
+                             transition_prob_matrix=param.probMatrix, parameters=param,
+                             rng_streams=RNGStreams(seed=1))
+    price_sweep.simulate(n_time_steps=n_time_steps)
+    return price_sweep
+
+
+def simulate_paired_cohort(param, pop_size=300, n_time_steps=20):
+    """ :return: (PairedCohort) the cohort of the price sweep simulated with the parameters of rampiril """
+
+    ref_param = P.Parameters(therapy=P.Therapies.NONE)
+    cohort = Cls.PairedCohort(id=1, pop_size=pop_size,
+                              ref_transition_prob_matrix=ref_param.probMatrix, ref_parameters=ref_param,
+                              transition_prob_matrix=param.probMatrix, parameters=param,
+                              rng_streams=RNGStreams(seed=1))
+    cohort.simulate(n_time_steps=n_time_steps)
+    return cohort
+
+
+def test_repricing_matches_simulating_again():
+    """ the outcomes of re-priced cohorts are those of cohorts simulated again at the new prices """
+
+    price_sweep = get_price_sweep()
+    param = price_sweep.params
+    assert np.allclose(price_sweep.exposures.get_costs(annual_state_costs=param.annualStateCosts,
+                                                       annual_treatment_costs=param.annualTreatmentCost),
+                       price_sweep.pairedCohort.store.costs)
+    assert np.allclose(price_sweep.exposures.get_utilities(annual_state_utilities=param.annualStateUtilities),
+                       price_sweep.pairedCohort.store.utilities)
+
+    prices = np.array([0.0, 2000.0, 9000.0])
+    state_costs = np.array([param.annualStateCosts, 2 * np.array(param.annualStateCosts)])
+    d_costs = price_sweep.get_incremental_costs(annual_treatment_costs=prices, annual_state_costs=state_costs)
+    assert d_costs.shape == (2, 3)
+    for i, annual_state_costs in enumerate(state_costs):
+        for j, price in enumerate(prices):
+            new_param = P.Parameters(therapy=P.Therapies.RAMPIRIL)
+            new_param.annualTreatmentCost = price
+            new_param.annualStateCosts = annual_state_costs
+            cohort = simulate_paired_cohort(param=new_param)
+            # (the reference therapy is re-priced with the same state costs)
+            ref_costs = price_sweep.refExposures.get_costs(annual_state_costs=annual_state_costs,
+                                                           annual_treatment_costs=0)
+            assert np.isclose(d_costs[i, j], cohort.store.costs.mean() - ref_costs.mean(), rtol=1e-10)
+
+
+def test_net_monetary_benefit_is_zero_at_break_even_prices():
+    """ the incremental net monetary benefit at a break-even price is zero """
+
+    price_sweep = get_price_sweep()
+    wtps = np.array([50000.0, 100000.0, 150000.0])
+    prices = price_sweep.get_break_even_prices(wtps=wtps)
+    for wtp, price in zip(wtps, prices):
+        nmb = price_sweep.get_incremental_nmbs(wtps=[wtp], annual_treatment_costs=price)
+        assert nmb.shape == (1, 1)
+        assert abs(nmb[0, 0]) < 1e-6 * wtp
+
+    # at the simulated price, the benefit is that of the simulated outcomes
+    outcomes = price_sweep.pairedCohort
+    nmbs = price_sweep.get_incremental_nmbs(wtps=wtps)
+    assert np.allclose(nmbs[0], wtps * (outcomes.store.utilities.mean() - outcomes.refStore.utilities.mean())
+                       - (outcomes.store.costs.mean() - outcomes.refStore.costs.mean()))
+
+
+def test_cohorts_need_exposures_to_be_repriced():
+    """ only cohorts simulated with track_exposures=True can be re-priced """
+
+    from PriceSweepClasses import get_exposures
+
+    cohort = simulate_paired_cohort(param=P.Parameters(therapy=P.Therapies.RAMPIRIL), pop_size=10)
+    with pytest.raises(ValueError):
+        get_exposures(store=cohort.store)
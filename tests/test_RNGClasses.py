@@ -0,0 +1,70 @@
+import numpy as np
+
+import MarkovModelClasses as Cls
+import ParameterClasses as P
+from MarkovModelClassesMultiCohorts import CohortBatch
+from NealClasses import ParameterGenerator
+from RNGClasses import RNGStreams
+
+
+def test_uniform_blocks_do_not_depend_on_block_size():
+    """ the number drawn for a patient at a time step does not depend on how many time steps
+    are drawn at once """
+
+    streams = RNGStreams(seed=1, scenario=2)
+    small_blocks = streams.get_uniforms(cohort_id=3, n_patients=10, block_size=3)
+    large_blocks = streams.get_uniforms(cohort_id=3, n_patients=10, block_size=64)
+    for _ in range(10):
+        assert np.array_equal(small_blocks.get_next(), large_blocks.get_next())
+
+
+def test_streams_depend_only_on_seed_scenario_and_cohort():
+    """ the same (seed, scenario, cohort, patient) always draws the same numbers and
+    changing any of them gives other numbers """
+
+    def draw(seed=0, scenario=0, cohort_id=0, patient_index=0):
+        rng = RNGStreams(seed=seed, scenario=scenario).get_patient_rng(cohort_id=cohort_id,
+                                                                       patient_index=patient_index)
+        return rng.random(5)
+
+    assert np.array_equal(draw(), draw())
+    for changed in (dict(seed=1), dict(scenario=1), dict(cohort_id=1), dict(patient_index=1)):
+        assert not np.any(np.isin(draw(**changed), draw()))
+
+    # streams of patients and of the whole cohort do not overlap
+    streams = RNGStreams()
+    bulk = streams.get_cohort_rng(cohort_id=0).random(1000)
+    assert not np.any(np.isin(draw(), bulk))
+
+
+def test_patient_streams_do_not_depend_on_population_size():
+    """ with RNGStreams, patient i of a cohort has the same outcomes whatever the population size """
+
+    param = P.Parameters(therapy=P.Therapies.NONE)
+    costs = []
+    for pop_size in (50, 100):
+        cohort = Cls.Cohort(id=1, pop_size=pop_size, transition_prob_matrix_one=param.probMatrix,
+                            parameters=param, rng_streams=RNGStreams(seed=1))
+        cohort.simulate(n_time_steps=20)
+        costs.append(cohort.cohortOutcomes.costs)
+    assert np.array_equal(costs[0], costs[1][:50])
+
+
+def test_cohort_batch_matches_vectorized_cohorts():
+    """ with RNGStreams, cohorts simulated together in a CohortBatch have exactly the outcomes of
+    simulating each with the same parameters as a VectorizedCohort """
+
+    ids = [3, 4, 5]
+    batch = ParameterGenerator(therapy=P.Therapies.RAMPIRIL).get_parameter_batch(n=len(ids), seed=1)
+    cohort_batch = CohortBatch(ids=ids, pop_size=200, parameter_batch=batch)
+    cohort_batch.simulate(n_time_steps=20, rng_streams=RNGStreams(seed=1))
+
+    for i, cohort_id in enumerate(ids):
+        param = batch.get_parameters(i)
+        cohort = Cls.VectorizedCohort(id=cohort_id, pop_size=200, transition_prob_matrix_one=param.transRateMatrix,
+                                      parameters=param, rng_streams=RNGStreams(seed=1))
+        cohort.simulate(n_time_steps=20)
+        assert np.isclose(cohort_batch.meanCosts[i], cohort.cohortOutcomes.meanCost)
+        assert np.isclose(cohort_batch.meanQALYs[i], cohort.cohortOutcomes.meanUtility)
+        assert np.array_equal(cohort_batch.survivalCurves[i].get_n_living(20),
+                              cohort.cohortOutcomes.survivalCurve.get_n_living(20))
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+import MarkovModelClasses as Cls
+import ParameterClasses as P
+from ResultsStoreClasses import ResultsStore, get_cohort_columns, write_results
+
+
+def test_columns_are_read_back_as_written(tmp_path):
+    """ columns keep their values, dtypes and shapes and are memory-mapped when loaded """
+
+    columns = {'NONE/costs': np.arange(10.0),
+               'NONE/n_living': np.arange(12, dtype=np.int64).reshape(3, 4),
+               'RAMPIRIL/mean_cost': np.array(3.5),
+               'RAMPIRIL/params/annual_state_costs': np.ones((2, 5), dtype=np.float32)}
+    write_results(directory=str(tmp_path), columns=columns, metadata=dict(scenario='costs', seed=1))
+
+    store = ResultsStore(directory=str(tmp_path))
+    assert store.metadata == dict(scenario='costs', seed=1)
+    assert sorted(store.get_names()) == sorted(columns)
+    assert sorted(store.get_names(prefix='RAMPIRIL')) == ['RAMPIRIL/mean_cost', 'RAMPIRIL/params/annual_state_costs']
+    for name, values in columns.items():
+        column = store.get_column(name)
+        assert isinstance(column, np.memmap)
+        assert column.dtype == values.dtype and column.shape == values.shape
+        assert np.array_equal(column, values)
+    assert set(store.get_columns(prefix='NONE')) == {'costs', 'n_living'}
+    assert not isinstance(ResultsStore(directory=str(tmp_path), mmap_mode=None).get_column('NONE/costs'), np.memmap)
+
+    with pytest.raises(KeyError):
+        store.get_column('NONE/utilities')
+
+
+def test_column_names_stay_in_the_store(tmp_path):
+    """ column names cannot point outside the directory of the store """
+
+    for name in ('../costs', '/tmp/costs'):
+        with pytest.raises(ValueError):
+            write_results(directory=str(tmp_path), columns={name: np.zeros(2)})
+
+
+def test_cohort_columns_hold_the_cohort_outcomes(tmp_path):
+    """ the columns of a simulated cohort hold its outcomes (patients' outcomes only if they are kept) """
+
+    param = P.Parameters(therapy=P.Therapies.NONE)
+    cohort = Cls.VectorizedCohort(id=1, pop_size=100, transition_prob_matrix_one=param.probMatrix, parameters=param)
+    cohort.simulate(n_time_steps=10)
+    store = write_results(directory=str(tmp_path),
+                          columns=get_cohort_columns(cohort_outcomes=cohort.cohortOutcomes, n_time_steps=10))
+
+    assert store.get_column('mean_cost') == cohort.cohortOutcomes.statCost.get_mean()
+    assert np.array_equal(store.get_column('costs'), cohort.cohortOutcomes.costs)
+    assert np.array_equal(store.get_column('survival_times'), cohort.cohortOutcomes.survivalTimes)
+    assert np.array_equal(store.get_column('n_living'), cohort.cohortOutcomes.survivalCurve.get_n_living(10))
+
+    streamed = Cls.VectorizedCohort(id=1, pop_size=100, transition_prob_matrix_one=param.probMatrix,
+                                    parameters=param, keep_observations=False)
+    streamed.simulate(n_time_steps=10)
+    assert 'costs' not in get_cohort_columns(cohort_outcomes=streamed.cohortOutcomes, keep_patients=False)
+    with pytest.raises(ValueError):
+        get_cohort_columns(cohort_outcomes=streamed.cohortOutcomes)
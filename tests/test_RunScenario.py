@@ -0,0 +1,32 @@
+import importlib.util
+import re
+import sys
+
+import InputDataTreatment as DataT
+import ParameterClasses as P
+import RunScenario
+from ScenarioCacheClasses import ScenarioCache
+
+
+def test_price_change_reuses_reference_arm(tmp_path, monkeypatch):
+    """ editing the price of rampiril only simulates the rampiril arm again """
+
+    cache = ScenarioCache(directory=str(tmp_path / 'cache'))
+    scenario = RunScenario.get_scenario('costs', engine='vectorized', pop_size=100, horizon=5)
+    RunScenario._run_cohorts(scenario, cache=cache)
+    assert (cache.nHits, cache.nMisses) == (0, 2)
+
+    # a copy of the input data of rampiril with a different price
+    with open(DataT.__file__) as file:
+        source = re.sub(r'RAMPIRIL_COST = \d+', 'RAMPIRIL_COST = 8000', file.read())
+    edited_file = tmp_path / 'InputDataTreatment.py'
+    edited_file.write_text(source)
+    spec = importlib.util.spec_from_file_location('InputDataTreatment', str(edited_file))
+    edited_data = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(edited_data)
+    monkeypatch.setitem(sys.modules, 'InputDataTreatment', edited_data)
+    monkeypatch.setattr(P, 'DataT', edited_data)
+
+    outcomes = RunScenario._run_cohorts(scenario, cache=cache)
+    assert (cache.nHits, cache.nMisses) == (1, 3)
+    assert outcomes['RAMPIRIL/costs'].mean() > 0
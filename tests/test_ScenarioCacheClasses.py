@@ -0,0 +1,68 @@
+import os
+
+import numpy as np
+
+import RunScenario
+from ParameterClasses import Therapies
+from ScenarioCacheClasses import ScenarioCache, get_key
+
+
+def test_cache_hits_return_the_columns_of_the_run(tmp_path):
+    """ results loaded from the cache are those the run returned, and the run is only
+    called again when the inputs change """
+
+    cache = ScenarioCache(directory=str(tmp_path))
+    n_runs = []
+
+    def run():
+        n_runs.append(1)
+        return {'costs': np.arange(5.0), 'n_living': np.arange(6).reshape(2, 3)}
+
+    inputs = dict(therapy=Therapies.RAMPIRIL, pop_size=100, matrix=np.array([[1, 0], [0, 1]]))
+    miss = cache.get_or_run(inputs=inputs, run=run)
+    hit = cache.get_or_run(inputs=dict(matrix=[[1, 0], [0, 1]], pop_size=100, therapy=Therapies.RAMPIRIL), run=run)
+    assert (cache.nHits, cache.nMisses, len(n_runs)) == (1, 1, 1)
+    assert sorted(hit.get_names()) == sorted(miss.get_names()) == ['costs', 'n_living']
+    for name in miss.get_names():
+        assert np.array_equal(hit.get_column(name), run()[name])
+
+    cache.get_or_run(inputs=dict(inputs, pop_size=200), run=run)
+    assert (cache.nHits, cache.nMisses) == (1, 2)
+
+
+def test_keys_depend_on_input_values_only():
+    """ the key of inputs does not depend on the order of keys or on how numbers are stored """
+
+    assert get_key(dict(a=1, b=[0.5, 2.0])) == get_key(dict(b=np.array([0.5, 2.0]), a=np.int64(1)))
+    assert get_key(dict(a=1)) != get_key(dict(a=2))
+    assert get_key(dict(therapy=Therapies.NONE)) != get_key(dict(therapy=Therapies.RAMPIRIL))
+
+
+def test_least_recently_used_results_are_evicted(tmp_path):
+    """ once the cache holds too many results, the least recently used are removed """
+
+    cache = ScenarioCache(directory=str(tmp_path), max_entries=2)
+    keys = [get_key(dict(i=i)) for i in range(3)]
+    cache.put(key=keys[0], columns={'x': np.zeros(1)})
+    cache.put(key=keys[1], columns={'x': np.zeros(1)})
+    # use the first results so that the second are the least recently used
+    os.utime(os.path.join(str(tmp_path), keys[1], 'metadata.json'), (0, 0))
+    assert cache.get(key=keys[0]) is not None
+    cache.put(key=keys[2], columns={'x': np.zeros(1)})
+
+    assert sorted(entry[0] for entry in cache.get_entries()) == sorted([keys[0], keys[2]])
+    assert cache.get(key=keys[1]) is None
+
+
+def test_cached_scenario_matches_a_run_without_cache(tmp_path):
+    """ a scenario run with the cache (on a miss and on a hit) gives the outcomes of a run without it """
+
+    cache = ScenarioCache(directory=str(tmp_path))
+    scenario = RunScenario.get_scenario('costs', engine='vectorized', pop_size=100, horizon=5)
+    expected = RunScenario._run_cohorts(scenario)
+    for _ in range(2):
+        outcomes = RunScenario._run_cohorts(scenario, cache=cache)
+        assert sorted(outcomes) == sorted(expected)
+        for name, values in expected.items():
+            assert np.array_equal(outcomes[name], values)
+    assert (cache.nHits, cache.nMisses) == (2, 2)
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+import MarkovModelClasses as Cls
+import MultiCohortClasses as MultiCls
+import ParameterClasses as P
+from StoppingRuleClasses import PrecisionMonitor, StoppingRule
+
+
+def get_half_width(stopping_rule, costs):
+    """ :return: half-width of the confidence interval of mean cost """
+    precision_monitor = PrecisionMonitor(stopping_rule=stopping_rule)
+    precision_monitor.update(costs=costs, utilities=np.zeros(len(costs)))
+    return precision_monitor.get_half_widths()[0]
+
+
+def test_cohort_stops_at_the_first_precise_batch():
+    """ a cohort simulates patients in batches until the mean cost is precise enough
+    and these are the first patients of a cohort simulated in full """
+
+    param = P.Parameters(therapy=P.Therapies.RAMPIRIL)
+    full_cohort = Cls.Cohort(id=1, pop_size=2000, transition_prob_matrix_one=param.probMatrix, parameters=param)
+    full_cohort.simulate(n_time_steps=20)
+
+    # a target half-width that is met before every patient is simulated
+    stopping_rule = StoppingRule(batch_size=100, cost_half_width=get_half_width(
+        StoppingRule(batch_size=100), full_cohort.cohortOutcomes.costs[:500]))
+    cohort = Cls.Cohort(id=1, pop_size=2000, transition_prob_matrix_one=param.probMatrix, parameters=param)
+    cohort.simulate(n_time_steps=20, stopping_rule=stopping_rule)
+
+    n = cohort.cohortOutcomes.nPatients
+    assert n % stopping_rule.batchSize == 0 and n < full_cohort.popSize
+    assert np.array_equal(cohort.cohortOutcomes.costs, full_cohort.cohortOutcomes.costs[:n])
+    assert get_half_width(stopping_rule, cohort.cohortOutcomes.costs) <= stopping_rule.costHalfWidth
+    assert get_half_width(stopping_rule, cohort.cohortOutcomes.costs[:n - 100]) > stopping_rule.costHalfWidth
+
+
+def test_multi_cohorts_stop_together_on_net_monetary_benefit():
+    """ cohorts under two therapies are simulated batch by batch until the incremental
+    net monetary benefit is precise enough """
+
+    stopping_rule = StoppingRule(batch_size=4, nmb_half_width=1e12, wtp=50000)
+    ref_multi_cohort = MultiCls.MultiCohort(ids=range(20), pop_size=20, therapy=P.Therapies.NONE)
+    multi_cohort = MultiCls.MultiCohort(ids=range(20), pop_size=20, therapy=P.Therapies.RAMPIRIL)
+    multi_cohort.simulate(sim_length=5, stopping_rule=stopping_rule, ref_multi_cohort=ref_multi_cohort)
+
+    assert len(multi_cohort.multiCohortOutcomes.meanCosts) == stopping_rule.batchSize
+    assert len(ref_multi_cohort.multiCohortOutcomes.meanCosts) == stopping_rule.batchSize
+
+
+def test_invalid_stopping_rules_are_rejected():
+    """ stopping rules need batches of at least 2 and a willingness-to-pay (and outcomes under a
+    reference therapy) to check the net monetary benefit """
+
+    with pytest.raises(ValueError):
+        StoppingRule(batch_size=1, cost_half_width=1)
+    with pytest.raises(ValueError):
+        StoppingRule(batch_size=10, nmb_half_width=1)
+
+    precision_monitor = PrecisionMonitor(stopping_rule=StoppingRule(batch_size=10, nmb_half_width=1, wtp=50000))
+    with pytest.raises(ValueError):
+        precision_monitor.update(costs=[1, 2], utilities=[1, 2])
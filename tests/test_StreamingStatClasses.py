@@ -0,0 +1,52 @@
+import numpy as np
+
+from StreamingStatClasses import QuantileSketch, StreamingStat
+
+
+def test_merged_statistics_match_a_single_pass():
+    """ statistics of batches merged together are those of all observations added at once """
+
+    data = np.random.RandomState(seed=1).gamma(shape=2, scale=100, size=5000)
+    single_pass = StreamingStat()
+    single_pass.add(data)
+
+    merged = StreamingStat()
+    for batch in np.array_split(data, 7):
+        stat = StreamingStat()
+        stat.add(batch)
+        merged.merge(stat)
+    merged.merge(StreamingStat())   # merging an empty statistics changes nothing
+
+    assert merged.get_n() == single_pass.get_n() == len(data)
+    assert np.isclose(merged.get_total(), data.sum())
+    assert np.isclose(merged.get_mean(), data.mean())
+    assert np.isclose(single_pass.get_stdev(), data.std(ddof=1))
+    assert np.isclose(merged.get_stdev(), data.std(ddof=1))
+    assert (merged.get_min(), merged.get_max()) == (data.min(), data.max())
+
+
+def test_percentiles_are_exact_then_approximate():
+    """ percentiles are exact while the sketch keeps every observation and close to them after """
+
+    data = np.random.RandomState(seed=1).normal(size=20000)
+    stat = StreamingStat(sketch_size=1024)
+    stat.add(data[:1000])
+    assert stat.get_percentile(10) == np.percentile(data[:1000], 10)
+
+    for batch in np.array_split(data[1000:], 19):
+        stat.add(batch)
+    # the rank of an estimated percentile is within 1% of its rank in all observations
+    for q in (2.5, 50, 97.5):
+        assert abs(np.mean(data <= stat.get_percentile(q)) - q / 100) < 0.01
+    lower, upper = stat.get_PI(alpha=0.05)
+    assert lower == stat.get_percentile(2.5) and upper == stat.get_percentile(97.5)
+
+
+def test_quantile_sketch_keeps_a_bounded_number_of_observations():
+    """ each level of the sketch keeps no more than its size """
+
+    sketch = QuantileSketch(size=100)
+    for batch in np.array_split(np.arange(10000.0), 50):
+        sketch.add(batch)
+    assert all(len(level) <= 100 for level in sketch._levels)
+    assert abs(sketch.get_percentile(50) - 5000) < 200
@@ -0,0 +1,87 @@
+from math import comb
+
+import numpy as np
+import pytest
+
+import MultiCohortClasses as MultiCls
+from ParameterClasses import Therapies
+from ResultsStoreClasses import get_multi_cohort_columns
+from ValueOfInformationClasses import ValueOfInformation, get_design_matrix, get_parameter_groups
+
+WTPS = np.linspace(0, 3000, 7)
+
+
+def get_draws(n=2000, seed=1):
+    """ :return: (params, costs, effects) of two strategies whose outcomes depend on two of three parameters """
+    rng = np.random.RandomState(seed=seed)
+    params = rng.normal(size=(n, 3))
+    costs = np.column_stack([1000 + 100 * params[:, 0], 1100 + 100 * params[:, 0] + 200 * params[:, 1]])
+    effects = np.column_stack([np.ones(n), 1.05 + 0.05 * params[:, 1]])
+    return params, costs, effects
+
+
+def test_evppi_of_every_parameter_is_evpi():
+    """ learning every parameter that the outcomes depend on is worth as much as perfect information,
+    and learning a parameter they do not depend on is worth (almost) nothing """
+
+    params, costs, effects = get_draws()
+    voi = ValueOfInformation(costs=costs, effects=effects)
+    evpi = voi.get_evpi(wtps=WTPS)
+    assert np.all(evpi > 0)
+    assert np.allclose(voi.get_evppi(params=params, wtps=WTPS, degree=1), evpi)
+    assert np.allclose(voi.get_evppi(params=params[:, :2], wtps=WTPS, degree=2), evpi)
+
+    evppis = voi.get_evppis(parameter_groups={'first': params[:, 0], 'second': params[:, 1],
+                                              'unrelated': params[:, 2]}, wtps=WTPS)
+    assert np.all(evppis['second'] <= evpi + 1e-9)
+    assert np.all(evppis['unrelated'] < 0.05 * evpi.max())
+    assert np.all(evppis['first'] >= 0)
+
+
+def test_design_matrix_has_every_product_of_parameters():
+    """ the design matrix has an intercept and every product of up to 'degree' standardized parameters
+    (constant parameters are left out) """
+
+    params = np.random.RandomState(seed=1).normal(size=(50, 4))
+    params[:, 2] = 7
+    for degree in (1, 2, 3):
+        design = get_design_matrix(params=params, degree=degree)
+        assert design.shape == (50, comb(3 + degree, degree))
+        assert np.allclose(design[:, 0], 1)
+    x = (params[:, [0, 1, 3]] - params[:, [0, 1, 3]].mean(axis=0)) / params[:, [0, 1, 3]].std(axis=0)
+    design = get_design_matrix(params=params, degree=2)
+    assert np.allclose(design[:, 1:4], x)
+    assert np.allclose(design[:, 4], x[:, 0] ** 2)
+
+    # new draws are standardized with the means and standard deviations of the fitted draws
+    means = params.mean(axis=0)
+    st_devs = params.std(axis=0)
+    assert np.allclose(get_design_matrix(params=params[:5], means=means, st_devs=st_devs), design[:5])
+
+    with pytest.raises(ValueError):
+        get_design_matrix(params=params, degree=0)
+
+
+def test_evppi_needs_more_draws_than_terms():
+    """ the regression needs more draws than regression terms """
+
+    params, costs, effects = get_draws(n=20)
+    with pytest.raises(ValueError):
+        ValueOfInformation(costs=costs, effects=effects).get_evppi(params=params, wtps=WTPS, degree=3)
+
+
+def test_parameter_groups_of_multi_cohorts():
+    """ parameter groups combine the parameter draws of every therapy """
+
+    columns = []
+    for therapy in (Therapies.NONE, Therapies.RAMPIRIL):
+        multi_cohort = MultiCls.MultiCohort(ids=range(6), pop_size=10, therapy=therapy)
+        multi_cohort.simulate_batched(sim_length=5)
+        columns.append(get_multi_cohort_columns(multi_cohort_outcomes=multi_cohort.multiCohortOutcomes,
+                                                param_sets=multi_cohort.paramSets))
+
+    groups = get_parameter_groups(param_columns=columns)
+    assert len(groups) == 4 + 3
+    assert groups['Transition probabilities out of STAGE1'].shape == (6, 2 * 5)
+    assert groups['Annual treatment cost'].shape == (6, 2)
+    assert np.array_equal(groups['Annual state costs'][:, :5], columns[0]['params/annual_state_costs'])